@@ -1,5 +1,11 @@
 import xlwings as xw
 
+from helpers.pd import kwargs_cache_stats
+from helpers.instrument import instrument, uninstrument, is_instrumented, udf_stats, reset_udf_stats, \
+    dump_udf_stats, dump_udf_trace, is_recording
+from helpers.trace import enable_tracing, disable_tracing, export_trace, clear_trace
+from helpers.arrays import array_cache_stats, clear_array_cache
+
 # -------------------------
 # Helper UDF's
 # 1. Build a Python list/array from Excel
@@ -139,3 +145,138 @@ def XL_PARAMS(*args):
     for k, v in kwargs.items():
         pairs.append(f"{repr(k)}: {to_literal(v)}")
     return "{" + ", ".join(pairs) + "}"
+
+# -------------------------
+# 5. parse_kwargs cache stats
+# -------------------------
+
+
+@xw.func
+def KWARGS_CACHE_STATS(clear=False):
+    """
+    Hit rate and size of the parse_kwargs memo cache, as a 2-column table.
+    clear=TRUE empties the cache and resets the counters afterwards.
+
+    Example:
+        =KWARGS_CACHE_STATS()
+    """
+    try:
+        stats = kwargs_cache_stats(clear=bool(clear))
+        return [[k, v] for k, v in stats.items()]
+    except Exception as e:
+        return f"KWARGS_CACHE_STATS error: {e}"
+
+
+# -------------------------
+# 6. UDF instrumentation
+# -------------------------
+
+
+@xw.func
+def UDF_STATS_ENABLE(on=True):
+    """
+    Start (or stop) timing every UDF call. Also enabled at startup by the
+    XLW_UDF_STATS environment variable.
+
+    Example:
+        =UDF_STATS_ENABLE(TRUE)
+    """
+    try:
+        if on:
+            return f"UDF stats on ({instrument()} UDFs instrumented)"
+        return f"UDF stats off ({uninstrument()} UDFs restored)"
+    except Exception as e:
+        return f"UDF_STATS_ENABLE error: {e}"
+
+
+@xw.func
+@xw.ret(index=False)
+def UDF_STATS(dump=False, reset=False):
+    """
+    Per-UDF call count, errors, total time, p50/p95/p99 latency and
+    input/output cell counts, slowest total first.
+    dump=TRUE also writes the table and the recent calls (with the calling
+    cells if XLW_UDF_STATS=callers) to a JSON file in the cache dir and,
+    with XLW_UDF_STATS=record, the calls with their arguments as a trace
+    for benchmarks/headless.py.
+    reset=TRUE clears the counters afterwards.
+
+    Example:
+        =UDF_STATS()
+    """
+    try:
+        if not is_instrumented():
+            return "UDF_STATS error: instrumentation is off (=UDF_STATS_ENABLE(TRUE))"
+        stats = udf_stats()
+        if dump:
+            dump_udf_stats()
+            if is_recording():
+                dump_udf_trace()
+        if reset:
+            reset_udf_stats()
+        return stats
+    except Exception as e:
+        return f"UDF_STATS error: {e}"
+
+
+# -------------------------
+# 7. Tracing
+# -------------------------
+
+
+@xw.func
+def TRACE_START(clear=True):
+    """
+    Record nested timing spans (kwargs parsing, cache load, compute, xlwings
+    conversion) of every UDF call until TRACE_STOP.
+
+    Example:
+        =TRACE_START()
+    """
+    try:
+        if clear:
+            clear_trace()
+        enable_tracing()
+        return "Tracing on"
+    except Exception as e:
+        return f"TRACE_START error: {e}"
+
+
+@xw.func
+def TRACE_STOP(path=None):
+    """
+    Stop tracing and write the spans as Chrome trace JSON (to path, or a
+    _trace.*.json file in the cache dir). Open it in chrome://tracing or
+    https://ui.perfetto.dev.
+
+    Example:
+        =TRACE_STOP()
+    """
+    try:
+        disable_tracing()
+        return export_trace(path or None)
+    except Exception as e:
+        return f"TRACE_STOP error: {e}"
+
+
+# -------------------------
+# 8. NP_* range array cache stats
+# -------------------------
+
+
+@xw.func
+def ARRAY_CACHE_STATS(clear=False):
+    """
+    Hit rate and size of the cache of converted NP_* input ranges, as a
+    2-column table. clear=TRUE empties the cache and resets the counters afterwards.
+
+    Example:
+        =ARRAY_CACHE_STATS()
+    """
+    try:
+        stats = array_cache_stats()
+        if clear:
+            clear_array_cache()
+        return [[k, v] for k, v in stats.items()]
+    except Exception as e:
+        return f"ARRAY_CACHE_STATS error: {e}"
@@ -1,11 +1,14 @@
 import xlwings as xw
-from faker import Faker
 import re
 
+from helpers.lazy import lazy_import, lazy_callable
 from helpers.pd import parse_kwargs
 
-# Initialize default Faker instance
-fake = Faker()
+# faker loads its provider tree on import; defer it to the first FAKER_ call
+Faker = lazy_callable("faker", "Faker")
+
+# Default Faker instance, created on first use
+fake = lazy_import("faker.Faker()", lambda: Faker())
 
 # -------------------------
 # FAKER UDFs - EXTENDED
@@ -1,7 +1,11 @@
 import xlwings as xw
-from rapidfuzz import fuzz, process
 import re
 
+from helpers.lazy import lazy_import
+
+fuzz = lazy_import("rapidfuzz.fuzz")
+process = lazy_import("rapidfuzz.process")
+
 # -------------------------
 # Helpers
 # -------------------------
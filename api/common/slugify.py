@@ -1,6 +1,9 @@
 # slugify_udfs.py
 import xlwings as xw
-from slugify import slugify
+
+from helpers.lazy import lazy_callable
+
+slugify = lazy_callable("slugify", "slugify")
 
 # Default separator
 DEFAULT_SEPARATOR = "_"
@@ -1,4 +1,8 @@
 from api.data.cache_helpers import *
 from api.data.df_cached import *
 from api.data.df import *
+from api.data.df_async import *
+from api.data.df_cube import *
+from api.data.df_index import *
 from api.data.np import *
+from api.data.df_page import *
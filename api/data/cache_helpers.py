@@ -1,22 +1,64 @@
 import xlwings as xw
 import pandas as pd
-import os
+import time
 
-from helpers.pd import auto_load, get_cache_path,  auto_cache, DF_REGISTRY
+from helpers.pd import auto_load, auto_cache, DF_REGISTRY, set_read_workers, set_cache_policy, parse_kwargs, \
+    optimize_dtypes, memory_report, DF_MEMORY_STATS, refresh_manifest, entry_value, \
+    drop_frame, set_registry_backend, SHARED_STORE, frame_fingerprint, is_unchanged, appended_rows, \
+    append_frame, append_memory_stats, compact_frame
+from helpers.cube import drop_cubes
+from helpers.index import drop_indexes
+from helpers.page import drop_orders
+from helpers.warm import warm_status
+from helpers.encode import encode_result
 
 # ---------- PERSISTENCE APIS ----------
 
 
 @xw.func
 @xw.arg('df', pd.DataFrame, index=False)
-def DF_LOAD(df_name: str, df):
-    """Load Excel range into memory and cache"""
-    auto_cache(df_name, df)
+def DF_LOAD(df_name: str, df, optimize=False, append=False, dates=False):
+    """
+    Load Excel range into memory and cache.
+    optimize: store exact floats as float32 and repeated strings as
+              categories to save memory (see DF_MEMORY_REPORT). Off by default:
+              arithmetic on float32 columns is less precise, filling a category
+              column needs an existing category, and grouping by one lists
+              every category, also those with no rows
+    dates: also turn numeric columns named like dates ("Order Date", "ship_dt")
+           whose values are all Excel serial days into datetimes
+    If the range is unchanged since the last load (same content hash and
+    options) nothing is rewritten and the cached version stays current, so
+    results derived from it (cubes, indexes, async jobs) remain valid.
+    append: if the range is the previously loaded one plus rows at the
+            bottom, only the new rows are ingested and cached (as a fragment)
+    """
+    start = time.perf_counter()
+    fingerprint = frame_fingerprint(df, bool(optimize), bool(dates))
+    if is_unchanged(df_name, fingerprint):
+        return f"{df_name} unchanged ({df.shape[0]} rows, {df.shape[1]} cols)"
+    n = appended_rows(df_name, df, bool(optimize), bool(dates)) if append else None
+    if n:
+        raw = df.iloc[n:]
+        rows = optimize_dtypes(raw, dates=bool(dates)) if optimize else raw
+        try:
+            combined = append_frame(df_name, rows, time.perf_counter() - start, fingerprint)
+        except (ValueError, TypeError):
+            pass  # new rows don't fit the cached dtypes: reload in full
+        else:
+            if optimize:
+                append_memory_stats(df_name, raw, combined)
+            return f"{df_name} appended ({len(rows)} new rows, {df.shape[0]} rows, {df.shape[1]} cols)"
+    if optimize:
+        df = optimize_dtypes(df, name=df_name, dates=bool(dates))
+    else:
+        DF_MEMORY_STATS.pop(df_name, None)
+    auto_cache(df_name, df, rebuild_cost=time.perf_counter() - start, fingerprint=fingerprint)
     return f"{df_name} loaded ({df.shape[0]} rows, {df.shape[1]} cols)"
 
 
 @xw.func
-@xw.ret(index=False)
+@xw.ret("raw")
 def DF_GET(name: str):
     """
     Retrieve a previously persisted DataFrame by name.
@@ -24,7 +66,7 @@ def DF_GET(name: str):
         =DF_GET("Employees_30")
     """
     try:
-        return auto_load(name)
+        return encode_result(auto_load(name), index=False)
     except Exception as e:
         return f"DF_GET error: {e}"
 
@@ -52,10 +94,123 @@ def DF_LIST():
         return f"DF_LIST error: {e}"
 
 
+@xw.func
+@xw.ret(index=False)
+def DF_MEMORY_REPORT(name: str):
+    """
+    Per-column memory (bytes) before and after ingest optimization.
+    Example:
+        =DF_MEMORY_REPORT("sales")
+    """
+    try:
+        return memory_report(name)
+    except Exception as e:
+        return f"DF_MEMORY_REPORT error: {e}"
+
+
 @xw.func
 def DF_UNLOAD(df_name: str):
-    DF_REGISTRY.pop(df_name, None)
-    path = get_cache_path(df_name)
-    if os.path.exists(path):
-        os.remove(path)
+    DF_MEMORY_STATS.pop(df_name, None)
+    drop_frame(df_name)
+    drop_cubes(df_name)
+    drop_indexes(df_name)
+    drop_orders(df_name)
     return f"{df_name} unloaded"
+
+
+@xw.func
+@xw.ret(index=False)
+def DF_CACHE_MANIFEST():
+    """
+    Show the on-disk cache manifest: size, last access, rebuild cost and the
+    eviction value of every cached frame (lowest value is evicted first).
+    """
+    try:
+        rows = [
+            {"name": name, "size_mb": e["size"] / 1e6,
+             "last_access": pd.Timestamp(e["last_access"], unit="s"),
+             "rebuild_cost_s": e["rebuild_cost"], "value": entry_value(e),
+             "fragments": len(e.get("fragments", []))}
+            for name, e in refresh_manifest().items()
+        ]
+        return pd.DataFrame(rows, columns=["name", "size_mb", "last_access", "rebuild_cost_s", "value", "fragments"])
+    except Exception as e:
+        return f"DF_CACHE_MANIFEST error: {e}"
+
+
+@xw.func
+def DF_CACHE_READ_WORKERS(n: int):
+    """
+    Set how many threads decode a large cached frame when it is read back from disk.
+    Example:
+        =DF_CACHE_READ_WORKERS(8)
+    """
+    try:
+        return f"Parquet read workers set to {set_read_workers(n)}"
+    except Exception as e:
+        return f"DF_CACHE_READ_WORKERS error: {e}"
+
+
+@xw.func
+def DF_CACHE_POLICY(kwargs_in="{}"):
+    """
+    Update the parquet write policy used for cached frames and show the result.
+    Keys: compression, compression_level, column_compression, category_max_ratio
+    Example:
+        =DF_CACHE_POLICY("{'compression': 'zstd', 'compression_level': 9}")
+    """
+    try:
+        policy = set_cache_policy(**parse_kwargs(kwargs_in))
+        return [[k, str(v)] for k, v in policy.items()]
+    except Exception as e:
+        return f"DF_CACHE_POLICY error: {e}"
+
+
+@xw.func
+def DF_CACHE_COMPACT(df_name: str):
+    """
+    Merge the appended fragments of a cached frame back into one parquet file
+    (also done automatically every few appends). The frame's version is kept.
+    """
+    try:
+        done = compact_frame(df_name)
+        return f"{df_name} compacted" if done else f"{df_name}: nothing to compact"
+    except Exception as e:
+        return f"DF_CACHE_COMPACT error: {e}"
+
+
+@xw.func
+def DF_REGISTRY_BACKEND(mode: str = "local"):
+    """
+    Switch the frame registry between "local" (per process) and "shared"
+    (frames published to shared memory, attachable by other Excel instances
+    and worker processes without copying).
+    """
+    try:
+        return f"Registry backend: {set_registry_backend(mode)}"
+    except Exception as e:
+        return f"DF_REGISTRY_BACKEND error: {e}"
+
+
+@xw.func
+def DF_SHARED_LIST():
+    """
+    List frames currently published to shared memory (vertical list).
+    """
+    try:
+        return [[k] for k in SHARED_STORE.names()]
+    except Exception as e:
+        return f"DF_SHARED_LIST error: {e}"
+
+
+@xw.func
+def DF_WARM_STATUS():
+    """
+    State of the warm start: frames and modules prefetched in the background
+    from the previous session, and how long it took.
+    """
+    try:
+        status = warm_status()
+        return [[k, ", ".join(map(str, v)) if isinstance(v, list) else str(v)] for k, v in status.items()]
+    except Exception as e:
+        return f"DF_WARM_STATUS error: {e}"
@@ -1,9 +1,9 @@
 import pandas as pd
 import xlwings as xw
 import io
-from typing import Union, List, Mapping, cast, Callable
 
 from helpers.pd import parse_kwargs
+from helpers.agg import groupby_agg, parallel_pivot_table
 
 
 @xw.func
@@ -98,11 +98,7 @@ def DF_STD_GROUPBY(df: pd.DataFrame, by, cols=None, funcs=None):
         else:
             agg_funcs = [f for f in funcs if f]
 
-        # Build aggregation mapping
-        agg_dict = cast(Mapping[str, Union[str, Callable, List[Union[str, Callable]]]], {
-                        col: agg_funcs for col in agg_cols})
-
-        result = df.groupby(by_cols).agg(agg_dict).reset_index(drop=True)
+        result = groupby_agg(df, by_cols, agg_cols, agg_funcs).reset_index(drop=True)
 
         # Flatten MultiIndex if multiple agg funcs
         if isinstance(result.columns, pd.MultiIndex):
@@ -136,7 +132,8 @@ def DF_STD_QUERY(df: pd.DataFrame, expr: str):
 def DF_STD_PIVOT(df: pd.DataFrame, kwargs_in="{}"):
     try:
         params = parse_kwargs(kwargs_in)
-        return df.pivot_table(**params)
+        result = parallel_pivot_table(df, params)
+        return result if result is not None else df.pivot_table(**params)
     except Exception as e:
         return f"DF_STD_PIVOT error: {e}"
 
@@ -0,0 +1,86 @@
+import xlwings as xw
+
+from helpers.pd import frame_token
+from helpers.jobs import submit_job, make_job_id, job_status, job_result, job_error, cancel_job, list_jobs
+from api.data.df_cached import DF_GROUPBY, DF_PIVOT, DF_STATS, DF_SORT, DF_QUERY, DF_DESCRIBE, DF_VALUE_COUNTS
+
+# op name -> DF_* function; extra DF_ASYNC args are passed through positionally
+ASYNC_OPS = {
+    "GROUPBY": DF_GROUPBY,        # by, cols, funcs
+    "PIVOT": DF_PIVOT,            # kwargs_in
+    "STATS": DF_STATS,            # mode, kwargs_in
+    "SORT": DF_SORT,              # kwargs_in
+    "QUERY": DF_QUERY,            # expr
+    "DESCRIBE": DF_DESCRIBE,      # kwargs_in
+    "VALUE_COUNTS": DF_VALUE_COUNTS,  # kwargs_in
+}
+
+
+def _freeze(v):
+    if isinstance(v, list):
+        return tuple(_freeze(x) for x in v)
+    return v
+
+
+@xw.func
+def DF_ASYNC(op: str, src_name: str, arg1=None, arg2=None, arg3=None, timeout=None):
+    """
+    Run a heavy DF_* operation in the background and return a job id at once.
+    Poll it with DF_RESULT(job_id). Recalculating with the same inputs (and
+    the same version of src_name) returns the same job instead of starting over.
+
+    Example:
+        =DF_ASYNC("GROUPBY", "sales", "Region", "Amount", "sum")
+        =DF_ASYNC("STATS", "sales", "corr", "{'numeric_only': True}", , 120)
+    """
+    try:
+        key = str(op).upper()
+        if key not in ASYNC_OPS:
+            return f"DF_ASYNC error: Unsupported op '{op}' (use {', '.join(ASYNC_OPS)})"
+        args = [arg1, arg2, arg3]
+        while args and args[-1] is None:
+            args.pop()
+        job_id = make_job_id(key, src_name, frame_token(src_name), tuple(_freeze(a) for a in args))
+        return submit_job(job_id, f"{key} {src_name}", ASYNC_OPS[key], src_name, *args, timeout=timeout)
+    except Exception as e:
+        return f"DF_ASYNC error: {e}"
+
+
+@xw.func(volatile=True)
+def DF_RESULT(job_id: str):
+    """
+    Result of a DF_ASYNC job, or its status ("queued", "running", ...) until
+    it finishes. Volatile, so it refills on the next recalculation.
+    """
+    try:
+        status = job_status(job_id)
+        if status == "done":
+            return job_result(job_id)
+        if status == "error":
+            return f"DF_RESULT error: {job_error(job_id)}"
+        return f"{job_id}: {status}"
+    except Exception as e:
+        return f"DF_RESULT error: {e}"
+
+
+@xw.func
+def DF_CANCEL(job_id: str):
+    """
+    Cancel a DF_ASYNC job. Queued jobs never run; a running job's result is discarded.
+    """
+    try:
+        return f"{job_id}: {cancel_job(job_id)}"
+    except Exception as e:
+        return f"DF_CANCEL error: {e}"
+
+
+@xw.func(volatile=True)
+@xw.ret(index=False)
+def DF_JOBS():
+    """
+    Table of background jobs with status and timings.
+    """
+    try:
+        return list_jobs()
+    except Exception as e:
+        return f"DF_JOBS error: {e}"
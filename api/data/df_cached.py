@@ -2,9 +2,13 @@ from operator import index
 import pandas as pd
 import xlwings as xw
 import io
-from typing import Union, List, Mapping, cast, Callable
 
-from helpers.pd import auto_load, parse_kwargs, auto_cache
+from helpers.pd import auto_load, auto_load_with_token, parse_kwargs, auto_cache
+from helpers.agg import groupby_agg, parallel_pivot_table
+from helpers.cube import find_cube, rollup
+from helpers.index import query_via_index
+from helpers.trace import span
+from helpers.encode import encode_result
 
 
 @xw.func
@@ -80,7 +84,8 @@ def DF_GROUPBY(src_name: str, by, cols=None, funcs=None):
 
     Returns
     -------
-    DataFrame grouped and aggregated.
+    DataFrame grouped and aggregated. Rolled up from a DF_CUBE_BUILD cube
+    when one covers `by` and `cols` and all funcs are decomposable.
     """
     try:
         df = auto_load(src_name)
@@ -104,11 +109,14 @@ def DF_GROUPBY(src_name: str, by, cols=None, funcs=None):
         else:
             agg_funcs = [f for f in funcs if f]
 
-         # Build aggregation mapping
-        agg_dict = cast(Mapping[str, Union[str, Callable, List[Union[str, Callable]]]], {
-                        col: agg_funcs for col in agg_cols})
-
-        result = df.groupby(by_cols).agg(agg_dict)
+        with span("compute", by=by_cols) as s:
+            cube = find_cube(src_name, by_cols, agg_cols, agg_funcs)
+            if cube is not None:
+                s.set(path="cube rollup")
+                result = rollup(cube, by_cols, agg_cols, agg_funcs)
+            else:
+                s.set(path="groupby_agg")
+                result = groupby_agg(df, by_cols, agg_cols, agg_funcs)
 
         # Flatten MultiIndex if multiple agg funcs
         if isinstance(result.columns, pd.MultiIndex):
@@ -132,10 +140,20 @@ def DF_SORT(src_name: str, kwargs_in="{}"):
 
 
 @xw.func
+@xw.ret("raw")
 def DF_QUERY(src_name: str, expr: str):
+    """
+    df.query(expr). Equality, `in` and range tests on columns indexed with
+    DF_INDEX_CREATE are answered by index probes instead of a full scan.
+    """
     try:
-        df = auto_load(src_name)
-        return df.query(expr)
+        df, token = auto_load_with_token(src_name)
+        with span("compute", expr=expr) as s:
+            result = query_via_index(src_name, df, expr, token)
+            s.set(path="index" if result is not None else "scan")
+            if result is None:
+                result = df.query(expr)
+        return encode_result(result)
     except Exception as e:
         return f"DF_QUERY error: {e}"
 
@@ -145,7 +163,10 @@ def DF_PIVOT(src_name: str, kwargs_in="{}"):
     try:
         df = auto_load(src_name)
         params = parse_kwargs(kwargs_in)
-        return df.pivot_table(**params)
+        with span("compute") as s:
+            result = parallel_pivot_table(df, params)
+            s.set(path="parallel" if result is not None else "pivot_table")
+            return result if result is not None else df.pivot_table(**params)
     except Exception as e:
         return f"DF_PIVOT error: {e}"
 
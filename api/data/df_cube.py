@@ -0,0 +1,53 @@
+import xlwings as xw
+
+from helpers.cube import build_cube, drop_cubes, list_cubes
+
+
+def _as_cols(v):
+    if v is None or v == "":
+        return None
+    return [v] if isinstance(v, str) else [x for x in v if x]
+
+
+@xw.func
+def DF_CUBE_BUILD(src_name: str, dims, measures=None):
+    """
+    Pre-aggregate src_name over dims so later DF_GROUPBY calls on any subset
+    of dims (sum/count/min/max/mean of the measures) are rolled up from the
+    cube instead of scanning the frame. Reloading src_name invalidates it.
+
+    Example:
+        =DF_CUBE_BUILD("sales", {"Region","Month","Product"}, {"Amount","Qty"})
+    """
+    try:
+        dim_cols = _as_cols(dims)
+        if not dim_cols:
+            return "DF_CUBE_BUILD error: dims required"
+        cube = build_cube(src_name, dim_cols, _as_cols(measures))
+        return (f"{src_name} cube built ({len(cube['partials'])} cells from "
+                f"{cube['source_rows']} rows, dims: {', '.join(map(str, cube['dims']))})")
+    except Exception as e:
+        return f"DF_CUBE_BUILD error: {e}"
+
+
+@xw.func
+def DF_CUBE_DROP(src_name: str, dims=None):
+    """
+    Drop the cube of src_name over dims, or all of its cubes if dims is empty.
+    """
+    try:
+        return f"{src_name}: {drop_cubes(src_name, _as_cols(dims))} cube(s) dropped"
+    except Exception as e:
+        return f"DF_CUBE_DROP error: {e}"
+
+
+@xw.func
+@xw.ret(index=False)
+def DF_CUBE_LIST():
+    """
+    Table of cubes with their dims, measures, size and whether they are stale.
+    """
+    try:
+        return list_cubes()
+    except Exception as e:
+        return f"DF_CUBE_LIST error: {e}"
@@ -0,0 +1,75 @@
+import xlwings as xw
+
+from helpers.pd import auto_load_with_token
+from helpers.index import create_index, drop_indexes, list_indexes, lookup_positions
+
+
+@xw.func
+def DF_INDEX_CREATE(src_name: str, column: str, kind="hash"):
+    """
+    Build a secondary index on src_name[column], kept in memory and saved
+    next to the cached frame. DF_QUERY and DF_LOOKUP use it automatically.
+    kind: "hash" (equality, O(1)) or "sorted" (equality and ranges, O(log n))
+
+    Example:
+        =DF_INDEX_CREATE("orders", "customer_id")
+        =DF_INDEX_CREATE("orders", "order_date", "sorted")
+    """
+    try:
+        index = create_index(src_name, column, kind)
+        keys = len(index["hash"]) if index["kind"] == "hash" else len(index["keys"])
+        where = "memory + cache" if index.get("persisted") else "memory"
+        return f"{src_name}.{column}: {index['kind']} index on {keys} keys ({where})"
+    except Exception as e:
+        return f"DF_INDEX_CREATE error: {e}"
+
+
+@xw.func
+def DF_INDEX_DROP(src_name: str, column=None):
+    """
+    Forget the in-memory index on column (or all indexes of src_name).
+    Saved index files go away with the cached version they belong to.
+    """
+    try:
+        return f"{src_name}: {drop_indexes(src_name, column or None)} index(es) dropped"
+    except Exception as e:
+        return f"DF_INDEX_DROP error: {e}"
+
+
+@xw.func
+@xw.ret(index=False)
+def DF_INDEX_LIST():
+    """
+    Table of in-memory indexes.
+    """
+    try:
+        return list_indexes()
+    except Exception as e:
+        return f"DF_INDEX_LIST error: {e}"
+
+
+@xw.func
+def DF_LOOKUP(src_name: str, key_col: str, key, return_col: str):
+    """
+    First value of return_col where key_col == key, via a hash index on
+    key_col (built on first use). key may be a range: one result per key.
+
+    Example:
+        =DF_LOOKUP("orders", "customer_id", A2, "name")
+    """
+    try:
+        df, token = auto_load_with_token(src_name)
+        col = df.columns.get_loc(return_col)
+
+        def first(k):
+            positions = lookup_positions(src_name, key_col, k, df, token)
+            return df.iat[positions[0], col] if len(positions) else None
+
+        if isinstance(key, list):
+            return [[first(k)] for k in key]
+        positions = lookup_positions(src_name, key_col, key, df, token)
+        if len(positions) == 0:
+            return f"DF_LOOKUP error: '{key}' not found in {key_col}"
+        return df.iat[positions[0], col]
+    except Exception as e:
+        return f"DF_LOOKUP error: {e}"
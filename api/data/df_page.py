@@ -0,0 +1,57 @@
+import xlwings as xw
+
+from helpers.encode import encode_result
+from helpers.page import page, frame_rows
+
+
+@xw.func
+@xw.ret("raw")
+def DF_PAGE(src_name: str, offset=0, limit=1000, sort_by=None):
+    """
+    Rows offset .. offset + limit - 1 (0-based) of a named frame, with its
+    header. Only that slice is read out of the frame and sent to Excel.
+    sort_by: "col", "-col" (descending) or "col1, -col2"; the sort is done
+             once and reused by every page until the frame is reloaded
+
+    Example:
+        =DF_PAGE("orders", 0, 500, "-amount")
+    """
+    try:
+        return encode_result(page(src_name, offset, limit, sort_by), index=False)
+    except Exception as e:
+        return f"DF_PAGE error: {e}"
+
+
+@xw.func
+@xw.ret("raw")
+def DF_WINDOW(src_name: str, position=0, size=50, sort_by=None):
+    """
+    Fixed-size window for scrollbar navigation: `size` rows starting at
+    position (0-based, clamped so the window stays full), plus the header.
+    Always returns size rows (blank-padded), so the spill range never
+    changes size while scrolling. Link a scroll bar to the position cell
+    with its maximum set to =DF_ROWS(src_name) - size.
+
+    Example:
+        =DF_WINDOW("orders", $B$1, 40, "customer, -date")
+    """
+    try:
+        size = max(1, int(size))
+        start = min(max(0, int(position)), max(0, frame_rows(src_name) - size))
+        out = encode_result(page(src_name, start, size, sort_by), index=False)
+        width = len(out[0])
+        return out + [[""] * width for _ in range(size + 1 - len(out))]
+    except Exception as e:
+        return f"DF_WINDOW error: {e}"
+
+
+@xw.func
+def DF_ROWS(src_name: str):
+    """
+    Number of rows of a named frame, without loading it if it is only on
+    disk (read from the cached parquet footers).
+    """
+    try:
+        return frame_rows(src_name)
+    except Exception as e:
+        return f"DF_ROWS error: {e}"
@@ -1,16 +1,35 @@
 import xlwings as xw
 import numpy as np
 
-# Helper to convert Excel input to a proper NumPy array
-
-
-def _to_array(data, dtype=float):
-    arr = np.array(data)
-    if arr.ndim == 0:
-        arr = np.array([arr], dtype=dtype)
-    else:
-        arr = arr.astype(dtype)
-    return arr
+from helpers.encode import encode_result
+# Excel input -> typed, read-only NumPy array (float with NaN blanks, dates,
+# or text), converted once per range and recalc; see helpers/arrays.py
+from helpers.arrays import to_array as _to_array, blank_mask
+
+
+def _truthy(arr):
+    """Excel truthiness of a condition range: blanks are FALSE."""
+    if arr.dtype.kind == "U":
+        return arr != ""
+    if arr.dtype.kind == "O":  # numbers and text
+        return (arr != "") & (arr != 0)
+    return ~blank_mask(arr) & (arr.astype(bool) if arr.dtype.kind == "f" else True)
+
+
+def _sort_order(arr):
+    """
+    argsort along the last axis with blank cells last (NaN / NaT already sort
+    last); in a range of numbers and text, numbers come first as in Excel.
+    """
+    if arr.dtype.kind == "O":
+        blanks = blank_mask(arr)
+        is_text = np.vectorize(lambda v: isinstance(v, str), otypes=[bool])(arr) & ~blanks
+        numbers = np.where(is_text | blanks, np.nan, arr).astype(float)
+        text = np.where(is_text, arr, "").astype(str)
+        return np.lexsort((text, numbers, is_text, blanks))
+    if arr.dtype.kind != "U":
+        return np.argsort(arr, kind="stable")
+    return np.lexsort((arr, blank_mask(arr)))
 
 # ------------------------
 # Random Generators
@@ -28,36 +47,35 @@ def NP_RANDOM_INT(low: int, high: int):
 
 
 @xw.func
-@xw.ret(expand='table')
+@xw.ret("raw", expand='table')
 def NP_RANDOM_ARRAY(low: float, high: float, size: int):
-    return np.random.uniform(low, high, size).tolist()
+    return encode_result(np.random.uniform(low, high, size))
 
 
 @xw.func
-@xw.ret(expand='table')
+@xw.ret("raw", expand='table')
 def NP_RANDOM_INT_ARRAY(low: int, high: int, size: int):
-    return np.random.randint(low, high, size).tolist()
+    return encode_result(np.random.randint(low, high, size))
 
 
 @xw.func
-@xw.ret(expand='table')
+@xw.ret("raw", expand='table')
 def NP_RANDOM_NORMAL(mean: float, std: float, size: int):
-    return np.random.normal(mean, std, size).tolist()
+    return encode_result(np.random.normal(mean, std, size))
 
 
 @xw.func
-@xw.ret(expand='table')
+@xw.ret("raw", expand='table')
 def NP_RANDOM_CHOICE(data, size: int, replace: bool = True):
     arr = _to_array(data)
-    return np.random.choice(arr, size=size, replace=replace).tolist()
+    return encode_result(np.random.choice(arr, size=size, replace=replace))
 
 
 @xw.func
-@xw.ret(expand='table')
+@xw.ret("raw", expand='table')
 def NP_RANDOM_SHUFFLE(data):
-    arr = _to_array(data)
-    np.random.shuffle(arr)
-    return arr.tolist()
+    arr = np.random.permutation(_to_array(data))  # the converted array is shared, shuffle a copy
+    return encode_result(arr)
 
 
 @xw.func
@@ -71,21 +89,21 @@ def NP_RANDOM_SEED(seed: int):
 
 
 @xw.func
-@xw.ret(expand='table')
+@xw.ret("raw", expand='table')
 def NP_RANDOM_BINOMIAL(n: int, p: float, size: int):
-    return np.random.binomial(n, p, size).tolist()
+    return encode_result(np.random.binomial(n, p, size))
 
 
 @xw.func
-@xw.ret(expand='table')
+@xw.ret("raw", expand='table')
 def NP_RANDOM_POISSON(lam: float, size: int):
-    return np.random.poisson(lam, size).tolist()
+    return encode_result(np.random.poisson(lam, size))
 
 
 @xw.func
-@xw.ret(expand='table')
+@xw.ret("raw", expand='table')
 def NP_RANDOM_EXPONENTIAL(sc: float, size: int):
-    return np.random.exponential(sc, size).tolist()
+    return encode_result(np.random.exponential(sc, size))
 
 # ------------------------
 # Array Utilities
@@ -95,43 +113,48 @@ def NP_RANDOM_EXPONENTIAL(sc: float, size: int):
 @xw.func
 def NP_MEAN(data):
     arr = _to_array(data)
-    return np.mean(arr)
+    return np.nanmean(arr)
 
 
 @xw.func
 def NP_MEDIAN(data):
     arr = _to_array(data)
-    return np.median(arr)
+    return np.nanmedian(arr)
 
 
 @xw.func
 def NP_STD(data):
     arr = _to_array(data)
-    return np.std(arr)
+    return np.nanstd(arr)
 
 
 @xw.func
 def NP_SUM(data):
     arr = _to_array(data)
-    return np.sum(arr)
+    return np.nansum(arr)
 
 
 @xw.func
 def NP_MIN(data):
     arr = _to_array(data)
-    return np.min(arr)
+    return np.nanmin(arr)
 
 
 @xw.func
 def NP_MAX(data):
     arr = _to_array(data)
-    return np.max(arr)
+    return np.nanmax(arr)
 
 
 @xw.func
+@xw.ret("raw")
 def NP_UNIQUE(data):
     arr = _to_array(data)
-    return np.unique(arr).tolist()
+    values = arr[~blank_mask(arr)]
+    if arr.dtype.kind == "O":  # numbers and text don't compare: dedupe, then sort numbers first
+        values = np.array(list(dict.fromkeys(values)), dtype=object)
+        return encode_result(values[_sort_order(values)])
+    return encode_result(np.unique(values))
 
 # ------------------------
 # Array Transformations
@@ -139,32 +162,32 @@ def NP_UNIQUE(data):
 
 
 @xw.func
-@xw.ret(expand='table')
+@xw.ret("raw", expand='table')
 def NP_FLATTEN(data):
     arr = _to_array(data)
-    return arr.flatten().tolist()
+    return encode_result(arr.flatten())
 
 
 @xw.func
-@xw.ret(expand='table')
+@xw.ret("raw", expand='table')
 def NP_SORT(data):
     arr = _to_array(data)
-    return np.sort(arr).tolist()
+    return encode_result(np.take_along_axis(arr, _sort_order(arr), axis=-1))
 
 
 @xw.func
-@xw.ret(expand='table')
+@xw.ret("raw", expand='table')
 def NP_ARGSORT(data):
     arr = _to_array(data)
-    return np.argsort(arr).tolist()
+    return encode_result(_sort_order(arr))
 
 
 @xw.func
-@xw.ret(expand='table')
+@xw.ret("raw", expand='table')
 def NP_RESIZE(data, rows: int, cols: int):
     arr = _to_array(data)
     reshaped = np.resize(arr, (rows, cols))
-    return reshaped.tolist()
+    return encode_result(reshaped)
 
 # ------------------------
 # Logical Utilities
@@ -172,15 +195,15 @@ def NP_RESIZE(data, rows: int, cols: int):
 
 
 @xw.func
-@xw.ret(expand='table')
+@xw.ret("raw", expand='table')
 def NP_WHERE(condition_array, value_if_true=1, value_if_false=0):
     arr = _to_array(condition_array)
-    return np.where(arr, value_if_true, value_if_false).tolist()
+    return encode_result(np.where(_truthy(arr), value_if_true, value_if_false))
 
 
 @xw.func
-@xw.ret(expand='table')
+@xw.ret("raw", expand='table')
 def NP_ISIN(data, test_elements):
     arr = _to_array(data)
     test = _to_array(test_elements)
-    return np.isin(arr, test).tolist()
+    return encode_result(np.isin(arr, test))
@@ -1,10 +1,8 @@
 import xlwings as xw
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 
-from helpers.pd import auto_load, parse_kwargs
-from helpers.plot import plot_wrapper
+from helpers.pd import auto_load_with_token, parse_kwargs, frame_fingerprint
+from helpers.plot import plot_wrapper, render_batch, insert_figure
 
 
 @xw.func
@@ -13,15 +11,19 @@ def DF_PLOT(src_name: str, kind: str, plot_name: str,  kwargs_in="{}"):
     kind      : str, type of plot ("line", "bar", "box", "violin", "hist", "count", "scatter", "reg", "heatmap", "pairplot")
     src_name  : str, registered DataFrame name (loaded via auto_load)
     kwargs_in : str, Excel-friendly kwargs dictionary, e.g. '{"x": "col1", "y": "col2", "hue": "col3"}'
+                plus "max_points" (rows kept for big frames, 0 = all) and "reduce"
+                ("lttb"/"minmax" for lines, "sample"/"hexbin" for scatter, "none")
     """
     try:
         # Load DataFrame
-        df = auto_load(src_name)
+        df, token = auto_load_with_token(src_name)
 
         # Parse kwargs from Excel string
         params = parse_kwargs(kwargs_in)
 
-        return plot_wrapper(kind, df, plot_name, params)
+        # same copy of the frame -> same figure
+        data_key = ("frame", src_name, token) if token else None
+        return plot_wrapper(kind, df, plot_name, params, data_key)
 
     except Exception as e:
         return f"PLOT error: {e}"
@@ -33,12 +35,49 @@ def SNS_PLOT(df: pd.DataFrame, kind: str, plot_name: str,  kwargs_in="{}"):
     kind      : str, type of plot ("line", "bar", "box", "violin", "hist", "count", "scatter", "reg", "heatmap", "pairplot")
     src_name  : str, registered DataFrame name (loaded via auto_load)
     kwargs_in : str, Excel-friendly kwargs dictionary, e.g. '{"x": "col1", "y": "col2", "hue": "col3"}'
+                plus "max_points" (rows kept for big frames, 0 = all) and "reduce"
+                ("lttb"/"minmax" for lines, "sample"/"hexbin" for scatter, "none")
     """
     try:
         # Parse kwargs from Excel string
         params = parse_kwargs(kwargs_in)
 
-        return plot_wrapper(kind, df, plot_name, params)
+        fingerprint = frame_fingerprint(df)
+        data_key = ("range", fingerprint) if fingerprint else None
+        return plot_wrapper(kind, df, plot_name, params, data_key)
 
     except Exception as e:
         return f"PLOT error: {e}"
+
+
+@xw.func
+@xw.arg("spec_range", ndim=2)
+def DF_PLOT_BATCH(spec_range):
+    """
+    Render a whole dashboard at once: every row of spec_range is
+    (src_name, kind, plot_name, kwargs_in), an optional header row is skipped.
+    Figures render concurrently in worker processes; the pictures are then
+    inserted on the caller's sheet in one pass. Returns (plot_name, status) rows.
+
+    Example:
+        =DF_PLOT_BATCH(A2:D26)
+    """
+    try:
+        rows = [r for r in spec_range if r and r[0]]
+        if rows and str(rows[0][0]).strip().lower() in ("src", "src_name", "source"):
+            rows = rows[1:]
+        specs = []
+        for r in rows:
+            r = list(r) + [None] * (4 - len(r))
+            specs.append((str(r[0]), str(r[1]), str(r[2] or f"{r[0]}_{r[1]}"), parse_kwargs(r[3] or "{}")))
+
+        sht = xw.Book.caller().sheets.active
+        out = []
+        for name, png, status in render_batch(specs):
+            if png is not None:
+                insert_figure(png, name=name, sht=sht)
+            out.append([name, status])
+        return out or "DF_PLOT_BATCH error: no plots in range"
+
+    except Exception as e:
+        return f"DF_PLOT_BATCH error: {e}"
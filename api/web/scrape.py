@@ -1,19 +1,17 @@
 import re
-import requests
-from bs4 import BeautifulSoup
+from importlib.util import find_spec
 import xlwings as xw
 
+from helpers.lazy import lazy_import, lazy_callable
 from helpers.pd import parse_kwargs
 from helpers.web import cache_html, load_html, extract_text_xpath, extract_list_xpath
 
-# Optional Selenium for JS pages
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-SELENIUM_AVAILABLE = True
+# requests and bs4 load on the first fetch/parse
+requests = lazy_import("requests")
+BeautifulSoup = lazy_callable("bs4", "BeautifulSoup")
+
+# Optional Selenium for JS pages, imported by WEB_FETCH_JS itself
+SELENIUM_AVAILABLE = find_spec("selenium") is not None
 
 
 # -------------------------
@@ -53,6 +51,13 @@ def WEB_FETCH_JS(source_name: str,  url: str, kwargs_in=None):
         return "Error: Selenium not installed"
     kwargs = parse_kwargs(kwargs_in)
     try:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
         driver_path = kwargs.get('driver_path', 'chromedriver')
         wait_selector = kwargs.get('wait_selector', None)
         wait_time = kwargs.get('wait_time', 10)
@@ -0,0 +1,65 @@
+"""DF_* (named, cached frames) and DF_STD_* (frames passed in) UDFs."""
+import pytest
+
+from api.data.cache_helpers import DF_LOAD, DF_GET
+from api.data.df_cached import DF_HEAD, DF_DESCRIBE, DF_GROUPBY, DF_SORT, DF_QUERY, DF_PIVOT, DF_VALUE_COUNTS, \
+    DF_STATS
+from api.data.df_page import DF_PAGE, DF_WINDOW
+from api.data.df import DF_STD_DESCRIBE, DF_STD_GROUPBY, DF_STD_SORT, DF_STD_QUERY, DF_STD_PIVOT, \
+    DF_STD_VALUE_COUNTS, DF_STD_STATS
+from helpers.pd import DF_REGISTRY
+
+PIVOT = "{'index': 'region', 'columns': 'product', 'values': 'qty', 'aggfunc': 'sum'}"
+
+DF_CASES = {
+    "DF_HEAD": (DF_HEAD, "{'n': 100}"),
+    "DF_DESCRIBE": (DF_DESCRIBE, "{}"),
+    "DF_GROUPBY": (DF_GROUPBY, ["region", "product"], ["qty", "price"], ["sum", "mean"]),
+    "DF_SORT": (DF_SORT, "{'by': ['region', 'price']}"),
+    "DF_QUERY": (DF_QUERY, "qty > 50 and region == 'North'"),
+    "DF_PIVOT": (DF_PIVOT, PIVOT),
+    "DF_VALUE_COUNTS": (DF_VALUE_COUNTS, "{'subset': ['region', 'product']}"),
+    "DF_STATS": (DF_STATS, "corr", "{'numeric_only': True}"),
+    "DF_PAGE": (DF_PAGE, 500, 100, "region, -price"),  # sort order cached after the first call
+    "DF_WINDOW": (DF_WINDOW, 10**9, 40, "-qty"),
+}
+
+STD_CASES = {
+    "DF_STD_DESCRIBE": (DF_STD_DESCRIBE, "{}"),
+    "DF_STD_GROUPBY": (DF_STD_GROUPBY, ["region", "product"], ["qty", "price"], ["sum", "mean"]),
+    "DF_STD_SORT": (DF_STD_SORT, "{'by': ['region', 'price']}"),
+    "DF_STD_QUERY": (DF_STD_QUERY, "qty > 50 and region == 'North'"),
+    "DF_STD_PIVOT": (DF_STD_PIVOT, PIVOT),
+    "DF_STD_VALUE_COUNTS": (DF_STD_VALUE_COUNTS, "{'subset': ['region', 'product']}"),
+    "DF_STD_STATS": (DF_STD_STATS, "corr", "{'numeric_only': True}"),
+}
+
+
+@pytest.mark.benchmark(group="DF")
+@pytest.mark.parametrize("case", list(DF_CASES))
+def bench_df(bench, loaded, scale, case):
+    udf, *args = DF_CASES[case]
+    bench(udf, loaded, *args, cells=scale)
+
+
+@pytest.mark.benchmark(group="DF_STD")
+@pytest.mark.parametrize("case", list(STD_CASES))
+def bench_df_std(bench, frame, scale, case):
+    udf, *args = STD_CASES[case]
+    bench(udf, frame, *args, cells=scale)
+
+
+@pytest.mark.benchmark(group="DF cache")
+def bench_df_load(bench, frame, scale):
+    """Ingest: optimize dtypes, fingerprint, persist to parquet and register."""
+    counter = iter(range(10**6))
+    bench(lambda: DF_LOAD(f"ingest_{scale}_{next(counter)}", frame), cells=scale)
+
+
+@pytest.mark.benchmark(group="DF cache")
+def bench_df_get_from_parquet(bench, loaded, scale):
+    """Registry miss: the frame is read back from the parquet cache."""
+    def cold_get():
+        DF_REGISTRY.pop(loaded, None)
+        return DF_GET(loaded)
+    bench(cold_get, cells=scale)
@@ -0,0 +1,41 @@
+"""DT_* UDFs over a column of Excel serial dates (and ISO strings, the other accepted input)."""
+import numpy as np
+import pytest
+
+from api.common.datetime import DT_ADD_DAYS, DT_ADD_MONTHS, DT_DAYS_BETWEEN, DT_END_OF_MONTH, DT_START_OF_WEEK, \
+    DT_WEEK_NUMBER, DT_QUARTER, DT_IS_BUSINESS_DAY, DT_TO_SERIAL
+from conftest import per_cell
+
+DT_CASES = {
+    "DT_ADD_DAYS": (DT_ADD_DAYS, 30),
+    "DT_ADD_MONTHS": (DT_ADD_MONTHS, 3),
+    "DT_END_OF_MONTH": (DT_END_OF_MONTH,),
+    "DT_START_OF_WEEK": (DT_START_OF_WEEK,),
+    "DT_WEEK_NUMBER": (DT_WEEK_NUMBER,),
+    "DT_QUARTER": (DT_QUARTER,),
+    "DT_IS_BUSINESS_DAY": (DT_IS_BUSINESS_DAY,),
+}
+
+
+def serials(n: int) -> list:
+    """Excel serial dates between 2020 and 2025, as xlwings passes a date column."""
+    return (43831.0 + np.random.default_rng(0).integers(0, 2000, n)).tolist()
+
+
+@pytest.mark.benchmark(group="DT")
+@pytest.mark.parametrize("case", list(DT_CASES))
+def bench_dt(bench, scale, case):
+    udf, *args = DT_CASES[case]
+    bench(per_cell(udf, [(d, *args) for d in serials(scale)]), cells=scale)
+
+
+@pytest.mark.benchmark(group="DT")
+def bench_dt_days_between(bench, scale):
+    starts, ends = serials(scale), serials(scale)[::-1]
+    bench(per_cell(DT_DAYS_BETWEEN, list(zip(starts, ends))), cells=scale)
+
+
+@pytest.mark.benchmark(group="DT")
+def bench_dt_to_serial_iso(bench, scale):
+    iso = [f"2024-{m:02d}-{d:02d}" for m, d in zip(np.arange(scale) % 12 + 1, np.arange(scale) % 28 + 1)]
+    bench(per_cell(DT_TO_SERIAL, [(s,) for s in iso]), cells=scale)
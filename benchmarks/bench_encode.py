@@ -0,0 +1,42 @@
+"""
+Result marshalling: xlwings' per-cell conversion of a returned frame/array
+against encode_result() (helpers/encode.py) handed over with @xw.ret("raw").
+Both go through xlwings.conversion.write on the headless engine.
+"""
+import numpy as np
+import pytest
+from xlwings import conversion
+
+from helpers.encode import encode_result
+
+COLUMNS = 20
+
+
+def _xlwings(value, index):
+    return conversion.write(value, None, {"index": index})
+
+
+def _encoded(value, index):
+    return conversion.write(encode_result(value, index=index), None, {"convert": "raw"})
+
+
+PATHS = {"xlwings": _xlwings, "encode_result": _encoded}
+
+
+@pytest.mark.benchmark(group="encode frame")
+@pytest.mark.parametrize("path", list(PATHS))
+def bench_encode_frame(bench, frame, scale, path):
+    """A DF_GET-sized return: the sales frame widened to COLUMNS columns, with NaN and dates."""
+    wide = frame.copy()
+    for i in range(COLUMNS - wide.shape[1]):
+        wide[f"x{i}"] = wide["price"] * (i + 1)
+    wide.loc[wide.index[::7], "price"] = np.nan
+    bench(PATHS[path], wide, False, cells=wide.size)
+
+
+@pytest.mark.benchmark(group="encode array")
+@pytest.mark.parametrize("path", list(PATHS))
+def bench_encode_array(bench, scale, path):
+    """An NP_* return: a float column of `scale` cells."""
+    arr = np.random.default_rng(0).random((scale, 1))
+    bench(PATHS[path], arr, True, cells=scale)
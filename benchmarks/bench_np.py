@@ -0,0 +1,52 @@
+"""NP_* UDFs on Excel-shaped input: a column range arrives as a list of [value] rows."""
+import numpy as np
+import pytest
+
+from api.data.np import NP_MEAN, NP_MEDIAN, NP_STD, NP_SUM, NP_UNIQUE, NP_SORT, NP_ARGSORT, NP_WHERE, NP_ISIN
+from helpers.arrays import clear_array_cache
+
+REDUCE_CASES = {"NP_MEAN": NP_MEAN, "NP_MEDIAN": NP_MEDIAN, "NP_SUM": NP_SUM, "NP_UNIQUE": NP_UNIQUE}
+ARRAY_CASES = {"NP_SORT": NP_SORT, "NP_ARGSORT": NP_ARGSORT, "NP_WHERE": NP_WHERE}
+
+
+def cold(udf):
+    """udf with the range conversion cache emptied first, so every round converts."""
+    def call(*args):
+        clear_array_cache()
+        return udf(*args)
+    return call
+
+
+@pytest.fixture
+def column(scale):
+    rng = np.random.default_rng(0)
+    return [[v] for v in rng.integers(0, 1000, scale).astype(float).tolist()]
+
+
+@pytest.mark.benchmark(group="NP")
+@pytest.mark.parametrize("case", list(REDUCE_CASES) + list(ARRAY_CASES))
+def bench_np(bench, column, scale, case):
+    udf = REDUCE_CASES.get(case) or ARRAY_CASES[case]
+    bench(cold(udf), column, cells=scale)
+
+
+@pytest.mark.benchmark(group="NP")
+def bench_np_isin(bench, column, scale):
+    bench(cold(NP_ISIN), column, [[float(v)] for v in range(0, 1000, 7)], cells=scale)
+
+
+@pytest.mark.benchmark(group="NP")
+def bench_np_text(bench, scale):
+    """NP_UNIQUE / NP_SORT on a text column with blanks (kept as str, no float cast)."""
+    rng = np.random.default_rng(0)
+    text = [[None if v % 10 == 0 else f"item {v}"] for v in rng.integers(0, 1000, scale).tolist()]
+    bench(cold(lambda: (NP_UNIQUE(text), NP_SORT(text))), cells=scale)
+
+
+@pytest.mark.benchmark(group="NP")
+def bench_np_recalc_same_range(bench, column, scale):
+    """One recalc of NP_MEAN, NP_STD and NP_MEDIAN over one range: converted once."""
+    def recalc():
+        clear_array_cache()
+        return [NP_MEAN(column), NP_STD(column), NP_MEDIAN(column)]
+    bench(recalc, cells=scale)
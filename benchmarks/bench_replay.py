@@ -0,0 +1,14 @@
+"""A synthetic recalc replayed through the headless harness, xlwings conversion included."""
+import pytest
+
+from headless import synthetic_trace, replay
+
+CALLS = 1_000
+
+
+@pytest.mark.benchmark(group="replay")
+def bench_replay(bench, scale):
+    """CALLS mixed per-cell and frame UDF calls on a `scale`-row sales range."""
+    trace = synthetic_trace(CALLS, rows=scale)
+    summary = bench(replay, trace, cells=len(trace), rounds=3)
+    assert summary["errors"].sum() == 0, summary[summary["errors"] > 0]
@@ -0,0 +1,58 @@
+"""RE_*, FZ_* and FAKER_* UDFs."""
+import pytest
+
+from api.common.re import RE_MATCH, RE_SEARCH, RE_FINDALL, RE_SUB, RE_GROUP, RE_COUNT
+from api.common.fuzzy import FZ_RATIO, FZ_TOKEN_SORT_RATIO, FZ_EXTRACT_ONE, FZ_TOP_N, FZ_THRESHOLD, \
+    FZ_CLEAN_EXTRACT_ONE
+from api.common.faker import FAKER_NAME, FAKER_EMAIL, FAKER_ADDRESS, FAKER_UUID
+from conftest import make_frame, per_cell, words
+
+RE_CASES = {
+    "RE_MATCH": (RE_MATCH, r"invoice INV-\d{4}-\d{3}"),
+    "RE_SEARCH": (RE_SEARCH, r"\d+"),
+    "RE_FINDALL": (RE_FINDALL, r"\d+"),
+    "RE_SUB": (RE_SUB, r"\d", "#"),
+    "RE_GROUP": (RE_GROUP, r"(\w+) (\d+)", 2),
+    "RE_COUNT": (RE_COUNT, r"[aeiou]"),
+}
+
+FZ_PAIR_CASES = {"FZ_RATIO": FZ_RATIO, "FZ_TOKEN_SORT_RATIO": FZ_TOKEN_SORT_RATIO}
+# one lookup against a `scale`-long choices column
+FZ_LOOKUP_CASES = {"FZ_EXTRACT_ONE": FZ_EXTRACT_ONE, "FZ_TOP_N": FZ_TOP_N, "FZ_THRESHOLD": FZ_THRESHOLD,
+                   "FZ_CLEAN_EXTRACT_ONE": FZ_CLEAN_EXTRACT_ONE}
+
+FAKER_CASES = {"FAKER_NAME": FAKER_NAME, "FAKER_EMAIL": FAKER_EMAIL, "FAKER_ADDRESS": FAKER_ADDRESS,
+               "FAKER_UUID": FAKER_UUID}
+
+
+@pytest.mark.benchmark(group="RE")
+@pytest.mark.parametrize("case", list(RE_CASES))
+def bench_re(bench, scale, case):
+    udf, *args = RE_CASES[case]
+    texts = make_frame(scale)["note"].tolist()
+    bench(per_cell(udf, [(t, *args) for t in texts]), cells=scale)
+
+
+@pytest.mark.benchmark(group="FZ")
+@pytest.mark.parametrize("case", list(FZ_PAIR_CASES))
+def bench_fz_pairs(bench, scale, case):
+    left, right = words(scale, seed=1), words(scale, seed=2)
+    bench(per_cell(FZ_PAIR_CASES[case], list(zip(left, right))), cells=scale)
+
+
+@pytest.mark.benchmark(group="FZ")
+@pytest.mark.parametrize("case", list(FZ_LOOKUP_CASES))
+def bench_fz_lookup(bench, scale, case):
+    bench(FZ_LOOKUP_CASES[case], "Globex Holdngs 4", words(scale), cells=scale)
+
+
+@pytest.mark.benchmark(group="FAKER")
+@pytest.mark.parametrize("case", list(FAKER_CASES))
+def bench_faker(bench, scale, case):
+    bench(per_cell(FAKER_CASES[case], [()] * scale), cells=scale)
+
+
+@pytest.mark.benchmark(group="FAKER")
+def bench_faker_locale(bench, scale):
+    """kwargs with a locale: parse_kwargs and the per-call Faker(locale) on every cell."""
+    bench(per_cell(FAKER_NAME, [("{'locale': 'de_DE'}",)] * min(scale, 1_000)), cells=min(scale, 1_000))
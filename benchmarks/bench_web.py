@@ -0,0 +1,53 @@
+"""WEB_EXTRACT_* UDFs against the fixture page in fixtures/, grown to `scale` table rows and list items."""
+import math
+import os
+
+import pytest
+
+from api.web.scrape import WEB_EXTRACT_TEXT, WEB_EXTRACT_XPATH, WEB_EXTRACT_XPATH_LIST, WEB_EXTRACT_LIST, \
+    WEB_EXTRACT_ATTR, WEB_EXTRACT_TABLE
+from helpers.web import cache_html, MAX_CACHE_SIZE_MB
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+WEB_CASES = {
+    "WEB_EXTRACT_TEXT": (WEB_EXTRACT_TEXT, "h1.title"),
+    "WEB_EXTRACT_ATTR": (WEB_EXTRACT_ATTR, "#links a", "href"),
+    "WEB_EXTRACT_LIST": (WEB_EXTRACT_LIST, "#links li.link a"),
+    "WEB_EXTRACT_TABLE": (WEB_EXTRACT_TABLE, "#products"),
+    "WEB_EXTRACT_XPATH": (WEB_EXTRACT_XPATH, "//p[@class='updated']"),
+    "WEB_EXTRACT_XPATH_LIST": (WEB_EXTRACT_XPATH_LIST, "//table[@id='products']//td[2]"),
+}
+
+
+def _repeat_block(page, marker, n):
+    start, end = f"<!-- {marker} -->", f"<!-- /{marker} -->"
+    head, rest = page.split(start, 1)
+    block, tail = rest.split(end, 1)
+    lines = [line for line in block.splitlines() if line.strip()]
+    grown = (lines * math.ceil(n / len(lines)))[:n]
+    return head + "\n".join(grown) + "\n" + tail
+
+
+def scaled_page(n: int, fixture="catalog.html") -> str:
+    with open(os.path.join(FIXTURES, fixture), encoding="utf-8") as f:
+        page = f.read()
+    return _repeat_block(_repeat_block(page, "rows", n), "items", n)
+
+
+@pytest.fixture
+def page(scale):
+    html = scaled_page(scale)
+    if len(html) > MAX_CACHE_SIZE_MB * 1024 * 1024:
+        pytest.skip(f"page of {len(html) / 1e6:.0f} MB exceeds the HTML cache limit ({MAX_CACHE_SIZE_MB} MB)")
+    name = f"bench_catalog_{scale}"
+    cache_html(name, html)
+    return name
+
+
+@pytest.mark.benchmark(group="WEB")
+@pytest.mark.parametrize("case", list(WEB_CASES))
+def bench_web_extract(bench, page, scale, case):
+    udf, *args = WEB_CASES[case]
+    result = bench(udf, page, *args, cells=scale, rounds=5 if scale <= 1_000 else 2)
+    assert result not in ("", [], "Not found")
@@ -0,0 +1,132 @@
+"""
+Shared fixtures for the UDF benchmarks (pytest-benchmark).
+
+Every benchmark runs at the scales given by --bench-scales (1k and 100k by
+default; add 1M for the full run). For frame UDFs the scale is the number of
+rows, for per-cell UDFs (RE_, DT_, FZ_, FAKER_) the number of cells a filled
+column would recalc, for NP_ the size of the input range and for WEB_EXTRACT_
+the number of rows/items on the page; the replay runs a fixed synthetic recalc
+(headless.py) against a range of that many rows. Each result carries `cells`,
+`cells_per_s` and `peak_mb` (tracemalloc peak of one untimed run) in its
+extra_info, so saved runs (--benchmark-autosave) can be compared over time
+with --benchmark-compare / `pytest-benchmark compare`.
+"""
+import os
+import re
+import sys
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import headless  # noqa: E402
+
+headless.install()  # before any api import: UDF metadata, xlwings engine, Book.caller()
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+ROUNDS = {1_000: 20, 100_000: 5, 1_000_000: 3}
+_ERROR_RESULT = re.compile(r"^(\w+ )?error:", re.I)
+
+
+def pytest_addoption(parser):
+    parser.addoption("--bench-scales", default="1k,100k",
+                     help=f"comma separated scales to run, from {', '.join(SCALES)}")
+
+
+def pytest_generate_tests(metafunc):
+    if "scale" in metafunc.fixturenames:
+        names = [s.strip() for s in metafunc.config.getoption("--bench-scales").split(",") if s.strip()]
+        unknown = [s for s in names if s not in SCALES]
+        if unknown:
+            raise pytest.UsageError(f"unknown --bench-scales {unknown} (use {', '.join(SCALES)})")
+        metafunc.parametrize("scale", [SCALES[s] for s in names], ids=names)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cache_dir(tmp_path_factory):
+    """Point the frame and HTML caches at a temp dir for the whole session."""
+    import helpers.pd as hpd
+    import helpers.web as hweb
+    path = str(tmp_path_factory.mktemp("cache"))
+    hpd.CACHE_DIR = path
+    hweb.CACHE_DIR = path
+    return path
+
+
+@pytest.fixture
+def bench(benchmark):
+    """
+    bench(fn, *args, cells=n): time fn(*args) and record throughput and peak
+    memory. The memory run comes first and is untimed (tracemalloc is slow).
+    """
+    def run(fn, *args, cells, rounds=None, **kwargs):
+        tracemalloc.start()
+        try:
+            result = fn(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # UDFs report failures as "NAME error: ..." instead of raising
+        first = result[0] if isinstance(result, list) and result else result
+        if isinstance(first, str) and _ERROR_RESULT.match(first):
+            pytest.fail(first)
+        result = benchmark.pedantic(fn, args, kwargs, rounds=rounds or ROUNDS.get(cells, 3), iterations=1)
+        benchmark.extra_info["cells"] = cells
+        benchmark.extra_info["peak_mb"] = peak / 1e6
+        if benchmark.stats is not None:  # None with --benchmark-disable: fn ran once, untimed
+            benchmark.extra_info["cells_per_s"] = cells / benchmark.stats.stats.median
+        return result
+    return run
+
+
+def per_cell(udf, cells):
+    """A filled-down column of udf: one call per argument tuple in cells."""
+    def column():
+        return [udf(*args) for args in cells]
+    return column
+
+
+# ---------- synthetic data ----------
+
+_FRAMES = {}
+
+
+def make_frame(rows: int, seed=0) -> pd.DataFrame:
+    """Sales-like frame: ids, low-cardinality labels, numbers, dates and free text."""
+    if rows not in _FRAMES:
+        rng = np.random.default_rng(seed)
+        _FRAMES[rows] = pd.DataFrame({
+            "id": np.arange(rows),
+            "region": rng.choice(["North", "South", "East", "West"], rows),
+            "product": rng.choice([f"P{i:03d}" for i in range(200)], rows),
+            "qty": rng.integers(1, 100, rows),
+            "price": rng.random(rows) * 100,
+            "date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 2000, rows), unit="D"),
+            "note": rng.choice(["order 123 shipped", "invoice INV-2024-001", "refund #77", "n/a"], rows),
+        })
+    return _FRAMES[rows]
+
+
+@pytest.fixture
+def frame(scale):
+    return make_frame(scale)
+
+
+@pytest.fixture
+def loaded(scale):
+    """Name of a registered, cached frame of `scale` rows (what DF_* UDFs read)."""
+    from helpers.pd import auto_cache, DF_REGISTRY
+    name = f"bench_{scale}"
+    if name not in DF_REGISTRY:
+        auto_cache(name, make_frame(scale))
+    return name
+
+
+def words(n: int, seed=0) -> list:
+    rng = np.random.default_rng(seed)
+    first = np.array(["Acme", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Hooli", "Vandelay"])
+    second = np.array(["Corp", "Inc", "Ltd", "Group", "Holdings", "LLC"])
+    return [f"{a} {b} {i}" for i, (a, b) in enumerate(zip(rng.choice(first, n), rng.choice(second, n)))]
@@ -0,0 +1,424 @@
+"""
+Headless UDF harness: run the @xw.func UDFs the way Excel's recalc does,
+without Excel, so load can be measured on Linux CI.
+
+xlwings only records UDF metadata (argument/return converters, optional
+defaults) and marshals values on Windows; elsewhere xw.func/arg/ret are
+no-ops. install() puts back decorators that record the same __xlfunc__
+metadata, registers an in-process "excel" engine so xlwings' own
+conversion.read/write work, and makes xw.Book.caller() return a FakeBook
+with sheets, ranges and pictures. call_udf() then does what xlwings'
+call_udf does: missing arguments become the optional default, every other
+argument goes through conversion.read (range -> list / DataFrame / ndarray),
+the function runs and its result goes through conversion.write
+(expand='table' results come back as the 2D block Excel would spill).
+
+A recalc trace is JSON lines of {"udf", "args", "caller", "ms"} as written by
+dump_udf_trace() (XLW_UDF_STATS=record, see helpers/instrument.py), so a
+recalc recorded in a real workbook can be replayed here call by call:
+
+    python benchmarks/headless.py trace.jsonl --repeat 3
+    python benchmarks/headless.py --synthetic 5000
+
+install() must run before the api package is imported.
+"""
+import argparse
+import datetime as dt
+import inspect
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Annotated, get_args, get_origin, get_type_hints
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xlwings as xw  # noqa: E402
+from xlwings import conversion  # noqa: E402
+
+MISSING = -2147352572  # what Excel passes for an omitted optional argument
+VALUE_ERROR = "#VALUE!"  # what Excel shows when the Python call raises
+_ERROR_RESULT = re.compile(r"^(\w+ )?error:", re.I)  # UDFs report failures as "NAME error: ..."
+
+
+# -------------------------
+# UDF metadata (the Windows-only part of xlwings.udfs)
+# -------------------------
+
+def _type_and_annotations(hint):
+    if get_origin(hint) is Annotated:
+        base, *annotations = get_args(hint)
+        return get_origin(base) or base, annotations
+    return get_origin(hint) or hint, []
+
+
+def _xlfunc_info(f):
+    if hasattr(f, "__xlfunc__"):
+        return f.__xlfunc__
+    hints = get_type_hints(f, include_extras=True)
+    params = [p for p in inspect.signature(f).parameters.values()
+              if p.kind in (p.POSITIONAL_OR_KEYWORD, p.VAR_POSITIONAL)]
+    args, argmap = [], {}
+    for pos, p in enumerate(params):
+        info = {"name": p.name, "pos": pos, "vba": None, "doc": f"Positional argument {pos + 1}",
+                "vararg": p.kind is p.VAR_POSITIONAL, "options": {}}
+        if p.name in hints:
+            hint, annotations = _type_and_annotations(hints[p.name])
+            if hint not in (dt.datetime, dt.date):  # pywin32 converts dates itself
+                info["options"]["convert"] = hint
+                for key, value in (annotations[0].items() if annotations else ()):
+                    if key == "doc":
+                        info["doc"] = value
+                    else:
+                        info["options"][key] = value
+        if p.default is not p.empty:
+            info["optional"] = p.default
+        args.append(info)
+        argmap[p.name] = info
+    ret = {"doc": f.__doc__ or f"Python function '{f.__name__}'.", "options": {}}
+    if "return" in hints:
+        hint, annotations = _type_and_annotations(hints["return"])
+        ret["options"]["convert"] = hint
+        if annotations:
+            ret["options"].update(annotations[0])
+    f.__xlfunc__ = {"name": f.__name__, "sub": False, "args": args, "argmap": argmap, "ret": ret}
+    return f.__xlfunc__
+
+
+def _decorator(f, mutate):
+    def inner(f):
+        mutate(_xlfunc_info(f))
+        return f
+    return inner if f is None else inner(f)
+
+
+def xlfunc(f=None, category="xlwings", call_in_wizard=True, volatile=False, async_mode=None):
+    return _decorator(f, lambda xlf: xlf.update(category=category, call_in_wizard=call_in_wizard,
+                                                volatile=volatile, async_mode=async_mode))
+
+
+def xlsub(f=None, **kwargs):
+    def inner(f):
+        xlfunc(**kwargs)(f).__xlfunc__["sub"] = True
+        return f
+    return inner if f is None else inner(f)
+
+
+def xlret(convert=None, **options):
+    if convert is not None:
+        options["convert"] = convert
+    return lambda f: _decorator(f, lambda xlf: xlf["ret"]["options"].update(options))
+
+
+def xlarg(arg, convert=None, **options):
+    if convert is not None:
+        options["convert"] = convert
+
+    def update(xlf):
+        if arg.lstrip("*") not in xlf["argmap"]:
+            raise ValueError(f"Invalid argument name '{arg}'.")
+        info = xlf["argmap"][arg.lstrip("*")]
+        for special in ("vba", "doc"):
+            if special in options:
+                info[special] = options.pop(special)
+        info["options"].update(options)
+    return lambda f: _decorator(f, update)
+
+
+# -------------------------
+# In-process "excel" engine (value cleaning / preparation only)
+# -------------------------
+
+class _HeadlessEngine:
+    name = "excel"
+    type = "desktop"
+
+    @property
+    def apps(self):
+        raise RuntimeError("headless engine: there is no Excel application")
+
+    @staticmethod
+    def clean_value_data(data, datetime_builder, empty_as, number_builder, err_to_str):
+        def clean(v):
+            if v in ("", None):
+                return empty_as
+            if number_builder is not None and isinstance(v, float):
+                return number_builder(v)
+            return v
+        return [[clean(v) for v in row] for row in data]
+
+    @staticmethod
+    def prepare_xl_data_element(x, date_format):
+        if isinstance(x, (dt.datetime, dt.date)):
+            return x
+        if x is None or (not isinstance(x, str) and pd.isna(x)):
+            return ""
+        if isinstance(x, np.number):
+            return float(x)
+        return x
+
+
+# -------------------------
+# Book.caller() stand-in
+# -------------------------
+
+_ADDRESS = re.compile(r"^(?:'?(?P<sheet>[^!']+)'?!)?\$?(?P<col>[A-Z]+)\$?(?P<row>\d+)$", re.I)
+
+
+def _col_letters(n: int) -> str:
+    letters = ""
+    while n:
+        n, r = divmod(n - 1, 26)
+        letters = chr(65 + r) + letters
+    return letters
+
+
+class FakeRange:
+    def __init__(self, sheet, address, value=None):
+        m = _ADDRESS.match(address)
+        col = 0
+        for ch in (m.group("col") if m else "A").upper():
+            col = col * 26 + ord(ch) - 64
+        self.sheet = sheet
+        self.row, self.column = int(m.group("row")) if m else 1, col
+        self.value = value
+
+    @property
+    def address(self):
+        return f"${_col_letters(self.column)}${self.row}"
+
+    def __repr__(self):
+        return f"<FakeRange {self.sheet.name}!{self.address}>"
+
+
+class FakePictures:
+    def __init__(self):
+        self._pictures = {}  # name -> image path or figure
+
+    def add(self, image, name=None, update=False, **kwargs):
+        name = name or f"Picture {len(self._pictures) + 1}"
+        if name in self._pictures and not update:
+            raise ValueError(f"picture {name!r} already exists")
+        self._pictures[name] = image
+        return name
+
+    def __contains__(self, name):
+        return name in self._pictures
+
+    def __getitem__(self, name):
+        return self._pictures[name]
+
+    def __len__(self):
+        return len(self._pictures)
+
+
+class FakeSheet:
+    def __init__(self, book, name):
+        self.book, self.name = book, name
+        self.pictures = FakePictures()
+        self.cells = {}  # address -> FakeRange written by UDFs
+
+    def range(self, address):
+        rng = self.cells.get(address.upper())
+        if rng is None:
+            rng = self.cells[address.upper()] = FakeRange(self, address)
+        return rng
+
+
+class FakeSheets:
+    def __init__(self, book):
+        self.book = book
+        self._sheets = {}
+        self.active = self.add("Sheet1")
+
+    def add(self, name):
+        self._sheets[name] = FakeSheet(self.book, name)
+        return self._sheets[name]
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self._sheets.values())[key]
+        # a replayed trace may target sheets of the recorded workbook
+        return self._sheets.get(key) or self.add(key)
+
+    def __len__(self):
+        return len(self._sheets)
+
+
+class FakeBook:
+    def __init__(self, name="headless.xlsx"):
+        self.name = name
+        self.sheets = FakeSheets(self)
+
+    def caller_range(self, address=None) -> FakeRange:
+        """Calling cell for an address such as 'Sheet1!B2' (default: Sheet1!A1)."""
+        m = _ADDRESS.match(address or "A1")
+        sheet = self.sheets[m.group("sheet")] if m and m.group("sheet") else self.sheets.active
+        return FakeRange(sheet, address.split("!")[-1] if address else "A1")
+
+
+BOOK = FakeBook()
+
+
+# -------------------------
+# install / call
+# -------------------------
+
+def _records_metadata(decorator) -> bool:
+    def probe():
+        pass
+    return hasattr(decorator(probe), "__xlfunc__")
+
+
+def install():
+    """Make xw.func & co. record metadata, register the engine and fake Book.caller()."""
+    if not _records_metadata(xw.func):
+        if "api" in sys.modules:  # its UDFs were decorated by the no-op xw.func
+            raise RuntimeError("headless.install() must run before the api package is imported")
+        xw.func, xw.sub, xw.arg, xw.ret = xlfunc, xlsub, xlarg, xlret
+    try:
+        xw.engines["excel"]
+    except KeyError:
+        xw.engines.add(xw.main.Engine(impl=_HeadlessEngine()))
+    xw.Book.caller = staticmethod(lambda: BOOK)
+    return BOOK
+
+
+def _udf(name):
+    import api  # looked up on every call like xlwings does, so instrumented wrappers are seen
+    return getattr(api, name)
+
+
+def call_udf(name, *args, caller=None):
+    """
+    One UDF call as Excel makes it: raw cell values in, the value written to
+    the sheet out. Exceptions propagate (Excel would show #VALUE!).
+    """
+    func = _udf(name)
+    info = func.__xlfunc__
+    args_info = info["args"]
+    xw_caller = BOOK.caller_range(caller)  # found here by helpers/instrument.py when recording callers
+    args = list(args) + [MISSING] * (len(args_info) - len(args))  # Excel passes every declared argument
+    for i, arg in enumerate(args):
+        arg_info = args_info[min(i, len(args_info) - 1)]
+        if arg_info["name"] == "caller":
+            args[i] = xw_caller
+        elif isinstance(arg, int) and arg == MISSING:
+            args[i] = arg_info.get("optional", None)
+        else:
+            args[i] = conversion.read(None, arg, arg_info["options"])
+    return conversion.write(func(*args), None, info["ret"]["options"])
+
+
+def _from_json(value):
+    # dump_udf_trace tags datetimes, Excel hands them over as datetime objects
+    if isinstance(value, dict) and set(value) == {"datetime"}:
+        return dt.datetime.fromisoformat(value["datetime"])
+    if isinstance(value, list):
+        return [_from_json(v) for v in value]
+    return value
+
+
+def load_trace(path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def replay(trace, repeat=1) -> pd.DataFrame:
+    """
+    Run every call of the trace (repeat times) in order. Returns one row per
+    UDF: calls, errors (raised or "... error:" results), end-to-end latency
+    including argument/result conversion, and the recorded latency.
+    """
+    calls = [(c["udf"], [_from_json(a) for a in c.get("args", [])], c.get("caller"), c.get("ms")) for c in trace]
+    rows = []
+    for _ in range(repeat):
+        for name, args, caller, recorded in calls:
+            start = time.perf_counter()
+            try:
+                result = call_udf(name, *args, caller=caller)
+            except Exception:
+                result = VALUE_ERROR
+            ms = (time.perf_counter() - start) * 1000
+            first = result[0][0] if isinstance(result, list) and result and isinstance(result[0], list) and result[0] \
+                else result
+            error = result == VALUE_ERROR or (isinstance(first, str) and bool(_ERROR_RESULT.match(first)))
+            spill = len(result) * len(result[0]) if isinstance(result, list) and result and isinstance(result[0], list) \
+                else 1
+            rows.append((name, ms, error, spill, recorded))
+    calls = pd.DataFrame(rows, columns=["udf", "ms", "error", "cells_out", "recorded_ms"])
+    return calls.groupby("udf").agg(
+        calls=("ms", "size"), errors=("error", "sum"), total_ms=("ms", "sum"),
+        p50_ms=("ms", "median"), p95_ms=("ms", lambda s: s.quantile(0.95)), max_ms=("ms", "max"),
+        avg_cells_out=("cells_out", "mean"), recorded_p50_ms=("recorded_ms", "median"),
+    ).sort_values("total_ms", ascending=False)
+
+
+# -------------------------
+# synthetic recalc trace
+# -------------------------
+
+def synthetic_trace(n=5000, rows=1000, seed=0) -> list:
+    """
+    A mixed recalc for CI: one DF_LOAD of a `rows`-row sales range, then n
+    calls drawn from per-cell text/date/fuzzy UDFs and frame UDFs on it.
+    """
+    rng = np.random.default_rng(seed)
+    regions = ["North", "South", "East", "West"]
+    table = [["id", "region", "qty", "price", "note"]] + [
+        [float(i), regions[i % 4], float(rng.integers(1, 100)), round(float(rng.random() * 100), 2),
+         f"invoice INV-{2020 + i % 5}-{i:04d}"] for i in range(rows)]
+    choices = [[f"Acme {s}"] for s in ("Corp", "Inc", "Ltd", "Group", "Holdings")]
+    kinds = [
+        lambda i: {"udf": "SLUG_BASIC", "args": [f"Hello World {i}!"]},
+        lambda i: {"udf": "RE_SEARCH", "args": [table[1 + i % rows][4], r"INV-\d{4}"]},
+        lambda i: {"udf": "RE_SUB", "args": [table[1 + i % rows][4], r"\d", "#"]},
+        lambda i: {"udf": "FZ_EXTRACT_ONE", "args": [f"acme corp {i % 7}", choices]},
+        lambda i: {"udf": "DT_ADD_DAYS", "args": [{"datetime": f"2024-01-{1 + i % 28:02d}T00:00:00"}, float(i % 30)]},
+        lambda i: {"udf": "DF_HEAD", "args": ["sales", "{'n': 20}"]},
+        lambda i: {"udf": "DF_GROUPBY", "args": ["sales", "region", "qty", "sum"]},
+        lambda i: {"udf": "DF_QUERY", "args": ["sales", f"qty > {90 + i % 9}"]},
+        lambda i: {"udf": "DF_STD_DESCRIBE", "args": [table, "{}"]},
+    ]
+    weights = np.array([20, 20, 15, 10, 15, 8, 5, 5, 2], dtype=float)
+    picks = rng.choice(len(kinds), n, p=weights / weights.sum())
+    trace = [{"udf": "DF_LOAD", "args": ["sales", table], "caller": "Sheet1!A1"}]
+    for i, k in enumerate(picks):
+        call = kinds[k](i)
+        call["caller"] = f"Sheet1!{_col_letters(2 + k)}{2 + i}"
+        trace.append(call)
+    return trace
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("trace", nargs="?", help="recalc trace (JSON lines) from dump_udf_trace()")
+    parser.add_argument("--synthetic", type=int, default=5000, help="calls in the synthetic trace (no trace given)")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the trace this many times")
+    opts = parser.parse_args(argv)
+
+    install()
+    import helpers.pd as hpd
+    import helpers.web as hweb
+    hpd.CACHE_DIR = hweb.CACHE_DIR = tempfile.mkdtemp(prefix="xlw-headless-")
+    import api  # noqa: F401
+
+    trace = load_trace(opts.trace) if opts.trace else synthetic_trace(opts.synthetic)
+    start = time.perf_counter()
+    summary = replay(trace, opts.repeat)
+    seconds = time.perf_counter() - start
+    calls = int(summary["calls"].sum())
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print(summary.round(3).to_string())
+    print(f"\n{calls} calls in {seconds:.2f}s: {calls / seconds:,.0f} calls/s, "
+          f"{int(summary['errors'].sum())} errors")
+    return 1 if summary["errors"].sum() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Import-time guard for the UDF server.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter, prints the
+slowest imports and fails when a deferred dependency is imported at startup
+again or the total goes over budget.
+
+    python benchmarks/import_time.py [--budget 2.0] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on the first call of a UDF that needs them, never by `import main`
+DEFERRED = ("seaborn", "scipy", "selenium", "bs4", "lxml", "faker", "rapidfuzz", "requests", "slugify")
+
+
+def measure(module="main") -> list:
+    """[(cumulative seconds, self seconds, module name)] of one cold import of module."""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    # run outside the repo: importing main creates the cache dir relative to the cwd
+    with tempfile.TemporaryDirectory() as cwd:
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              cwd=cwd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us) / 1e6, int(self_us) / 1e6, name.strip()))
+    return rows
+
+
+def check(rows, budget) -> list:
+    """Problems found in a measure() result."""
+    problems = []
+    loaded = {name.split(".")[0] for _, _, name in rows}
+    for dep in DEFERRED:
+        if dep in loaded:
+            problems.append(f"{dep} is imported at startup")
+    total = max((c for c, _, name in rows if name == "main"), default=0.0)
+    if total > budget:
+        problems.append(f"import main took {total:.2f}s (budget {budget:.2f}s)")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget", type=float, default=2.0, help="max seconds for `import main`")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to show")
+    args = parser.parse_args(argv)
+
+    rows = measure()
+    for cumulative, own, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative:8.3f}s {own:8.3f}s  {name}")
+    problems = check(rows, args.budget)
+    for p in problems:
+        print(f"FAIL: {p}")
+    if not problems:
+        print("OK")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
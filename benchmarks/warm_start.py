@@ -0,0 +1,94 @@
+"""
+Startup benchmark for the UDF server: time-to-first-UDF and time-to-hot-registry,
+with and without the warm start.
+
+A setup run caches a few frames, uses them and exits, which records the warm
+set. Each measured run is a fresh interpreter importing main:
+    first_udf     import main + one UDF call (UDFs are registered and usable)
+    hot_registry  the previous session's frames are in DF_REGISTRY again
+                  (warm: background prefetch done; cold: loaded on demand)
+
+    python benchmarks/warm_start.py [--frames 3] [--rows 500000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SETUP = """
+import helpers.pd as hpd
+hpd.CACHE_DIR = {cache_dir!r}
+import numpy as np, pandas as pd
+import main
+rng = np.random.default_rng(0)
+for i in range({frames}):
+    df = pd.DataFrame({{"key": rng.integers(0, 1000, {rows}), "value": rng.random({rows}),
+                        "label": pd.Categorical(rng.choice(list("abcdef"), {rows}))}})
+    hpd.auto_cache(f"bench_{{i}}", df)
+    hpd.auto_load(f"bench_{{i}}")
+"""
+
+_MEASURE = """
+import time
+t0 = time.perf_counter()
+import helpers.pd as hpd
+hpd.CACHE_DIR = {cache_dir!r}
+import helpers.warm as warm
+warm.WARM_START = {warm}
+import main
+from api.data.cache_helpers import DF_LIST
+DF_LIST()
+first_udf = time.perf_counter() - t0
+names = warm.load_warm_set()["frames"]
+if {warm}:
+    warm.wait_warm()
+else:
+    for name in names:
+        hpd.auto_load(name)
+hot = time.perf_counter() - t0
+assert all(n in hpd.DF_REGISTRY for n in names), "registry not hot"
+print(json.dumps({{"first_udf": first_udf, "hot_registry": hot}}))
+"""
+
+
+def _run(code, cwd, cache_dir, **fmt) -> str:
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    source = "import json\n" + code.format(cache_dir=cache_dir, **fmt)
+    proc = subprocess.run([sys.executable, "-c", source], cwd=cwd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return proc.stdout.strip().splitlines()[-1] if proc.stdout.strip() else ""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    # run outside the repo: importing main creates the default cache dir relative to the cwd
+    with tempfile.TemporaryDirectory() as cwd:
+        cache_dir = os.path.join(cwd, "cache")
+        os.makedirs(cache_dir)
+        _run(_SETUP, cwd, cache_dir, frames=args.frames, rows=args.rows)
+        results = {}
+        for mode in ("cold", "warm"):
+            runs = [json.loads(_run(_MEASURE, cwd, cache_dir, warm=mode == "warm"))
+                    for _ in range(args.repeat)]
+            results[mode] = {k: statistics.median(r[k] for r in runs) for k in ("first_udf", "hot_registry")}
+
+    print(f"{args.frames} frames x {args.rows} rows, median of {args.repeat} runs")
+    print(f"{'':6} {'first UDF':>10} {'hot registry':>13}")
+    for mode, r in results.items():
+        print(f"{mode:6} {r['first_udf']:9.3f}s {r['hot_registry']:12.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
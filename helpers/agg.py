@@ -0,0 +1,166 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+# -------------------------
+# Partitioned aggregation engine
+# -------------------------
+# Decomposable aggregates are computed as per-partition partials that merge
+# cheaply:
+#   sum   -> sum of partial sums
+#   count -> sum of partial counts
+#   min   -> min of partial mins
+#   max   -> max of partial maxes
+#   mean  -> sum of partial sums / sum of partial counts
+# Partials are frames indexed by the group keys with (column, stat) columns.
+#
+# This module is imported by pool workers, so it must stay free of
+# xlwings / registry side effects.
+
+DECOMPOSABLE_FUNCS = ("sum", "count", "min", "max", "mean")
+PARALLEL_AGG_MIN_ROWS = 2_000_000  # below this one pandas groupby is faster
+AGG_WORKERS = os.cpu_count() or 4
+
+_NEEDS = {
+    "sum": ("sum",),
+    "count": ("count",),
+    "min": ("min",),
+    "max": ("max",),
+    "mean": ("sum", "count"),
+}
+_MERGE = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+_POOL = None
+_POOL_LOCK = threading.Lock()  # concurrent UDF calls must not each start a pool
+
+
+def is_decomposable(funcs) -> bool:
+    return bool(funcs) and all(isinstance(f, str) and f in DECOMPOSABLE_FUNCS for f in funcs)
+
+
+def partial_stats(funcs):
+    """Partial statistics needed to finalize the requested funcs, in stable order."""
+    stats = []
+    for f in funcs:
+        for stat in _NEEDS[f]:
+            if stat not in stats:
+                stats.append(stat)
+    return stats
+
+
+def partial_aggregate(df: pd.DataFrame, by, cols, funcs, dropna=True) -> pd.DataFrame:
+    """Group df by `by` and compute the partials for cols x funcs."""
+    stats = partial_stats(funcs)
+    return df.groupby(by, sort=False, observed=True, dropna=dropna).agg({c: stats for c in cols})
+
+
+def merge_partials(partials: pd.DataFrame, by) -> pd.DataFrame:
+    """
+    Combine partial rows that share the `by` keys: partitions of the same grain,
+    or a finer grain rolled up to a subset of its index levels.
+    """
+    level = list(by) if len(by) > 1 else by[0]
+    grouped = partials.groupby(level=level, sort=False, observed=True)
+    return grouped.agg({c: _MERGE[c[1]] for c in partials.columns})
+
+
+def finalize(partials: pd.DataFrame, cols, funcs) -> pd.DataFrame:
+    """Partials -> the frame pandas' groupby(by).agg({col: funcs}) would return."""
+    out = {}
+    for c in cols:
+        for f in funcs:
+            if f == "mean":
+                sums, counts = partials[(c, "sum")], partials[(c, "count")]
+                mean = sums / counts.where(counts > 0)
+                # pandas keeps float32 means float32 (ints give float64)
+                out[(c, f)] = mean.astype(sums.dtype) if sums.dtype.kind == "f" else mean
+            else:
+                out[(c, f)] = partials[(c, f)]
+    result = pd.DataFrame(out, index=partials.index)
+    result.columns = pd.MultiIndex.from_tuples(result.columns)
+    return result.sort_index()
+
+
+def _partial_task(part, by, cols, funcs):
+    return partial_aggregate(part, by, cols, funcs)
+
+
+def _pool(workers):
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None or _POOL._max_workers != workers:
+            if _POOL is not None:
+                _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = ProcessPoolExecutor(max_workers=workers)
+        return _POOL
+
+
+def hash_partitions(df: pd.DataFrame, by, n):
+    """Split df into n frames so that every group lands in exactly one of them."""
+    buckets = pd.util.hash_pandas_object(df[by], index=False).to_numpy() % n
+    order = np.argsort(buckets, kind="stable")
+    bounds = np.searchsorted(buckets[order], np.arange(n + 1))
+    return [df.take(order[bounds[i]:bounds[i + 1]]) for i in range(n)]
+
+
+def parallel_groupby(df: pd.DataFrame, by, cols, funcs, workers=None) -> pd.DataFrame:
+    """
+    groupby(by).agg({col: funcs}) for decomposable funcs, spread over a process pool.
+
+    Rows are hash-partitioned on the group keys, each worker aggregates one
+    partition to partials, and the partials are merged and finalized here.
+    """
+    workers = workers or AGG_WORKERS
+    parts = hash_partitions(df[list(by) + list(cols)], by, workers)
+    parts = [p for p in parts if len(p)]
+    partials = list(_pool(workers).map(
+        _partial_task, parts, repeat(by), repeat(cols), repeat(funcs)))
+    merged = merge_partials(pd.concat(partials), by)
+    return finalize(merged, cols, funcs)
+
+
+def groupby_agg(df: pd.DataFrame, by, cols, funcs) -> pd.DataFrame:
+    """
+    Use the parallel engine for big frames with decomposable funcs, pandas
+    otherwise. Both only return observed category combinations.
+    """
+    if len(df) >= PARALLEL_AGG_MIN_ROWS and AGG_WORKERS > 1 and is_decomposable(funcs):
+        return parallel_groupby(df, by, cols, funcs)
+    return df.groupby(by, observed=True).agg({c: funcs for c in cols})
+
+
+def _as_list(v):
+    if v is None:
+        return []
+    return [v] if isinstance(v, str) else list(v)
+
+
+def parallel_pivot_table(df: pd.DataFrame, params: dict):
+    """
+    pivot_table via parallel_groupby for the simple, decomposable case.
+    Returns None when params need pandas' own pivot_table (margins, fill_value,
+    callables, missing values=..., categorical keys, whose unobserved
+    combinations depend on the pandas version) or the frame is too small to bother.
+    """
+    if len(df) < PARALLEL_AGG_MIN_ROWS or AGG_WORKERS <= 1:
+        return None
+    if set(params) - {"index", "columns", "values", "aggfunc"}:
+        return None
+    aggfunc = params.get("aggfunc", "mean")
+    index, columns, values = (_as_list(params.get(k)) for k in ("index", "columns", "values"))
+    if not (isinstance(aggfunc, str) and is_decomposable([aggfunc]) and index and values):
+        return None
+    if any(isinstance(df[k].dtype, pd.CategoricalDtype) for k in index + columns if k in df.columns):
+        return None
+
+    result = parallel_groupby(df, index + columns, values, [aggfunc])
+    result.columns = result.columns.droplevel(1)
+    if columns:
+        result = result.unstack(columns)
+    if isinstance(params.get("values"), str):
+        result = result[params["values"]]
+        if not columns:
+            result = result.to_frame()
+    return result.sort_index(axis=1)
@@ -0,0 +1,138 @@
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from itertools import chain
+
+# -------------------------
+# Typed arrays from Excel ranges
+# -------------------------
+# to_array() turns the values xlwings passes for a range (a scalar, a list
+# for one row/column, a list of rows for a block) into one numpy array:
+#   numbers / TRUE-FALSE -> float64, blank cells -> NaN
+#   (also numbers stored as text, "10" -> 10.0)
+#   dates                -> datetime64[ms], blank cells -> NaT
+#   text                 -> str, blank cells -> ""
+#   numbers and text     -> object: numbers as float, text as str, blanks ""
+# The cells are flattened into a tuple and numpy builds the array from it in
+# one copy; only ranges with blanks, dates or text take a second, typed pass.
+#
+# The hash of the flat tuple keys a small cache, so NP_MEAN, NP_STD and
+# NP_MEDIAN over the same range in one recalc convert it once. Entries live
+# ARRAY_CACHE_TTL seconds. The key is (shape, hash) and a hit must also match
+# a few sampled cells; the cells themselves are not kept. 1.0 and TRUE hash
+# alike but convert to the same float. Cached arrays are read-only.
+
+ARRAY_CACHE_TTL = 5.0  # seconds, about one recalc
+ARRAY_CACHE_MIN_CELLS = 256  # smaller ranges convert faster than they hash
+ARRAY_CACHE_MAX_BYTES = 64 * 1024**2  # total size of the cached arrays
+_ARRAY_CACHE = OrderedDict()  # (shape, hash of cells) -> (expires, sampled cells, array)
+_ARRAY_CACHE_LOCK = threading.Lock()
+ARRAY_CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def _flatten(data):
+    """(flat tuple of cells, shape) of a scalar, a 1D list or a list of rows."""
+    if not isinstance(data, (list, tuple)):
+        return (data,), (1,)
+    if data and isinstance(data[0], (list, tuple)):
+        flat = tuple(chain.from_iterable(data))
+        shape = (len(data), len(data[0]))
+        if len(flat) != shape[0] * shape[1]:
+            raise ValueError("range rows have different lengths")
+        return flat, shape
+    return tuple(data), (len(data),)
+
+
+def _from_objects(obj: np.ndarray) -> np.ndarray:
+    """Typed array for cells numpy could not hold as floats (blanks, dates, text)."""
+    blanks = (obj == None) | (obj == "")  # noqa: E711 - elementwise
+    values = obj[~blanks]
+    kinds = set(map(type, values))
+    if kinds and all(hasattr(k, "toordinal") for k in kinds):  # datetime / date
+        out = np.full(obj.shape, np.datetime64("NaT"), dtype="datetime64[ms]")
+        out[~blanks] = values.astype("datetime64[ms]")
+        return out
+    try:
+        numbers = values.astype(float)  # numbers, TRUE/FALSE and numbers stored as text
+    except (TypeError, ValueError):
+        pass
+    else:
+        out = np.full(obj.shape, np.nan)
+        out[~blanks] = numbers
+        return out
+    if all(issubclass(k, str) for k in kinds):
+        return np.where(blanks, "", obj).astype(str)
+    # numbers and text: keep each cell as it is rather than "1.0" strings
+    out = np.full(obj.shape, "", dtype=object)
+    out[~blanks] = [v if isinstance(v, str) else float(v) for v in values]
+    return out
+
+
+def _convert(flat, shape) -> np.ndarray:
+    arr = np.array(flat)  # numpy picks float / bool, or str / object for anything else
+    kind = arr.dtype.kind
+    if kind in "iub":
+        arr = arr.astype(float)
+    elif kind != "f":
+        # str here may be numbers numpy turned into text: go back to the cells
+        arr = _from_objects(np.array(flat, dtype=object))
+    return arr.reshape(shape)
+
+
+def to_array(data) -> np.ndarray:
+    """Read-only typed array of an Excel range (see above); cached within a recalc."""
+    flat, shape = _flatten(data)
+    if len(flat) < ARRAY_CACHE_MIN_CELLS:
+        arr = _convert(flat, shape)
+        arr.flags.writeable = False
+        return arr
+    key = (shape, hash(flat))
+    sample = flat[::max(1, len(flat) // 8)]
+    now = time.monotonic()
+    with _ARRAY_CACHE_LOCK:
+        hit = _ARRAY_CACHE.get(key)
+        if hit is not None and hit[0] > now and hit[1] == sample:
+            _ARRAY_CACHE.move_to_end(key)
+            ARRAY_CACHE_STATS["hits"] += 1
+            return hit[2]
+        ARRAY_CACHE_STATS["misses"] += 1
+    arr = _convert(flat, shape)
+    arr.flags.writeable = False
+    with _ARRAY_CACHE_LOCK:
+        _ARRAY_CACHE[key] = (now + ARRAY_CACHE_TTL, sample, arr)
+        size = sum(a.nbytes for _, _, a in _ARRAY_CACHE.values())
+        while size > ARRAY_CACHE_MAX_BYTES and len(_ARRAY_CACHE) > 1:
+            _, (_, _, old) = _ARRAY_CACHE.popitem(last=False)
+            size -= old.nbytes
+    return arr
+
+
+def blank_mask(arr: np.ndarray) -> np.ndarray:
+    """True where to_array() put a blank cell (NaN, NaT or "")."""
+    if arr.dtype.kind == "f":
+        return np.isnan(arr)
+    if arr.dtype.kind == "M":
+        return np.isnat(arr)
+    return arr == ""
+
+
+def array_cache_stats() -> dict:
+    hits, misses = ARRAY_CACHE_STATS["hits"], ARRAY_CACHE_STATS["misses"]
+    with _ARRAY_CACHE_LOCK:
+        entries = len(_ARRAY_CACHE)
+        size = sum(a.nbytes for _, _, a in _ARRAY_CACHE.values())
+    return {
+        **ARRAY_CACHE_STATS,
+        "entries": entries,
+        "mb": size / 1024**2,
+        "max_mb": ARRAY_CACHE_MAX_BYTES / 1024**2,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+    }
+
+
+def clear_array_cache():
+    with _ARRAY_CACHE_LOCK:
+        _ARRAY_CACHE.clear()
+        for k in ARRAY_CACHE_STATS:
+            ARRAY_CACHE_STATS[k] = 0
@@ -0,0 +1,99 @@
+import threading
+import pandas as pd
+
+from helpers.pd import auto_load_with_token, frame_token, get_generation
+from helpers.agg import is_decomposable, partial_aggregate, partial_stats, merge_partials, finalize
+
+# -------------------------
+# Pre-aggregated cubes
+# -------------------------
+# A cube holds the finest-grain partials (sum/count/min/max per measure)
+# of a source frame over its dims. Any groupby on a subset of those dims
+# with decomposable funcs is a roll-up of the cube instead of a full scan.
+#
+# Cubes are tied to the frame_token of the source they were built from; a
+# reload of the source (new token, even if the version number repeats after
+# an eviction) makes them stale and they are dropped on the next lookup.
+
+CUBE_STATS = ("sum", "count", "min", "max")
+
+CUBES = {}  # src_name -> {dims tuple: cube dict}
+_CUBES_LOCK = threading.Lock()
+
+
+def build_cube(src_name, dims, measures=None) -> dict:
+    """Materialize the cube of src_name over dims; measures default to the numeric columns."""
+    generation = get_generation(src_name)
+    df, token = auto_load_with_token(src_name)
+    dims = list(dims)
+    if measures is None:
+        measures = [c for c in df.select_dtypes("number").columns if c not in dims]
+    measures = list(measures)
+    missing = [c for c in dims + measures if c not in df.columns]
+    if missing:
+        raise KeyError(f"columns not in '{src_name}': {missing}")
+
+    # keep NaN keys: a coarser roll-up must still see rows whose other dims are missing
+    partials = partial_aggregate(df, dims, measures, CUBE_STATS, dropna=False)
+    cube = {
+        "src": src_name,
+        "generation": generation,
+        "token": token,
+        "dims": tuple(dims),
+        "measures": tuple(measures),
+        "partials": partials,
+        "source_rows": len(df),
+    }
+    if token is not None:  # not cached anywhere: nothing to tell a reload apart by
+        with _CUBES_LOCK:
+            CUBES.setdefault(src_name, {})[cube["dims"]] = cube
+    return cube
+
+
+def drop_cubes(src_name, dims=None):
+    """Forget every cube of src_name, or only the one over dims."""
+    with _CUBES_LOCK:
+        if dims is None:
+            return len(CUBES.pop(src_name, {}))
+        return int(CUBES.get(src_name, {}).pop(tuple(dims), None) is not None)
+
+
+def find_cube(src_name, by, cols, funcs):
+    """
+    Smallest current cube of src_name that can answer groupby(by).agg({cols: funcs}),
+    or None. Cubes built from another copy of the source are dropped.
+    """
+    if src_name not in CUBES or not is_decomposable(funcs):
+        return None
+    token = frame_token(src_name)
+    with _CUBES_LOCK:
+        cubes = CUBES.get(src_name, {})
+        for dims in [d for d, c in cubes.items() if c["token"] != token or token is None]:
+            del cubes[dims]
+        fits = [c for c in cubes.values()
+                if set(by) <= set(c["dims"]) and set(cols) <= set(c["measures"])]
+    return min(fits, key=lambda c: len(c["partials"]), default=None)
+
+
+def rollup(cube, by, cols, funcs) -> pd.DataFrame:
+    """groupby(by).agg({col: funcs}) answered from the cube's partials."""
+    stats = partial_stats(funcs)
+    partials = cube["partials"][[(c, s) for c in cols for s in stats]]
+    return finalize(merge_partials(partials, list(by)), cols, funcs)
+
+
+def list_cubes() -> pd.DataFrame:
+    rows = []
+    with _CUBES_LOCK:
+        cubes = [c for per_src in CUBES.values() for c in per_src.values()]
+    for c in cubes:
+        rows.append({
+            "src": c["src"],
+            "dims": ", ".join(map(str, c["dims"])),
+            "measures": ", ".join(map(str, c["measures"])),
+            "cells": len(c["partials"]),
+            "source_rows": c["source_rows"],
+            "generation": c["generation"],
+            "stale": c["token"] != frame_token(c["src"]),
+        })
+    return pd.DataFrame(rows, columns=["src", "dims", "measures", "cells", "source_rows", "generation", "stale"])
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+from xlwings import conversion
+
+# -------------------------
+# Bulk encoding of large UDF results
+# -------------------------
+# xlwings turns a returned frame or array into nested lists and then visits
+# every cell in Python (NaN -> "", numpy scalar -> float, datetime -> COM
+# date), which dominates the return of a few hundred thousand cells.
+# encode_result() does that conversion a column at a time with numpy:
+# numbers become floats, NaN/NaT/None become "" and datetime64 becomes
+# the Excel serial number, then the whole 2D object array is turned into
+# lists in one tolist() call. UDFs using it declare @xw.ret("raw") so xlwings
+# hands the lists to Excel as they are. Missing values are "" as in xlwings:
+# None would show as 0 in an array formula.
+#
+# Below ENCODE_MIN_CELLS the result goes through xlwings' own conversion, so
+# small returns are exactly what they were.
+
+ENCODE_MIN_CELLS = 20_000
+
+_EXCEL_EPOCH = np.datetime64("1899-12-30", "ns")
+_NS_PER_DAY = 86_400 * 10**9
+
+
+def _to_cells(values) -> np.ndarray:
+    """Object array of Excel cell values (float, str or bool; "" for missing) for a column or array."""
+    if isinstance(values, (pd.Series, pd.Index)):
+        dtype = values.dtype
+        if isinstance(dtype, pd.DatetimeTZDtype):
+            values = values.tz_localize(None) if isinstance(values, pd.Index) else values.dt.tz_localize(None)
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            values = values.to_numpy(dtype=float, na_value=np.nan)  # nullable ints/floats too
+        else:
+            values = values.to_numpy()
+    kind = values.dtype.kind
+    if kind == "M":
+        mask = np.isnat(values)
+        numbers = (values.astype("datetime64[ns]") - _EXCEL_EPOCH).astype(np.int64) / _NS_PER_DAY
+    elif kind == "m":
+        mask = np.isnat(values)
+        numbers = values.astype("timedelta64[ns]").astype(np.int64) / _NS_PER_DAY
+    elif kind in "iuf":
+        numbers = values.astype(float, copy=False)
+        mask = np.isnan(numbers)
+    elif kind == "b":
+        return values.astype(object)
+    else:  # object, strings, categoricals
+        cells = values.astype(object)
+        mask = pd.isna(cells)
+        if mask.any():
+            cells[mask] = ""
+        return cells
+    cells = numbers.astype(object)
+    if mask.any():
+        cells[mask] = ""
+    return cells
+
+
+def _label(v):
+    return v.item() if isinstance(v, np.generic) else ("" if v is None else v)
+
+
+def _encode_frame(df: pd.DataFrame, index: bool, header: bool) -> list:
+    offset, first = int(header), int(index)
+    out = np.empty((len(df) + offset, df.shape[1] + first), dtype=object)
+    if header:
+        out[0, :] = ([_label(df.index.name)] if index else []) + [_label(c) for c in df.columns]
+    if index:
+        out[offset:, 0] = _to_cells(df.index)
+    for j in range(df.shape[1]):
+        out[offset:, first + j] = _to_cells(df.iloc[:, j])
+    return out.tolist()
+
+
+def _bulk(value, index, header) -> bool:
+    if isinstance(value, pd.DataFrame):
+        return (value.size >= ENCODE_MIN_CELLS and not isinstance(value.columns, pd.MultiIndex)
+                and not (index and isinstance(value.index, pd.MultiIndex)))
+    return isinstance(value, np.ndarray) and value.ndim in (1, 2) and value.size >= ENCODE_MIN_CELLS
+
+
+def encode_result(value, index=True, header=True):
+    """
+    A UDF result as the 2D list Excel receives, for UDFs declared with
+    @xw.ret("raw"). index/header: as xlwings' DataFrame options.
+    Strings (error messages) and scalars are returned unchanged.
+    """
+    if isinstance(value, (str, bool, int, float)) or value is None:
+        return value
+    if not _bulk(value, index, header):
+        return conversion.write(value, None, {"index": index, "header": header})
+    if isinstance(value, pd.DataFrame):
+        return _encode_frame(value, index, header)
+    cells = _to_cells(value)
+    return (cells.reshape(1, -1) if cells.ndim == 1 else cells).tolist()  # 1D -> one row, like xlwings
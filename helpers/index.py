@@ -0,0 +1,320 @@
+import ast
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+import helpers.pd as hpd
+from helpers.pd import auto_load_with_token, frame_token, get_generation, manifest_transaction, refresh_manifest, \
+    index_cache_path
+from helpers.locks import name_lock
+
+# -------------------------
+# Secondary indexes on named frames
+# -------------------------
+# Both kinds keep `order`: the row positions of the non-null keys, arranged
+# so equal keys are contiguous (and ascending for "sorted"). On top of it
+#   hash:   {key: (start, stop)} into order       -> O(1) equality probes
+#   sorted: the keys in order, for searchsorted   -> O(log n) equality/range
+# `order` is what gets persisted as a .npy sidecar of the cached parquet
+# version, listed under the manifest entry's "indexes"; the probe structure
+# is rebuilt from it in one linear pass.
+#
+# An index belongs to the frame_token of the copy it was built from, so a
+# reload (even one that reuses the version number after an eviction) never
+# sees it. A frame without a token is not indexed: lookups scan it instead.
+
+INDEX_KINDS = ("hash", "sorted")
+
+INDEXES = {}  # src_name -> {column: index dict}
+_INDEXES_LOCK = threading.RLock()
+
+_RANGE_OPS = {ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">="}
+_FLIPPED = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+
+def _build_order(s: pd.Series, kind) -> np.ndarray:
+    valid = np.flatnonzero(s.notna().to_numpy())
+    if kind == "sorted":
+        values = s.to_numpy()[valid]
+        return valid[np.argsort(values, kind="stable")]
+    codes, _ = pd.factorize(s.iloc[valid], sort=False)
+    return valid[np.argsort(codes, kind="stable")]
+
+
+def _from_order(src_name, column, kind, generation, token, s: pd.Series, order) -> dict:
+    keys = s.iloc[order].reset_index(drop=True)
+    index = {"src": src_name, "column": column, "kind": kind, "generation": generation,
+             "token": token, "order": order, "rows": len(s)}
+    if kind == "sorted":
+        index["keys"] = keys.to_numpy()
+        return index
+    starts = np.flatnonzero(keys.ne(keys.shift()).to_numpy())
+    stops = np.append(starts[1:], len(keys))
+    index["hash"] = dict(zip(keys.iloc[starts].tolist(), zip(starts.tolist(), stops.tolist())))
+    return index
+
+
+def _persist(src_name, column, kind, order, token):
+    """Write order as a sidecar of the cached version with that token and list it in the manifest."""
+    with name_lock(hpd.CACHE_DIR, src_name):
+        entry = refresh_manifest().get(src_name)
+        if entry is None or entry["token"] != token:
+            return False  # not cached (evicted, or replaced); the index stays in memory only
+        version = entry["version"]
+        path = index_cache_path(src_name, version, column)
+        tmp = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp, order)
+        os.replace(tmp, path)
+        with manifest_transaction() as manifest:
+            entry = manifest.get(src_name)
+            if entry is None or entry["token"] != token:
+                os.remove(path)  # evicted or replaced by another process meanwhile
+                return False
+            indexes = entry.setdefault("indexes", {})
+            if str(column) not in indexes:
+                entry["size"] += os.path.getsize(path)
+            indexes[str(column)] = {"kind": kind, "file": os.path.basename(path)}
+    return True
+
+
+def _load_persisted(src_name, column, df, token):
+    entry = refresh_manifest().get(src_name)
+    if entry is None or entry["token"] != token:
+        return None
+    spec = entry.get("indexes", {}).get(str(column))
+    if spec is None:
+        return None
+    try:
+        order = np.load(os.path.join(hpd.CACHE_DIR, spec["file"]))
+    except (FileNotFoundError, ValueError):
+        return None
+    if len(order) and order.max() >= len(df):
+        return None
+    return _from_order(src_name, column, spec["kind"], entry["version"], token, df[column], order)
+
+
+def create_index(src_name, column, kind="hash", persist=True) -> dict:
+    """
+    Build (and by default persist) an index on src_name[column]. It is kept
+    only if the frame has a token (see above).
+    """
+    kind = str(kind or "hash").lower()
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind '{kind}' (use {', '.join(INDEX_KINDS)})")
+    generation = get_generation(src_name)
+    df, token = auto_load_with_token(src_name)
+    if column not in df.columns:
+        raise KeyError(f"column '{column}' not in '{src_name}'")
+    if not df.columns.is_unique:
+        raise ValueError(f"'{src_name}' has duplicate column names")
+    s = df[column]
+    order = _build_order(s, kind)
+    index = _from_order(src_name, column, kind, generation, token, s, order)
+    if token is None:
+        index["persisted"] = False
+        return index
+    if persist:
+        index["persisted"] = _persist(src_name, column, kind, order, token)
+    with _INDEXES_LOCK:
+        INDEXES.setdefault(src_name, {})[column] = index
+    return index
+
+
+def get_index(src_name, column, df=None, token=None):
+    """
+    Index on src_name[column] for the copy with that token (default: the
+    current one), from memory or the cache sidecar; None if there is none.
+    df: that copy, if the caller already has it.
+    """
+    if df is None:
+        df, token = auto_load_with_token(src_name)
+    elif token is None:
+        token = frame_token(src_name)
+    if token is None:
+        return None
+    current = frame_token(src_name)
+    with _INDEXES_LOCK:
+        per_src = INDEXES.get(src_name, {})
+        index = per_src.get(column)
+        if index is not None and index["token"] == token:
+            return index
+        if index is not None and index["token"] != current:
+            per_src.pop(column, None)  # built from a replaced copy
+    if column not in df.columns:
+        return None
+    index = _load_persisted(src_name, column, df, token)
+    if index is not None:
+        with _INDEXES_LOCK:
+            INDEXES.setdefault(src_name, {})[column] = index
+    return index
+
+
+def drop_indexes(src_name, column=None):
+    """Forget in-memory indexes of src_name (all, or the one on column)."""
+    with _INDEXES_LOCK:
+        if column is None:
+            return len(INDEXES.pop(src_name, {}))
+        return int(INDEXES.get(src_name, {}).pop(column, None) is not None)
+
+
+# ---------- probes ----------
+
+class _NotIndexable(Exception):
+    pass
+
+
+def probe_eq(index, key) -> np.ndarray:
+    """
+    Row positions whose key equals `key` (ascending). Raises _NotIndexable
+    for a list-like key (`col == [1, 2]` means isin), which needs a scan.
+    """
+    order = index["order"]
+    if index["kind"] == "hash":
+        try:
+            span = index["hash"].get(key)
+        except TypeError:  # unhashable key
+            raise _NotIndexable()
+        return order[slice(*span)] if span else order[:0]
+    if np.ndim(key) != 0:
+        raise _NotIndexable()
+    keys = index["keys"]
+    lo, hi = np.searchsorted(keys, key, "left"), np.searchsorted(keys, key, "right")
+    return np.sort(order[lo:hi])
+
+
+def probe_range(index, lower=None, upper=None, lower_inclusive=True, upper_inclusive=True) -> np.ndarray:
+    """Row positions with lower <(=) key <(=) upper; sorted indexes only."""
+    if index["kind"] != "sorted":
+        raise ValueError("range probes need a sorted index")
+    keys = index["keys"]
+    lo = 0 if lower is None else np.searchsorted(keys, lower, "left" if lower_inclusive else "right")
+    hi = len(keys) if upper is None else np.searchsorted(keys, upper, "right" if upper_inclusive else "left")
+    return np.sort(index["order"][lo:max(lo, hi)])
+
+
+def lookup_positions(src_name, column, key, df=None, token=None) -> np.ndarray:
+    """
+    Equality probe, building a hash index on first use. df/token: the copy
+    to probe (default: the current one); without a token df is scanned.
+    """
+    if df is None:
+        df, token = auto_load_with_token(src_name)
+    elif token is None:
+        token = frame_token(src_name)
+    if token is None:
+        return np.flatnonzero(df[column].eq(key).to_numpy())
+    index = get_index(src_name, column, df, token)
+    if index is None:
+        index = create_index(src_name, column, "hash")
+        if index["token"] != token:  # the frame was replaced meanwhile
+            return np.flatnonzero(df[column].eq(key).to_numpy())
+    try:
+        return probe_eq(index, key)
+    except _NotIndexable:
+        return np.flatnonzero(df[column].eq(key).to_numpy())
+
+
+# ---------- DF_QUERY planning ----------
+
+def _const(node):
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, SyntaxError):
+        raise _NotIndexable()
+
+
+def _column(node, df):
+    if isinstance(node, ast.Name) and node.id in df.columns:
+        return node.id
+    raise _NotIndexable()
+
+
+def _comparison_positions(src_name, df, token, left, op, right):
+    if isinstance(left, ast.Name) and left.id in df.columns:
+        column, value, op_name = left.id, _const(right), op
+    else:
+        if op == "in":
+            raise _NotIndexable()
+        column, value = _column(right, df), _const(left)
+        op_name = _FLIPPED.get(op, op)
+    index = get_index(src_name, column, df, token)
+    if index is None:
+        raise _NotIndexable()
+    if op_name == "==":
+        return probe_eq(index, value)
+    if op_name == "in":
+        if not isinstance(value, (list, tuple, set)):
+            raise _NotIndexable()
+        parts = [probe_eq(index, v) for v in value]
+        return np.unique(np.concatenate(parts)) if parts else index["order"][:0]
+    if index["kind"] != "sorted" or isinstance(df[column].dtype, pd.CategoricalDtype):
+        raise _NotIndexable()  # categories compare in category order, not by value
+    if op_name in ("<", "<="):
+        return probe_range(index, upper=value, upper_inclusive=op_name == "<=")
+    return probe_range(index, lower=value, lower_inclusive=op_name == ">=")
+
+
+def _plan(node, src_name, df, token):
+    if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
+        parts = [_plan(v, src_name, df, token) for v in node.values]
+    elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitAnd):
+        parts = [_plan(node.left, src_name, df, token), _plan(node.right, src_name, df, token)]
+    elif isinstance(node, ast.Compare):
+        parts = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, ast.Eq):
+                op_name = "=="
+            elif isinstance(op, ast.In):
+                op_name = "in"
+            elif type(op) in _RANGE_OPS:
+                op_name = _RANGE_OPS[type(op)]
+            else:
+                raise _NotIndexable()
+            parts.append(_comparison_positions(src_name, df, token, left, op_name, right))
+            left = right
+    else:
+        raise _NotIndexable()
+    positions = parts[0]
+    for p in parts[1:]:
+        positions = np.intersect1d(positions, p, assume_unique=True)
+    return positions
+
+
+def query_via_index(src_name, df, expr, token=None):
+    """
+    Answer df.query(expr) from indexes when expr is made only of ==, in and
+    range comparisons between indexed columns and literals joined by `and`/`&`.
+    token: frame_token of df (default: the current one).
+    Returns None when the expression needs a full scan.
+    """
+    if not INDEXES.get(src_name) and not (refresh_manifest().get(src_name) or {}).get("indexes"):
+        return None
+    token = frame_token(src_name) if token is None else token
+    if token is None:
+        return None
+    try:
+        tree = ast.parse(str(expr).strip(), mode="eval")
+        positions = _plan(tree.body, src_name, df, token)
+    except (_NotIndexable, SyntaxError, TypeError):
+        return None
+    return df.take(positions)
+
+
+def list_indexes() -> pd.DataFrame:
+    rows = []
+    with _INDEXES_LOCK:
+        indexes = [ix for per_src in INDEXES.values() for ix in per_src.values()]
+    for ix in indexes:
+        rows.append({
+            "src": ix["src"],
+            "column": ix["column"],
+            "kind": ix["kind"],
+            "keys": len(ix["hash"]) if ix["kind"] == "hash" else len(ix["keys"]),
+            "rows": ix["rows"],
+            "generation": ix["generation"],
+            "persisted": ix.get("persisted", True),
+            "stale": ix["token"] != frame_token(ix["src"]),
+        })
+    return pd.DataFrame(rows, columns=["src", "column", "kind", "keys", "rows", "generation", "persisted", "stale"])
@@ -0,0 +1,259 @@
+import datetime as dt
+import functools
+import inspect
+import json
+import os
+import re
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+from collections import deque
+
+import helpers.pd as hpd
+from helpers.trace import span
+
+# -------------------------
+# UDF instrumentation (opt-in)
+# -------------------------
+# instrument() swaps every @xw.func found in the api modules (and the UDF
+# module, main) for a timing wrapper. xlwings looks the function up by name
+# on every call and the wrapper carries the original __xlfunc__ metadata, so
+# this works at runtime and uninstrument() restores the originals.
+#
+# Each call appends one tuple to a bounded deque (the ring buffer, no lock);
+# percentiles are computed over the ring when UDF_STATS asks for them, while
+# the call/error totals are exact since the wrappers were installed. Latency
+# is the Python function only, without xlwings' argument conversion.
+# With tracing on (helpers/trace.py) the wrapper also opens the UDF's span.
+#
+# XLW_UDF_STATS=record also keeps each call's arguments, turned back into the
+# cell values Excel passed (a DataFrame becomes its header and rows), so
+# dump_udf_trace() writes a recalc that benchmarks/headless.py can replay.
+
+UDF_STATS_ENV = "XLW_UDF_STATS"  # set to 1 to instrument from startup
+RING_SIZE = 65_536
+CAPTURE_CALLERS = False  # also record the calling cell (a COM round-trip per call)
+RECORD_ARGS = False  # also record the arguments, for dump_udf_trace()
+
+_RING = deque(maxlen=RING_SIZE)  # (name, started epoch, seconds, cells_in, cells_out, error, caller)
+_TRACE = deque(maxlen=RING_SIZE)  # (name, args as cell values, caller, ms)
+_TOTALS = {}  # name -> [calls, errors, seconds]
+_TOTALS_LOCK = threading.Lock()
+_ORIGINALS = {}  # id(wrapper) -> original function
+_MISSING = -2147352572  # what Excel passes for an omitted optional argument
+_ERROR_RESULT = re.compile(r"^(\w+ )?error:", re.I)  # UDFs report failures as "NAME error: ..."
+
+
+def _cells(v) -> int:
+    """Excel cells taken by a UDF argument or return value."""
+    if v is None:
+        return 0
+    if isinstance(v, (pd.DataFrame, pd.Series, np.ndarray)):
+        return int(v.size)
+    if isinstance(v, (list, tuple)):
+        return sum(len(r) if isinstance(r, (list, tuple)) else 1 for r in v)
+    if isinstance(v, dict):
+        return len(v)
+    return 1
+
+
+def _excel_value(v):
+    """A converted UDF argument back as the (JSON-able) cell values it was read from."""
+    if isinstance(v, pd.DataFrame):
+        if not isinstance(v.index, pd.RangeIndex):
+            v = v.reset_index()  # read with index=True: the first column became the index
+        return [[str(c) for c in v.columns]] + [[_excel_value(x) for x in row] for row in v.itertuples(index=False)]
+    if isinstance(v, pd.Series):
+        return [[_excel_value(x)] for x in v]
+    if isinstance(v, np.ndarray):
+        return _excel_value(v.tolist())
+    if isinstance(v, (list, tuple)):
+        return [_excel_value(x) for x in v]
+    if isinstance(v, (dt.datetime, dt.date)):
+        return {"datetime": pd.Timestamp(v).isoformat()}
+    if isinstance(v, np.generic):
+        return v.item()
+    if isinstance(v, float) and v != v:
+        return None  # NaN: an empty cell
+    if v is None or isinstance(v, (str, int, float, bool)):
+        return v
+    return str(v)
+
+
+def _recorded_args(args, defaults) -> list:
+    # an argument still equal to its default was most likely omitted in the formula
+    out = []
+    for i, a in enumerate(args):
+        d = defaults[i] if i < len(defaults) else inspect.Parameter.empty
+        omitted = a is d or (type(a) is type(d) and isinstance(a, (str, int, float, bool)) and a == d)
+        out.append(_MISSING if omitted else _excel_value(a))
+    return out
+
+
+def _caller_address():
+    # xlwings' call_udf holds the calling cell as xw_caller, two frames up
+    frame = sys._getframe(2)
+    caller = frame.f_locals.get("xw_caller")
+    if caller is None:
+        return None
+    try:
+        return f"{caller.sheet.name}!{caller.address}"
+    except Exception:
+        return None
+
+
+def _wrap(name, func):
+    defaults = [p.default for p in inspect.signature(func).parameters.values()]
+
+    @functools.wraps(func)  # copies __xlfunc__ along with __dict__
+    def udf(*args, **kwargs):
+        caller = _caller_address() if CAPTURE_CALLERS or RECORD_ARGS else None
+        start = time.perf_counter()
+        error = None
+        result = None
+        try:
+            with span(name, "udf"):  # top-level span of the call when tracing is on
+                result = func(*args, **kwargs)
+            return result
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            if error is None and isinstance(result, str) and _ERROR_RESULT.match(result):
+                error = "returned"
+            cells_in = sum(_cells(a) for a in args) + sum(_cells(v) for v in kwargs.values())
+            _RING.append((name, time.time() - seconds, seconds, cells_in, _cells(result), error, caller))
+            if RECORD_ARGS:
+                _TRACE.append((name, _recorded_args(args, defaults), caller, seconds * 1000))
+            with _TOTALS_LOCK:
+                totals = _TOTALS.setdefault(name, [0, 0, 0.0])
+                totals[0] += 1
+                totals[1] += error is not None
+                totals[2] += seconds
+
+    _ORIGINALS[id(udf)] = func
+    return udf
+
+
+def _udf_modules(extra=()):
+    names = [n for n in list(sys.modules) if n == "api" or n.startswith("api.") or n in ("main", "__main__")]
+    return [sys.modules[n] for n in names] + list(extra)
+
+
+def instrument(extra_modules=()) -> int:
+    """Wrap every @xw.func of the api modules and main; returns how many were wrapped."""
+    wrappers = {}  # the same function is re-exported by several modules: wrap it once
+    for module in _udf_modules(extra_modules):
+        for attr, value in list(vars(module).items()):
+            if not hasattr(value, "__xlfunc__") or id(value) in _ORIGINALS:
+                continue
+            if inspect.iscoroutinefunction(value):
+                continue
+            wrapper = wrappers.get(id(value))
+            if wrapper is None:
+                wrapper = wrappers[id(value)] = _wrap(value.__name__, value)
+            setattr(module, attr, wrapper)
+    return len(wrappers)
+
+
+def uninstrument(extra_modules=()) -> int:
+    """Put the original functions back; returns how many were restored."""
+    restored = set()
+    for module in _udf_modules(extra_modules):
+        for attr, value in list(vars(module).items()):
+            original = _ORIGINALS.get(id(value))
+            if original is not None:
+                setattr(module, attr, original)
+                restored.add(id(value))
+    for key in restored:
+        _ORIGINALS.pop(key, None)
+    return len(restored)
+
+
+def is_instrumented() -> bool:
+    return bool(_ORIGINALS)
+
+
+def is_recording() -> bool:
+    return RECORD_ARGS and is_instrumented()
+
+
+def reset_udf_stats():
+    _RING.clear()
+    _TRACE.clear()
+    with _TOTALS_LOCK:
+        _TOTALS.clear()
+
+
+def udf_stats() -> pd.DataFrame:
+    """One row per UDF called: totals, p50/p95/p99 latency (ms) and cell counts over the ring."""
+    columns = ["udf", "calls", "errors", "total_s", "p50_ms", "p95_ms", "p99_ms", "max_ms",
+               "avg_cells_in", "avg_cells_out"]
+    calls = pd.DataFrame(list(_RING), columns=["udf", "start", "seconds", "cells_in", "cells_out", "error", "caller"])
+    with _TOTALS_LOCK:
+        totals = {k: list(v) for k, v in _TOTALS.items()}
+    rows = []
+    for name, group in calls.groupby("udf", sort=False):
+        ms = group["seconds"].to_numpy() * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        n, errors, total = totals.get(name, (len(group), group["error"].notna().sum(), ms.sum() / 1000))
+        rows.append([name, n, errors, total, p50, p95, p99, ms.max(),
+                     group["cells_in"].mean(), group["cells_out"].mean()])
+    return pd.DataFrame(rows, columns=columns).sort_values("total_s", ascending=False, ignore_index=True)
+
+
+def dump_udf_stats(path=None) -> str:
+    """
+    Write the summary table and the raw calls in the ring (with the calling
+    cell when CAPTURE_CALLERS is on) to a JSON file; returns its path.
+    """
+    path = path or os.path.join(hpd.CACHE_DIR, f"_udf_stats.{os.getpid()}.json")
+    summary = udf_stats()
+    calls = [{"udf": name, "start": start, "ms": seconds * 1000, "cells_in": cells_in,
+              "cells_out": cells_out, "error": error, "caller": caller}
+             for name, start, seconds, cells_in, cells_out, error, caller in list(_RING)]
+    # slowest cells first: where a recalc actually spends its time
+    cells = {}
+    for c in calls:
+        if c["caller"]:
+            cell = cells.setdefault((c["caller"], c["udf"]), {"caller": c["caller"], "udf": c["udf"], "calls": 0, "ms": 0.0})
+            cell["calls"] += 1
+            cell["ms"] += c["ms"]
+    report = {
+        "summary": json.loads(summary.to_json(orient="records")),
+        "cells": sorted(cells.values(), key=lambda c: c["ms"], reverse=True),
+        "calls": calls,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f)
+    return path
+
+
+def dump_udf_trace(path=None) -> str:
+    """
+    Write the recorded calls (XLW_UDF_STATS=record) as JSON lines of
+    {"udf", "args", "caller", "ms"}, oldest first; returns the file path.
+    """
+    path = path or os.path.join(hpd.CACHE_DIR, f"_udf_trace.{os.getpid()}.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for name, args, caller, ms in list(_TRACE):
+            f.write(json.dumps({"udf": name, "args": args, "caller": caller, "ms": ms}) + "\n")
+    return path
+
+
+def instrument_from_env() -> int:
+    """
+    instrument() if XLW_UDF_STATS is set (1 = timings, "callers" = timings
+    plus the calling cell, "record" = callers plus the arguments for
+    dump_udf_trace); called by main.py at startup.
+    """
+    global CAPTURE_CALLERS, RECORD_ARGS
+    mode = os.environ.get(UDF_STATS_ENV, "").strip().lower()
+    if mode in ("", "0", "false"):
+        return 0
+    RECORD_ARGS = mode == "record"
+    CAPTURE_CALLERS = mode in ("callers", "record")
+    return instrument()
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+import time
+import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+from helpers.trace import span
+
+# -------------------------
+# Background job executor
+# -------------------------
+# Long DF_* calls are submitted here so Excel's calculation thread returns
+# immediately with a job id; DF_RESULT(job_id) polls for the outcome.
+#
+# Python threads cannot be killed: cancelling or timing out a job that is
+# already running marks it for good and discards its result, the work itself
+# finishes in the background. Jobs still queued are cancelled for real. A job
+# is not resubmitted under the same id while its thread is still busy.
+
+JOB_WORKERS = max(2, (os.cpu_count() or 4) // 2)
+JOB_TIMEOUT = 600  # seconds, per job unless overridden
+JOB_RETENTION = 256  # finished jobs kept for DF_RESULT / DF_JOBS
+
+JOBS = OrderedDict()  # job_id -> job dict
+_JOBS_LOCK = threading.Lock()
+_EXECUTOR = None
+
+
+def _executor():
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="xlw-job")
+    return _EXECUTOR
+
+
+def make_job_id(label, *key_parts) -> str:
+    """Same call on the same inputs -> same id, so recalcs don't resubmit work."""
+    digest = hashlib.blake2b(repr((label,) + key_parts).encode(), digest_size=6).hexdigest()
+    return f"{label}-{digest}"
+
+
+def _run(job, fn, args, kwargs):
+    job["started"] = time.time()
+    try:
+        with span(job["label"], "job"):
+            return fn(*args, **kwargs)
+    finally:
+        job["finished"] = time.time()
+        if job["finished"] - job["started"] > job["timeout"]:
+            job["timed_out"] = True  # nobody polled while it overran: still too late
+
+
+def _trim():
+    while len(JOBS) > JOB_RETENTION:
+        oldest_id, oldest = next(iter(JOBS.items()))
+        if not oldest["future"].done():
+            break
+        JOBS.pop(oldest_id)
+
+
+def submit_job(job_id, label, fn, *args, timeout=None, **kwargs) -> str:
+    """
+    Run fn(*args, **kwargs) on the job pool under job_id.
+    A successful job with the same id, or one whose thread is still busy
+    (even if cancelled or timed out), is reused rather than resubmitted.
+    """
+    with _JOBS_LOCK:
+        existing = JOBS.get(job_id)
+        if existing is not None and (job_status(job_id) == "done" or not existing["future"].done()):
+            return job_id
+        job = {
+            "label": label,
+            "submitted": time.time(),
+            "started": None,
+            "finished": None,
+            "timeout": JOB_TIMEOUT if timeout is None else float(timeout),
+            "cancelled": False,
+            "timed_out": False,
+        }
+        job["future"] = _executor().submit(_run, job, fn, args, kwargs)
+        JOBS[job_id] = job
+        JOBS.move_to_end(job_id)
+        _trim()
+    return job_id
+
+
+def job_status(job_id) -> str:
+    job = JOBS.get(job_id)
+    if job is None:
+        return "unknown"
+    fut = job["future"]
+    if job["cancelled"] or fut.cancelled():
+        return "cancelled"
+    if job["timed_out"]:
+        return "timeout"
+    if fut.done():
+        return "error" if fut.exception() is not None else "done"
+    if job["started"] is None:
+        return "queued"
+    if time.time() - job["started"] > job["timeout"]:
+        job["timed_out"] = True  # sticky: a late result is discarded
+        fut.cancel()
+        return "timeout"
+    return "running"
+
+
+def job_result(job_id):
+    """Result of a finished job; raises if the job is not done."""
+    status = job_status(job_id)
+    if status != "done":
+        raise RuntimeError(f"job {job_id} is {status}")
+    return JOBS[job_id]["future"].result()
+
+
+def job_error(job_id):
+    job = JOBS.get(job_id)
+    try:
+        return job["future"].exception() if job else None
+    except CancelledError:
+        return None
+
+
+def cancel_job(job_id) -> str:
+    job = JOBS.get(job_id)
+    if job is None:
+        return "unknown"
+    if not job["future"].cancel() and not job["future"].done():
+        job["cancelled"] = True  # running: result will be discarded
+    return job_status(job_id)
+
+
+def list_jobs() -> pd.DataFrame:
+    now = time.time()
+    rows = []
+    for job_id, job in list(JOBS.items()):
+        started, finished = job["started"], job["finished"]
+        rows.append({
+            "job_id": job_id,
+            "label": job["label"],
+            "status": job_status(job_id),
+            "queued_s": round((started or now) - job["submitted"], 3),
+            "run_s": round((finished or now) - started, 3) if started else None,
+            "timeout_s": job["timeout"],
+        })
+    return pd.DataFrame(rows, columns=["job_id", "label", "status", "queued_s", "run_s", "timeout_s"])
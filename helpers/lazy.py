@@ -0,0 +1,78 @@
+import importlib
+import threading
+
+# -------------------------
+# Deferred imports
+# -------------------------
+# The UDF server imports every api module at startup to register the
+# @xw.func functions, so module-level imports of heavy libraries are paid on
+# every cold start. A LazyModule stands in for the module and imports it on
+# first attribute access, i.e. on the first call of a UDF that needs it.
+# Every proxy is registered by name so a warm start (helpers/warm.py) can
+# preload the ones the previous session ended up using.
+
+_PROXIES = {}  # name -> [LazyModule]
+_PROXIES_LOCK = threading.Lock()
+
+
+class LazyModule:
+    def __init__(self, name, loader=None):
+        self._name = name
+        self._loader = loader or (lambda: importlib.import_module(name))
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = self._loader()
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name, loader=None) -> LazyModule:
+    """
+    Module proxy that imports `name` on first use.
+    loader: optional callable doing the import (and any one-off setup) itself.
+    """
+    proxy = LazyModule(name, loader)
+    with _PROXIES_LOCK:
+        _PROXIES.setdefault(name, []).append(proxy)
+    return proxy
+
+
+def loaded_modules() -> list:
+    """Names of the lazy proxies that have been loaded in this process."""
+    with _PROXIES_LOCK:
+        return [name for name, proxies in _PROXIES.items() if any(p._module is not None for p in proxies)]
+
+
+def preload(names) -> list:
+    """Load the registered proxies called names (unknown names are skipped); returns those loaded."""
+    done = []
+    for name in names:
+        with _PROXIES_LOCK:
+            proxies = list(_PROXIES.get(name, ()))
+        for p in proxies:
+            p._load()
+        if proxies:
+            done.append(name)
+    return done
+
+
+def lazy_callable(module, attr):
+    """Function that imports module on its first call and forwards to module.attr."""
+    mod = lazy_import(module)
+
+    def call(*args, **kwargs):
+        return getattr(mod, attr)(*args, **kwargs)
+
+    call.__name__ = attr
+    return call
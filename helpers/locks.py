@@ -0,0 +1,27 @@
+import os
+import threading
+from filelock import FileLock
+
+# -------------------------
+# Cross-process locks
+# -------------------------
+# One FileLock instance per lock file and process: FileLock is re-entrant per
+# instance, but two instances on the same file in one process would block
+# each other.
+LOCK_TIMEOUT = 30  # seconds
+_LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def file_lock(path) -> FileLock:
+    path = os.path.abspath(path)
+    with _LOCKS_GUARD:
+        lock = _LOCKS.get(path)
+        if lock is None:
+            lock = _LOCKS[path] = FileLock(path, timeout=LOCK_TIMEOUT)
+        return lock
+
+
+def name_lock(root, name) -> FileLock:
+    """Lock guarding every write to the cached frame `name` under root."""
+    return file_lock(os.path.join(root, f"{name}.lock"))
@@ -0,0 +1,129 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from collections import OrderedDict
+
+import helpers.pd as hpd
+from helpers.pd import auto_load, auto_load_with_token, refresh_manifest, DF_REGISTRY, REGISTRY_LOCK
+from helpers.trace import span
+
+# -------------------------
+# Paged reads of named frames
+# -------------------------
+# DF_PAGE / DF_WINDOW return a slice of a named frame, so only `limit` rows
+# are materialized and sent to Excel however big the frame is.
+#
+# A sorted page needs the sort order of the whole frame. It is computed once
+# per (frame, sort keys) as a permutation (row positions in sorted order) and
+# kept here, tied to the frame_token it was built from like cubes and indexes;
+# every further page is a take() of `limit` positions. The row count comes
+# from the registry or the cached parquet footers, without loading the frame.
+
+PAGE_MAX_ORDERS = 8  # cached permutations (8 bytes per row each), least recently used dropped
+
+ORDERS = OrderedDict()  # (src_name, sort keys) -> {"token", "perm"}
+_ROW_COUNTS = {}  # src_name -> (token, rows)
+_PAGE_LOCK = threading.Lock()
+
+
+def parse_sort(sort_by) -> tuple:
+    """
+    "region, -qty" / ["region", "-qty"] / "qty desc" -> (("region", True), ("qty", False)).
+    A leading "-" or a trailing " desc" sorts that column descending.
+    """
+    if sort_by is None or sort_by == "":
+        return ()
+    items = sort_by if isinstance(sort_by, (list, tuple)) else str(sort_by).split(",")
+    keys = []
+    for item in items:
+        item = str(item[0] if isinstance(item, (list, tuple)) else item).strip()
+        if not item:
+            continue
+        ascending = True
+        if item.startswith("-"):
+            item, ascending = item[1:].strip(), False
+        elif item.lower().endswith((" desc", " asc")):
+            item, direction = item.rsplit(" ", 1)
+            item, ascending = item.strip(), direction.lower() == "asc"
+        keys.append((item, ascending))
+    return tuple(keys)
+
+
+def _build_order(df: pd.DataFrame, keys) -> np.ndarray:
+    cols = [c for c, _ in keys]
+    missing = [c for c in cols if c not in df.columns]
+    if missing:
+        raise KeyError(f"sort columns not in frame: {missing}")
+    # positions, not labels: sort a positional copy of the key columns only
+    frame = df[cols].reset_index(drop=True)
+    ordered = frame.sort_values(cols, ascending=[a for _, a in keys], kind="stable", na_position="last")
+    return ordered.index.to_numpy(dtype=np.int64)
+
+
+def sort_order(src_name, df: pd.DataFrame, keys, token=None) -> np.ndarray:
+    """
+    Row positions of df in keys order; built on first use, then cached for
+    token, the frame_token of df (not cached without one).
+    """
+    cache_key = (src_name, keys)
+    with _PAGE_LOCK:
+        entry = ORDERS.get(cache_key)
+        if entry is not None and entry["token"] == token and token is not None:
+            ORDERS.move_to_end(cache_key)
+            return entry["perm"]
+    with span("sort_order", df=src_name, keys=str(keys)) as s:
+        perm = _build_order(df, keys)
+        s.set(rows=len(perm))
+    if token is None:
+        return perm
+    with _PAGE_LOCK:
+        ORDERS[cache_key] = {"token": token, "perm": perm}
+        ORDERS.move_to_end(cache_key)
+        while len(ORDERS) > PAGE_MAX_ORDERS:
+            ORDERS.popitem(last=False)
+    return perm
+
+
+def drop_orders(src_name) -> int:
+    """Forget the cached sort orders and row count of src_name."""
+    with _PAGE_LOCK:
+        stale = [k for k in ORDERS if k[0] == src_name]
+        for k in stale:
+            del ORDERS[k]
+        _ROW_COUNTS.pop(src_name, None)
+    return len(stale)
+
+
+def frame_rows(src_name) -> int:
+    """
+    Row count of a named frame: from the registry if it is loaded, else from
+    the parquet footers of its cached version (file + appended fragments).
+    """
+    df = DF_REGISTRY.get(src_name)
+    if df is not None:
+        return len(df)
+    with REGISTRY_LOCK:
+        entry = refresh_manifest().get(src_name)
+    if entry is None:
+        return len(auto_load(src_name))  # not cached on disk (e.g. shared only)
+    cached = _ROW_COUNTS.get(src_name)
+    if cached is not None and cached[0] == entry["token"]:
+        return cached[1]
+    files = [entry["file"]] + entry.get("fragments", [])
+    rows = sum(pq.ParquetFile(os.path.join(hpd.CACHE_DIR, f)).metadata.num_rows for f in files)
+    _ROW_COUNTS[src_name] = (entry["token"], rows)
+    return rows
+
+
+def page(src_name, offset=0, limit=1000, sort_by=None) -> pd.DataFrame:
+    """Rows [offset, offset + limit) of src_name, in sort_by order if given."""
+    offset, limit = max(0, int(offset)), max(0, int(limit))
+    df, token = auto_load_with_token(src_name)
+    keys = parse_sort(sort_by)
+    if not keys:
+        return df.iloc[offset:offset + limit]
+    positions = sort_order(src_name, df, keys, token)[offset:offset + limit]
+    return df.take(positions)
+
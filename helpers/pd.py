@@ -1,11 +1,27 @@
 import inspect
-import shutil
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import ast
+import hashlib
+import json
 import os
+import re
+import threading
+import time
+import uuid
+import numpy as np
+from datetime import date, datetime
 from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from pandas.api.types import union_categoricals
 from typing import Any
 
+from helpers.locks import file_lock, name_lock
+from helpers.shm import SharedFrameStore
+from helpers.trace import span
+
 # -------------------------
 # Global registry + cache
 # -------------------------
@@ -16,57 +32,1050 @@ os.makedirs(CACHE_DIR, exist_ok=True)
 MEMORY_THRESHOLD = 50_000_000  # 50 MB
 LRU_MAX_ITEMS = 3
 
+# "local": per-process registry (parquet is the only thing shared)
+# "shared": frames are also published to shared memory so other processes
+#           (another Excel instance, a worker) attach them zero-copy
+REGISTRY_BACKEND = "local"
+SHARED_STORE = SharedFrameStore(CACHE_DIR)
+_SHARED_GENERATIONS = {}  # name -> shared generation held in DF_REGISTRY
+_FRAME_TOKENS = {}  # name -> token of the copy held in DF_REGISTRY (see frame_token)
+_PENDING_WRITES = {}  # name -> (df, token): dropped by the LRU, still being written to the cache
+# background jobs (helpers/jobs.py) call auto_load/auto_cache from worker threads.
+# REGISTRY_LOCK only guards the dicts above; reading or writing a frame's files
+# happens outside it under that frame's name_lock, so a slow load holds up
+# callers of the same frame only. Lock order: name_lock, then REGISTRY_LOCK.
+REGISTRY_LOCK = threading.RLock()
+
+# -------------------------
+# Parquet layout + parallel decode
+# -------------------------
+ROW_GROUP_TARGET_BYTES = 64 * 1024 * 1024  # ~64 MB of in-memory data per row group
+ROW_GROUP_MIN_ROWS = 50_000
+PARALLEL_READ_MIN_BYTES = 64 * 1024 * 1024  # smaller files are read in one go
+PARQUET_READ_WORKERS = os.cpu_count() or 4
+
+# -------------------------
+# Cache write policy
+# -------------------------
+CACHE_WRITE_POLICY = {
+    "compression": "zstd",
+    "compression_level": 3,
+    # per-column codec overrides, e.g. {"notes": "snappy"}
+    "column_compression": {},
+    # object/string columns with nunique <= ratio * rows are stored as category
+    "category_max_ratio": 0.5,
+}
+_CACHE_META_KEY = b"xlwings_cache"
+_LEVELLED_CODECS = {"zstd", "gzip", "brotli"}
+
 
 def get_cache_path(df_name):
-    return os.path.join(CACHE_DIR, f"{df_name}.parquet")
+    """Path of the current cached version of df_name (None if not cached)."""
+    entry = refresh_manifest().get(df_name)
+    if entry is not None:
+        return os.path.join(CACHE_DIR, entry["file"])
+    legacy = os.path.join(CACHE_DIR, f"{df_name}.parquet")
+    return legacy if os.path.exists(legacy) else None
+
+
+def versioned_cache_path(df_name, version):
+    return os.path.join(CACHE_DIR, f"{df_name}.v{version}.parquet")
+
+
+def fragment_path(df_name, version):
+    """Rows appended to df_name by that version (see append_frame)."""
+    return os.path.join(CACHE_DIR, f"{df_name}.parts", f"v{version}.parquet")
+
+
+def cache_files(df_name):
+    """Files making up the current cached version of df_name: base file, then fragments."""
+    entry = refresh_manifest().get(df_name)
+    if entry is not None:
+        return [os.path.join(CACHE_DIR, f) for f in [entry["file"]] + entry.get("fragments", [])]
+    legacy = get_cache_path(df_name)
+    return [legacy] if legacy else []
+
+
+def index_cache_path(df_name, version, column):
+    """Sidecar file holding a secondary index on column of that version of df_name."""
+    tag = re.sub(r"\W+", "_", str(column))[:32]
+    digest = hashlib.blake2b(str(column).encode(), digest_size=4).hexdigest()
+    return os.path.join(CACHE_DIR, f"{df_name}.v{version}.idx-{tag}-{digest}.npy")
+
+
+def set_read_workers(n: int):
+    """Set how many threads decode row groups when a cached frame is read back."""
+    global PARQUET_READ_WORKERS
+    PARQUET_READ_WORKERS = max(1, int(n))
+    return PARQUET_READ_WORKERS
+
+
+def set_cache_policy(**policy):
+    """Update the cache write policy; unknown keys are rejected."""
+    unknown = set(policy) - set(CACHE_WRITE_POLICY)
+    if unknown:
+        raise ValueError(f"Unknown cache policy keys: {sorted(unknown)}")
+    CACHE_WRITE_POLICY.update(policy)
+    return dict(CACHE_WRITE_POLICY)
+
+
+def encode_for_cache(df: pd.DataFrame):
+    """
+    Convert low-cardinality object/string columns to category before writing.
+
+    Returns (frame_to_write, {column: original dtype}) so the load side can
+    put the columns back exactly as they were in the registry.
+    """
+    ratio = CACHE_WRITE_POLICY["category_max_ratio"]
+    out = df
+    encoded = {}
+    if not ratio or len(df) == 0:
+        return out, encoded
+    for col in df.columns:
+        s = df[col]
+        if not (pd.api.types.is_object_dtype(s.dtype) or pd.api.types.is_string_dtype(s.dtype)):
+            continue
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            continue
+        try:
+            if s.nunique(dropna=True) > ratio * len(s):
+                continue
+            cat = s.astype("category")
+        except TypeError:
+            continue  # unhashable cells (lists etc.) stay as they are
+        if out is df:
+            out = df.copy(deep=False)
+        out[col] = cat
+        encoded[str(col)] = str(s.dtype)
+    return out, encoded
+
+
+def decode_from_cache(table: pa.Table) -> pd.DataFrame:
+    """Arrow table written by write_parquet -> DataFrame with original dtypes restored."""
+    meta = (table.schema.metadata or {}).get(_CACHE_META_KEY)
+    df = table.to_pandas(use_threads=True)
+    if meta:
+        for col, dtype in json.loads(meta).get("encoded", {}).items():
+            if col in df.columns:
+                df[col] = df[col].astype(dtype)
+    return df
+
+
+def row_group_size(df: pd.DataFrame) -> int:
+    """Rows per row group so that large frames split into ~ROW_GROUP_TARGET_BYTES chunks."""
+    if len(df) == 0:
+        return ROW_GROUP_MIN_ROWS
+    row_bytes = max(1, int(df.memory_usage(index=False).sum() / len(df)))
+    return max(ROW_GROUP_MIN_ROWS, ROW_GROUP_TARGET_BYTES // row_bytes)
+
+
+def write_parquet(df: pd.DataFrame, path: str):
+    """Write a frame to parquet following CACHE_WRITE_POLICY, sized for parallel reads."""
+    with span("write_parquet", file=os.path.basename(path), rows=len(df)):
+        _write_parquet(df, path)
+
+
+def _write_parquet(df: pd.DataFrame, path: str):
+    encoded_df, encoded = encode_for_cache(df)
+    table = pa.Table.from_pandas(encoded_df)
+    meta = dict(table.schema.metadata or {})
+    meta[_CACHE_META_KEY] = json.dumps({"encoded": encoded}).encode()
+    table = table.replace_schema_metadata(meta)
+
+    codec = CACHE_WRITE_POLICY["compression"]
+    level = CACHE_WRITE_POLICY["compression_level"]
+    overrides = CACHE_WRITE_POLICY["column_compression"]
+    if overrides:
+        codec = {name: overrides.get(name, codec) for name in table.column_names}
+        # only some codecs take a level; pyarrow rejects it for the others
+        level = {name: level for name, c in codec.items()
+                 if str(c).lower() in _LEVELLED_CODECS} or None
+    elif str(codec).lower() not in _LEVELLED_CODECS:
+        level = None
+    pq.write_table(
+        table, path,
+        row_group_size=row_group_size(df),
+        compression=codec,
+        compression_level=level,
+        use_dictionary=True,
+    )
+
+
+def read_parquet(path: str, max_workers=None) -> pd.DataFrame:
+    """
+    Read a cached parquet file, decoding row groups in parallel for large files.
+
+    Small files (or files with a single row group) are read in one call.
+    Larger ones are split across a thread pool, one row group per task; pyarrow
+    releases the GIL while decoding so the threads actually run concurrently.
+    """
+    with span("read_parquet", file=os.path.basename(path)):
+        return _read_parquet(path, max_workers)
+
+
+def _read_parquet(path: str, max_workers=None) -> pd.DataFrame:
+    workers = max_workers or PARQUET_READ_WORKERS
+    if workers <= 1 or os.path.getsize(path) < PARALLEL_READ_MIN_BYTES:
+        return decode_from_cache(pq.read_table(path))
+
+    num_groups = pq.ParquetFile(path).metadata.num_row_groups
+    if num_groups < 2:
+        return decode_from_cache(pq.read_table(path))
+
+    def read_group(i):
+        # one reader per task; ParquetFile handles are not shared across threads
+        with pq.ParquetFile(path) as pf:
+            return pf.read_row_group(i, use_threads=False)
+
+    with ThreadPoolExecutor(max_workers=min(workers, num_groups)) as pool:
+        tables = list(pool.map(read_group, range(num_groups)))
+
+    return decode_from_cache(pa.concat_tables(tables))
+
+
+# -------------------------
+# Cache manifest
+# -------------------------
+# {"entries": {name: {"file", "version", "token", "size", "last_access", "rebuild_cost",
+#                     "fingerprint", "fragments": [appended parquet files],
+#                     "indexes": {column: {"kind", "file"}}}},
+#  "stale": [files superseded but not yet deletable]}
+# Persisted as JSON in CACHE_DIR so cache size is known without walking the
+# directory. Every change goes through manifest_transaction(), which holds a
+# cross-process lock and re-reads the file first, so several Excel instances
+# can share one cache.
+#
+# "version" numbers the files of a name and starts again at 1 once the entry
+# is evicted; "token" is new for every write or append and never reused, so
+# results derived from a frame (cubes, indexes, sort orders, figures) are
+# keyed on it rather than on the version.
+CACHE_MANIFEST = {}
+STALE_FILES = []
+# in-process guard of the two above; taken after the file lock, never around REGISTRY_LOCK
+_MANIFEST_LOCK = threading.RLock()
+MANIFEST_FILE = "_manifest.json"
+_manifest_mtime = None
+_VERSIONED_FILE = re.compile(r"^(?P<name>.+?)(\.v(?P<version>\d+))?\.parquet$")
+
+
+def _new_token() -> str:
+    return uuid.uuid4().hex
+
+
+def _manifest_path():
+    return os.path.join(CACHE_DIR, MANIFEST_FILE)
+
+
+def _manifest_lock():
+    return file_lock(os.path.join(CACHE_DIR, "_manifest.lock"))
+
+
+def _scan_cache_dir():
+    """One-off scan of the cache dir, used only when no manifest exists yet."""
+    entries, stale = {}, []
+    now = time.time()
+    with os.scandir(CACHE_DIR) as it:
+        for item in it:
+            m = _VERSIONED_FILE.match(item.name)
+            if not (item.is_file() and m):
+                continue
+            st = item.stat()
+            name, version = m.group("name"), int(m.group("version") or 0)
+            old = entries.get(name)
+            if old is not None and old["version"] > version:
+                stale.append(item.name)
+                continue
+            if old is not None:
+                stale.append(old["file"])
+            entries[name] = {
+                "file": item.name,
+                "version": version,
+                "token": _new_token(),
+                "size": st.st_size,
+                "last_access": min(st.st_mtime, now),
+                "rebuild_cost": 0.0,
+            }
+    return entries, stale
+
+
+def _manifest_file_mtime():
+    try:
+        return os.stat(_manifest_path()).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def refresh_manifest():
+    """
+    Re-read the manifest if another process changed it; returns the entries.
+    The re-read entries replace CACHE_MANIFEST as a whole, so threads reading
+    it meanwhile see the old or the new manifest, never an empty one.
+    """
+    mtime = _manifest_file_mtime()
+    if mtime is not None and mtime == _manifest_mtime:
+        return CACHE_MANIFEST
+    with _MANIFEST_LOCK:
+        mtime = _manifest_file_mtime()  # another thread may have re-read it already
+        if mtime is not None and mtime == _manifest_mtime:
+            return CACHE_MANIFEST
+        return _reload_manifest(mtime)
+
+
+def _reload_manifest(mtime):
+    """Read the manifest (or scan the cache dir) and swap it in; call under _MANIFEST_LOCK."""
+    global CACHE_MANIFEST, _manifest_mtime
+    path = _manifest_path()
+    if mtime is None:
+        entries, stale = _scan_cache_dir()
+    else:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            entries, stale = data.get("entries", {}), data.get("stale", [])
+        except (ValueError, OSError):
+            entries, stale = _scan_cache_dir()
+
+    # keep access times recorded in memory since the last save
+    for name, entry in entries.items():
+        entry.setdefault("token", _new_token())  # written before tokens existed
+        mine = CACHE_MANIFEST.get(name)
+        if mine is not None and mine["file"] == entry["file"]:
+            entry["last_access"] = max(entry["last_access"], mine["last_access"])
+    CACHE_MANIFEST = entries
+    STALE_FILES[:] = stale
+    _manifest_mtime = mtime
+    return entries
+
+
+def save_manifest():
+    """Write the manifest via temp file + rename so it is never half-written."""
+    global _manifest_mtime
+    path = _manifest_path()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"entries": CACHE_MANIFEST, "stale": STALE_FILES}, f)
+    os.replace(tmp, path)
+    _manifest_mtime = os.stat(path).st_mtime_ns
+
+
+@contextmanager
+def manifest_transaction():
+    """Lock, re-read, let the caller mutate CACHE_MANIFEST, then save."""
+    with _manifest_lock(), _MANIFEST_LOCK:
+        refresh_manifest()
+        yield CACHE_MANIFEST
+        save_manifest()
+
+
+def cache_size() -> int:
+    return sum(e["size"] for e in refresh_manifest().values())
+
+
+def _delete_cache_file(fname):
+    """Remove a superseded file; if a reader still has it open (Windows), retry later."""
+    try:
+        os.remove(os.path.join(CACHE_DIR, fname))
+    except FileNotFoundError:
+        pass
+    except OSError:
+        if fname not in STALE_FILES:
+            STALE_FILES.append(fname)
+        return False
+    return True
+
+
+def _entry_files(entry):
+    """The parquet file of an entry plus its appended fragments and index sidecars."""
+    return [entry["file"]] + entry.get("fragments", []) + \
+        [ix["file"] for ix in entry.get("indexes", {}).values()]
+
+
+def _entry_size(entry) -> int:
+    return sum(os.path.getsize(os.path.join(CACHE_DIR, f)) for f in _entry_files(entry))
+
+
+def _delete_entry_files(old, new=None):
+    """Delete the files of a superseded entry that the new entry no longer uses."""
+    keep = set(_entry_files(new)) if new else set()
+    for f in _entry_files(old):
+        if f not in keep:
+            _delete_cache_file(f)
+    if old.get("fragments") and not (new or {}).get("fragments"):
+        try:
+            os.rmdir(os.path.dirname(os.path.join(CACHE_DIR, old["fragments"][0])))
+        except OSError:
+            pass  # not empty yet (a stale fragment is still open)
+
+
+def purge_stale_files():
+    """Retry deleting superseded versions. Call inside manifest_transaction()."""
+    STALE_FILES[:] = [f for f in STALE_FILES if not _delete_cache_file(f)]
+
+
+def manifest_record(df_name, path, rebuild_cost=0.0, version=None, fingerprint=None, token=None):
+    """
+    Point df_name at a newly written version. Call inside manifest_transaction().
+    fingerprint: content hash of the source the version was built from (see frame_fingerprint)
+    token: id of the written copy (default: a new one)
+    """
+    old = CACHE_MANIFEST.get(df_name)
+    fname = os.path.basename(path)
+    if version is None:
+        version = (old["version"] + 1) if old else 1
+    CACHE_MANIFEST[df_name] = {
+        "file": fname,
+        "version": version,
+        "token": token or _new_token(),
+        "size": os.path.getsize(path),
+        "last_access": time.time(),
+        "rebuild_cost": float(rebuild_cost),
+    }
+    if fingerprint is not None:
+        CACHE_MANIFEST[df_name]["fingerprint"] = fingerprint
+    if old is not None and old["file"] != fname:
+        _delete_entry_files(old)
+
+
+def manifest_touch(df_name):
+    entry = CACHE_MANIFEST.get(df_name)
+    if entry is not None:
+        entry["last_access"] = time.time()
+
+
+def manifest_remove(df_name, delete_file=True):
+    """Drop an entry (and its file). Call inside manifest_transaction()."""
+    entry = CACHE_MANIFEST.pop(df_name, None)
+    if entry is not None and delete_file:
+        _delete_entry_files(entry)
+    return entry
+
+
+def entry_value(entry, now=None) -> float:
+    """
+    How much an entry is worth keeping: rebuild seconds saved per MB on disk,
+    decayed by hours since last access. Lowest value is evicted first.
+    """
+    now = now or time.time()
+    size_mb = max(entry["size"], 1) / 1e6
+    age_hours = max(0.0, now - entry["last_access"]) / 3600
+    return (entry["rebuild_cost"] + 0.001) / size_mb / (1 + age_hours)
+
+
+def enforce_cache_budget(max_size=None, keep=()):
+    """
+    Evict least-valuable entries one at a time until the cache fits max_size.
+    Call inside manifest_transaction().
+    """
+    max_size = CACHE_MAX_SIZE if max_size is None else max_size
+    total = sum(e["size"] for e in CACHE_MANIFEST.values())
+    evicted = []
+    now = time.time()
+    while total > max_size:
+        # frames still in memory go last: dropping their file only means
+        # rewriting it when the LRU lets go of them
+        candidates = [(n in DF_REGISTRY, entry_value(e, now), n)
+                      for n, e in CACHE_MANIFEST.items() if n not in keep]
+        if not candidates:
+            break
+        _, _, name = min(candidates)
+        total -= manifest_remove(name)["size"]
+        evicted.append(name)
+    return evicted
+
+
+def persist_frame(df_name, df, rebuild_cost=0.0, keep_in_budget=True, fingerprint=None, token=None):
+    """
+    Write df as the next version of df_name, recorded under token (default: a new one).
+
+    The file is written under a temp name and renamed into place, so readers
+    never see a partial file; versions are immutable once renamed. The
+    per-name lock serializes writers across processes, and the manifest
+    switch to the new version happens atomically under the manifest lock.
+    """
+    with name_lock(CACHE_DIR, df_name):
+        with _manifest_lock():
+            entry = refresh_manifest().get(df_name)
+        version = (entry["version"] + 1) if entry else 1
+        path = versioned_cache_path(df_name, version)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        start = time.perf_counter()
+        try:
+            write_parquet(df, tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        with manifest_transaction():
+            manifest_record(df_name, path, rebuild_cost + time.perf_counter() - start, version, fingerprint, token)
+            purge_stale_files()
+            enforce_cache_budget(keep=(df_name,) if keep_in_budget else ())
+    return path
+
+
+def read_cached_frame(df_name, retries=3):
+    """
+    Read the current version of df_name from disk, or None if it is not cached.
+
+    Readers take no lock: they resolve the current file from the manifest and
+    read it. If a writer replaced and deleted that version in between, the
+    read is retried against the new one.
+    """
+    return read_cached_version(df_name, retries)[0]
+
+
+def read_cached_version(df_name, retries=3):
+    """(df, token) of the current cached version of df_name; (None, None) if not cached."""
+    for _ in range(retries):
+        entry = refresh_manifest().get(df_name)
+        if entry is None:
+            legacy = get_cache_path(df_name)
+            if legacy is None:
+                return None, None
+            files, token = [legacy], None
+        else:
+            files = [os.path.join(CACHE_DIR, f) for f in [entry["file"]] + entry.get("fragments", [])]
+            token = entry["token"]
+        try:
+            frames = [read_parquet(path) for path in files]
+        except FileNotFoundError:
+            continue
+        return (frames[0] if len(frames) == 1 else concat_fragments(frames)), token
+    return None, None
 
 
 def memory_check_and_lru():
+    with REGISTRY_LOCK:
+        evicted = _lru_overflow()
+    _persist_evicted(evicted)
+
+
+def _lru_overflow():
+    """
+    Drop registry entries beyond LRU_MAX_ITEMS; call under REGISTRY_LOCK.
+    Frames not on disk yet stay readable from _PENDING_WRITES; their names
+    are returned for _persist_evicted, once the caller has released its locks.
+    """
+    evicted = []
     while len(DF_REGISTRY) > LRU_MAX_ITEMS:
         old_name, old_df = DF_REGISTRY.popitem(last=False)
-        path = get_cache_path(old_name)
-        old_df.to_parquet(path)
+        token = _FRAME_TOKENS.pop(old_name, None)
+        if old_name in refresh_manifest():
+            continue  # already persisted by auto_cache
+        _PENDING_WRITES[old_name] = (old_df, token)
+        evicted.append(old_name)
+    return evicted
+
+
+def _persist_evicted(names):
+    for name in names:
+        with name_lock(CACHE_DIR, name):
+            with REGISTRY_LOCK:
+                pending = _PENDING_WRITES.get(name)
+            if pending is None:
+                continue  # replaced or dropped meanwhile
+            try:
+                persist_frame(name, pending[0], keep_in_budget=False, token=pending[1])
+            finally:
+                with REGISTRY_LOCK:
+                    if _PENDING_WRITES.get(name) is pending:
+                        del _PENDING_WRITES[name]
+
+
+def set_registry_backend(mode: str):
+    global REGISTRY_BACKEND
+    mode = str(mode).lower()
+    if mode not in ("local", "shared"):
+        raise ValueError(f"Unknown registry backend '{mode}' (use 'local' or 'shared')")
+    REGISTRY_BACKEND = mode
+    return REGISTRY_BACKEND
+
+
+def _attach_shared(df_name):
+    """(df, token, generation) of df_name from shared memory; None if not published."""
+    with span("shared_attach", df=df_name):
+        attached = SHARED_STORE.attach(df_name)
+    if attached is None:
+        return None
+    generation, df = attached
+    return df, SHARED_STORE.attached_token(df_name), generation
+
+
+def get_generation(df_name):
+    """
+    Version number of the current cached copy of df_name (0 if unknown).
+    Bumped on every auto_cache but reused after an eviction: key derived
+    results on frame_token instead.
+    """
+    with REGISTRY_LOCK:
+        if REGISTRY_BACKEND == "shared" and df_name in _SHARED_GENERATIONS:
+            return _SHARED_GENERATIONS[df_name]
+        entry = refresh_manifest().get(df_name)
+        return entry["version"] if entry else 0
+
+
+def frame_token(df_name):
+    """
+    Id of the copy of df_name that auto_load returns now (None if there is
+    none): new on every write, append or reload, never reused, so it keys
+    results derived from the frame. Shared frames use the published token.
+    """
+    with REGISTRY_LOCK:
+        if df_name in DF_REGISTRY:
+            return _FRAME_TOKENS.get(df_name)
+        if df_name in _PENDING_WRITES:
+            return _PENDING_WRITES[df_name][1]
+        entry = refresh_manifest().get(df_name)
+        return entry["token"] if entry else None
 
 
 def auto_load(df_name):
+    return auto_load_with_token(df_name)[0]
+
+
+def auto_load_with_token(df_name):
+    """(df, frame_token) of df_name, read together so the token describes df."""
+    # nested spans show where the frame came from (shared_attach / read_parquet);
+    # none means a registry hit. Time spent waiting for the locks is included.
+    with span("auto_load", df=df_name):
+        with REGISTRY_LOCK:
+            hit = _registry_get(df_name)
+        if hit is not None:
+            return hit
+        with name_lock(CACHE_DIR, df_name):
+            df, token, evicted = _auto_load(df_name)
+        _persist_evicted(evicted)
+        return df, token
+
+
+def _registry_get(df_name):
+    """(df, token) of the copy of df_name held in memory, or None; call under REGISTRY_LOCK."""
     if df_name in DF_REGISTRY:
-        DF_REGISTRY.move_to_end(df_name)
-        return DF_REGISTRY[df_name]
-    path = get_cache_path(df_name)
-    if os.path.exists(path):
-        df = pd.read_parquet(path)
-        DF_REGISTRY[df_name] = df
-        memory_check_and_lru()
-        return df
-    raise ValueError(f"DF '{df_name}' not found")
-
-
-def auto_cache(df_name, df):
-    path = get_cache_path(df_name)
-    df.to_parquet(path)
+        current = SHARED_STORE.token(df_name) if REGISTRY_BACKEND == "shared" else None
+        if current is None or current == _FRAME_TOKENS.get(df_name):
+            DF_REGISTRY.move_to_end(df_name)
+            manifest_touch(df_name)
+            return DF_REGISTRY[df_name], _FRAME_TOKENS.get(df_name)
+        # another process published a newer version
+        DF_REGISTRY.pop(df_name)
+        _FRAME_TOKENS.pop(df_name, None)
+        return None
+    return _PENDING_WRITES.get(df_name)
+
+
+def _auto_load(df_name):
+    """
+    (df, token, evicted) of df_name, read from shared memory or the cache on
+    a registry miss. Call under name_lock(df_name); pass evicted to
+    _persist_evicted after releasing it.
+    """
+    with REGISTRY_LOCK:
+        hit = _registry_get(df_name)  # loaded by another thread meanwhile
+    if hit is not None:
+        return hit[0], hit[1], []
+    loaded = _attach_shared(df_name) if REGISTRY_BACKEND == "shared" else None
+    if loaded is None:
+        df, token = read_cached_version(df_name)
+        if df is None:
+            raise ValueError(f"DF '{df_name}' not found")
+        loaded = (df, token, None)
+    with REGISTRY_LOCK:
+        evicted = _publish(*loaded, df_name=df_name)
+    return loaded[0], loaded[1], evicted
+
+
+def _publish(df, token, generation=None, *, df_name):
+    """Make df (with its token) the registry entry for df_name; call under REGISTRY_LOCK."""
     DF_REGISTRY[df_name] = df
-    memory_check_and_lru()
+    DF_REGISTRY.move_to_end(df_name)
+    _FRAME_TOKENS[df_name] = token
+    _PENDING_WRITES.pop(df_name, None)
+    if generation is None:
+        _SHARED_GENERATIONS.pop(df_name, None)
+    else:
+        _SHARED_GENERATIONS[df_name] = generation
+    manifest_touch(df_name)
+    return _lru_overflow()
+
+
+def auto_cache(df_name, df, rebuild_cost=0.0, fingerprint=None):
+    """
+    Persist a frame and make it the registry entry for df_name.
+    rebuild_cost: seconds it took to produce df (the write time is added),
+                  used to decide what to evict when the cache is over budget.
+    fingerprint: content hash of the input df was built from, recorded so an
+                 identical reload can be skipped (see is_unchanged)
+    """
+    with span("auto_cache", df=df_name, rows=len(df)):
+        with name_lock(CACHE_DIR, df_name):
+            evicted = _auto_cache(df_name, df, rebuild_cost, fingerprint)
+        _persist_evicted(evicted)
+
+
+def _auto_cache(df_name, df, rebuild_cost, fingerprint=None):
+    token = _new_token()
+    persist_frame(df_name, df, rebuild_cost, fingerprint=fingerprint, token=token)
+    return _register(df_name, df, token)
+
+
+def _register(df_name, df, token):
+    """
+    Make df the in-process copy of df_name (published first in shared mode).
+    Call under name_lock(df_name); returns the names for _persist_evicted.
+    """
+    if REGISTRY_BACKEND == "shared":
+        SHARED_STORE.publish(df_name, df)
+        # keep the shared view rather than a second private copy
+        attached = _attach_shared(df_name)
+        if attached is not None:
+            with REGISTRY_LOCK:
+                return _publish(*attached, df_name=df_name)
+    with REGISTRY_LOCK:
+        return _publish(df, token, df_name=df_name)
+
+
+def frame_fingerprint(df: pd.DataFrame, *salt):
+    """
+    Fast content hash of df: row hashes from pd.util.hash_pandas_object plus
+    column names and dtypes, and any salt (e.g. load options). None if some
+    cells cannot be hashed.
+    """
+    try:
+        rows = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    except TypeError:
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(rows).tobytes())
+    h.update(repr(([str(c) for c in df.columns], [str(t) for t in df.dtypes], salt)).encode())
+    return h.hexdigest()
+
+
+def is_unchanged(df_name, fingerprint) -> bool:
+    """True if the current cached version of df_name was built from input with this fingerprint."""
+    if fingerprint is None:
+        return False
+    with REGISTRY_LOCK:
+        entry = refresh_manifest().get(df_name)
+        if entry is None or entry.get("fingerprint") != fingerprint:
+            return False
+        manifest_touch(df_name)
+        return True
+
+
+# -------------------------
+# Append-only ingest
+# -------------------------
+# Sheets that only grow at the bottom are extended instead of rewritten: the
+# new rows go to a fragment file under {name}.parts/ and the manifest entry
+# lists it after the base file. An append is a new version (derived results
+# must refresh) but leaves existing files untouched; after
+# COMPACT_AFTER_FRAGMENTS fragments the frame is rewritten as one file under
+# the same version.
+COMPACT_AFTER_FRAGMENTS = 8
+
+
+def concat_fragments(frames) -> pd.DataFrame:
+    """
+    Stack a base frame and its appended fragments, keeping the base dtypes:
+    categories are unioned, fragments that came out categorical are cast back.
+    Raises ValueError if a column can only be combined as object.
+    """
+    base = frames[0]
+    frames = list(frames)
+    cat_cols = [i for i, t in enumerate(base.dtypes) if isinstance(t, pd.CategoricalDtype)]
+    for j in range(1, len(frames)):
+        recast = [i for i, t in enumerate(frames[j].dtypes)
+                  if isinstance(t, pd.CategoricalDtype) and i not in cat_cols]
+        if recast:
+            frames[j] = frames[j].copy(deep=False)
+            for i in recast:
+                frames[j].isetitem(i, frames[j].iloc[:, i].astype(base.dtypes.iloc[i]))
+    out = pd.concat(frames)
+    for i in cat_cols:
+        parts = [f.iloc[:, i] for f in frames]
+        out.isetitem(i, union_categoricals([p.astype("category").array for p in parts]))
+    for i, (before, after) in enumerate(zip(base.dtypes, out.dtypes)):
+        if after == object and before != object:
+            raise ValueError(f"column '{base.columns[i]}' changed type ({before} -> object)")
+    return out
+
+
+def appended_rows(df_name, df, *salt):
+    """
+    Row count of the cached df_name if df is the input it was loaded from
+    plus new rows below (prefix fingerprint match), else None.
+    """
+    entry = refresh_manifest().get(df_name)
+    if entry is None or "fingerprint" not in entry:
+        return None
+    n = len(auto_load(df_name))
+    if not 0 < n < len(df):
+        return None
+    if frame_fingerprint(df.iloc[:n], *salt) != entry["fingerprint"]:
+        return None
+    return n
+
+
+def persist_fragment(df_name, rows: pd.DataFrame, rebuild_cost=0.0, fingerprint=None):
+    """
+    Write rows as a fragment of the next version of df_name. Returns the new
+    entry, or None if df_name is no longer cached (the caller writes it whole).
+    """
+    with name_lock(CACHE_DIR, df_name):
+        with _manifest_lock():
+            entry = refresh_manifest().get(df_name)
+        if entry is None:
+            return None
+        version = entry["version"] + 1
+        path = fragment_path(df_name, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        start = time.perf_counter()
+        try:
+            write_parquet(rows, tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        with manifest_transaction():
+            old = CACHE_MANIFEST.get(df_name)
+            if old is None or old["token"] != entry["token"]:
+                os.remove(path)  # evicted meanwhile
+                return None
+            new = {k: v for k, v in old.items() if k != "indexes"}  # indexes don't cover the new rows
+            new.update(
+                version=version,
+                token=_new_token(),
+                fragments=old.get("fragments", []) + [os.path.relpath(path, CACHE_DIR)],
+                last_access=time.time(),
+                rebuild_cost=old["rebuild_cost"] + rebuild_cost + time.perf_counter() - start,
+            )
+            new["size"] = _entry_size(new)
+            if fingerprint is not None:
+                new["fingerprint"] = fingerprint
+            CACHE_MANIFEST[df_name] = new
+            _delete_entry_files(old, new)
+            purge_stale_files()
+            enforce_cache_budget(keep=(df_name,))
+    return new
+
+
+def compact_frame(df_name) -> bool:
+    """Rewrite the base file and fragments of df_name as one file, keeping its version."""
+    evicted = []
+    try:
+        return _compact_frame(df_name, evicted)
+    finally:
+        _persist_evicted(evicted)
+
+
+def _compact_frame(df_name, evicted) -> bool:
+    with name_lock(CACHE_DIR, df_name):
+        with _manifest_lock():
+            entry = refresh_manifest().get(df_name)
+        if entry is None or not entry.get("fragments"):
+            return False
+        df, _, loaded_evicted = _auto_load(df_name)
+        evicted += loaded_evicted
+        path = versioned_cache_path(df_name, entry["version"])
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            write_parquet(df, tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        with manifest_transaction():
+            old = CACHE_MANIFEST.get(df_name)
+            if old is None or old["token"] != entry["token"]:
+                os.remove(path)
+                return False
+            new = dict(old, file=os.path.basename(path), fragments=[])
+            new["size"] = _entry_size(new)
+            CACHE_MANIFEST[df_name] = new
+            _delete_entry_files(old, new)
+    return True
+
+
+def append_frame(df_name, rows: pd.DataFrame, rebuild_cost=0.0, fingerprint=None) -> pd.DataFrame:
+    """
+    Add rows at the bottom of df_name: persisted as a fragment (compacting
+    every COMPACT_AFTER_FRAGMENTS appends) and registered. Returns the new frame.
+    """
+    with name_lock(CACHE_DIR, df_name):
+        base, _, evicted = _auto_load(df_name)
+        combined = concat_fragments([base, rows])
+        entry = persist_fragment(df_name, rows, rebuild_cost, fingerprint)
+        if entry is None:
+            evicted += _auto_cache(df_name, combined, rebuild_cost, fingerprint)
+        else:
+            evicted += _register(df_name, combined, entry["token"])
+            if len(entry["fragments"]) >= COMPACT_AFTER_FRAGMENTS:
+                compact_frame(df_name)
+    _persist_evicted(evicted)
+    return combined
+
 
+def drop_frame(df_name):
+    """Forget df_name everywhere: registry, shared memory and disk cache."""
+    with REGISTRY_LOCK:
+        DF_REGISTRY.pop(df_name, None)
+        _SHARED_GENERATIONS.pop(df_name, None)
+        _FRAME_TOKENS.pop(df_name, None)
+        _PENDING_WRITES.pop(df_name, None)
+    if SHARED_STORE.generation(df_name) is not None:
+        SHARED_STORE.unpublish(df_name)
+    with name_lock(CACHE_DIR, df_name), manifest_transaction():
+        manifest_remove(df_name)
+    legacy = os.path.join(CACHE_DIR, f"{df_name}.parquet")
+    if os.path.exists(legacy):
+        os.remove(legacy)
 
-def get_dir_size(path):
-    """Return directory size in bytes."""
-    total = 0
-    for dirpath, _, filenames in os.walk(path):
-        for f in filenames:
-            fp = os.path.join(dirpath, f)
-            if os.path.isfile(fp):
-                total += os.path.getsize(fp)
-    return total
+
+# -------------------------
+# Ingest dtype optimization
+# -------------------------
+OPTIMIZE_CATEGORY_MAX_RATIO = 0.5
+# Excel serial day numbers between 1950-01-01 and 2099-12-31
+EXCEL_SERIAL_MIN, EXCEL_SERIAL_MAX = 18264, 73050
+# whole words of a column name ("Order Date", "ship_dt"), not substrings ("candidate")
+_DATE_NAME_WORDS = {"date", "time", "day", "period", "dt"}
+_DURATION_WORDS = {"ms", "s", "sec", "secs", "seconds", "min", "mins", "minutes", "h", "hr", "hrs", "hours"}
+DF_MEMORY_STATS = {}
+
+
+def _name_words(name) -> set:
+    # "OrderDate" -> order, date; "time_ms" -> time, ms
+    spaced = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", str(name))
+    return {w for w in re.split(r"[\W_]+", spaced.lower()) if w}
+
+
+def _is_excel_serial_dates(name, s: pd.Series) -> bool:
+    """Numeric column whose name looks date-like and whose values are all plausible serials."""
+    words = _name_words(name)
+    if not words & _DATE_NAME_WORDS or words & _DURATION_WORDS:
+        return False
+    values = s.dropna()
+    if values.empty:
+        return False
+    return bool(values.between(EXCEL_SERIAL_MIN, EXCEL_SERIAL_MAX).all())
+
+
+def _optimize_series(name, s: pd.Series, dates=False) -> pd.Series:
+    dtype = s.dtype
+    if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return s
+
+    if pd.api.types.is_numeric_dtype(dtype):
+        if dates and _is_excel_serial_dates(name, s):
+            return pd.to_datetime(s, origin="1899-12-30", unit="D", errors="coerce")
+        if pd.api.types.is_float_dtype(dtype) and dtype != np.float32:
+            # float32 only when it round-trips exactly
+            values = s.to_numpy()
+            as32 = values.astype(np.float32)
+            if np.array_equal(as32.astype(np.float64), values, equal_nan=True):
+                return s.astype(np.float32)
+        return s  # integers keep their width: later arithmetic must not wrap around
+
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        values = s.dropna()
+        if values.empty:
+            return s
+        kinds = set(map(type, values))
+        if kinds <= {datetime, date, pd.Timestamp}:
+            return pd.to_datetime(s, errors="coerce")
+        if kinds != {str}:
+            return s  # mixed cells are left alone
+        if s.nunique(dropna=True) <= OPTIMIZE_CATEGORY_MAX_RATIO * len(s):
+            return s.astype("category")
+        if pd.api.types.is_object_dtype(dtype):
+            return s.astype(pd.StringDtype("pyarrow", na_value=np.nan))
+    return s
+
+
+def optimize_dtypes(df: pd.DataFrame, name=None, dates=False) -> pd.DataFrame:
+    """
+    Shrink a freshly ingested frame. Every stored value is kept, but results
+    computed from float32 and category columns can differ from float64/object
+    ones (precision, unused categories), so DF_LOAD only does this on request:
+      - floats -> float32 where every value round-trips exactly (ints are left as they are)
+      - repeated strings -> category, unique strings -> arrow-backed string
+      - object columns of datetime cells -> datetime64
+      - dates=True: numeric Excel serial date columns (a date-like word in
+        the name) -> datetime64
+    Per-column before/after bytes are kept in DF_MEMORY_STATS[name].
+    """
+    before = df.memory_usage(index=False, deep=True)
+    out = df.copy(deep=False)
+    # positional so duplicate Excel headers are handled
+    for i, col in enumerate(df.columns):
+        out.isetitem(i, _optimize_series(col, df.iloc[:, i], dates))
+    after = out.memory_usage(index=False, deep=True)
+
+    if name is not None:
+        DF_MEMORY_STATS[name] = pd.DataFrame({
+            "column": [str(c) for c in df.columns],
+            "dtype_before": [str(t) for t in df.dtypes],
+            "bytes_before": before.to_numpy(),
+            "dtype_after": [str(t) for t in out.dtypes],
+            "bytes_after": after.to_numpy(),
+        })
+    return out
+
+
+def append_memory_stats(name, rows: pd.DataFrame, combined: pd.DataFrame):
+    """
+    Update DF_MEMORY_STATS[name] after rows (as ingested, before optimization)
+    were appended, giving combined; dropped if there is nothing to update.
+    """
+    report = DF_MEMORY_STATS.get(name)
+    if report is None or len(report) != combined.shape[1]:
+        DF_MEMORY_STATS.pop(name, None)
+        return
+    report = report.copy()
+    report["bytes_before"] += rows.memory_usage(index=False, deep=True).to_numpy()
+    report["dtype_after"] = [str(t) for t in combined.dtypes]
+    report["bytes_after"] = combined.memory_usage(index=False, deep=True).to_numpy()
+    DF_MEMORY_STATS[name] = report
+
+
+def memory_report(name) -> pd.DataFrame:
+    """Before/after bytes per column for a named frame, plus a TOTAL row."""
+    report = DF_MEMORY_STATS.get(name)
+    if report is None:
+        # not optimized on ingest: before == after
+        df = auto_load(name)
+        usage = df.memory_usage(index=False, deep=True).to_numpy()
+        dtypes = [str(t) for t in df.dtypes]
+        report = pd.DataFrame({
+            "column": [str(c) for c in df.columns],
+            "dtype_before": dtypes,
+            "bytes_before": usage,
+            "dtype_after": dtypes,
+            "bytes_after": usage,
+        })
+    total = pd.DataFrame([{
+        "column": "TOTAL",
+        "dtype_before": "",
+        "bytes_before": int(report["bytes_before"].sum()),
+        "dtype_after": "",
+        "bytes_after": int(report["bytes_after"].sum()),
+    }])
+    return pd.concat([report, total], ignore_index=True)
 
 
 def check_cache_dir():
-    """Delete cache dir if it exceeds max size."""
-    size = get_dir_size(CACHE_DIR)
-    if size > CACHE_MAX_SIZE:
+    """Bring the cache back under CACHE_MAX_SIZE using the manifest (no directory walk)."""
+    with manifest_transaction():
+        size = cache_size()
+        purge_stale_files()
+        evicted = enforce_cache_budget()
+    if evicted:
         print(
-            f"[Cache Cleanup] Cache size {size/1e6:.2f} MB exceeded limit. Clearing...")
-        shutil.rmtree(CACHE_DIR)
-        os.makedirs(CACHE_DIR, exist_ok=True)
+            f"[Cache Cleanup] Cache size {size/1e6:.2f} MB exceeded limit. "
+            f"Evicted: {', '.join(evicted)}")
 
 
 def try_literal_eval(s: str):
@@ -165,10 +1174,102 @@ def normalize(obj):
     # scalar types (bool, int, float, None)
     return normalize_scalar(obj)
 
+# ------------ parse cache ------------
+# Sheets call the same UDF with the same handful of kwargs strings thousands
+# of times. Parsed results are memoized on the raw input (strings as-is,
+# lists/dicts/tuples via a hashable, type-tagged form) and every caller gets
+# its own copy, so mutating the returned dict never leaks into the cache.
+KWARGS_CACHE_MAX = 1024
+_KWARGS_CACHE = OrderedDict()
+_KWARGS_CACHE_LOCK = threading.Lock()
+KWARGS_CACHE_STATS = {"hits": 0, "misses": 0, "uncacheable": 0}
+
+
+def _freeze(obj):
+    """Hashable key for obj; type-tagged so 1, 1.0 and True stay distinct. None if unhashable."""
+    if isinstance(obj, dict):
+        items = tuple((_freeze(k), _freeze(v)) for k, v in obj.items())
+        return None if any(k is None or v is None for k, v in items) else ("dict", items)
+    if isinstance(obj, (list, tuple)):
+        items = tuple(_freeze(x) for x in obj)
+        return None if any(x is None for x in items) else (type(obj).__name__, items)
+    try:
+        hash(obj)
+    except TypeError:
+        return None
+    return type(obj).__name__, obj
+
+
+def _copy_parsed(obj):
+    """Copy the mutable containers of a parsed result; scalars and tuples are shared."""
+    if isinstance(obj, dict):
+        return {k: _copy_parsed(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_copy_parsed(x) for x in obj]
+    return obj
+
+
+def kwargs_cache_stats(clear=False) -> dict:
+    """Counters and size of the memo, read in one go; clear=True then resets both."""
+    with _KWARGS_CACHE_LOCK:
+        counts = dict(KWARGS_CACHE_STATS)
+        entries = len(_KWARGS_CACHE)
+        if clear:
+            _KWARGS_CACHE.clear()
+            for k in KWARGS_CACHE_STATS:
+                KWARGS_CACHE_STATS[k] = 0
+    hits, misses = counts["hits"], counts["misses"]
+    return {
+        **counts,
+        "entries": entries,
+        "max_entries": KWARGS_CACHE_MAX,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+    }
+
+
+def clear_kwargs_cache():
+    with _KWARGS_CACHE_LOCK:
+        _KWARGS_CACHE.clear()
+        for k in KWARGS_CACHE_STATS:
+            KWARGS_CACHE_STATS[k] = 0
+
 # ------------ main parser ------------
 
 
 def parse_kwargs(kwargs_input: Any) -> Any:
+    """
+    Parse and normalize kwargs passed from Excel UDFs (memoized, see above).
+    Returns a fresh dict on every call.
+    """
+    if kwargs_input is None:
+        return {}
+    with span("parse_kwargs") as s:
+        key = _freeze(kwargs_input)
+        if key is None:
+            with _KWARGS_CACHE_LOCK:
+                KWARGS_CACHE_STATS["uncacheable"] += 1
+            s.set(cache="uncacheable")
+            return _parse_kwargs(kwargs_input)
+
+        with _KWARGS_CACHE_LOCK:
+            parsed = _KWARGS_CACHE.get(key)
+            if parsed is not None:
+                _KWARGS_CACHE.move_to_end(key)
+                KWARGS_CACHE_STATS["hits"] += 1
+                s.set(cache="hit")
+                return _copy_parsed(parsed)
+            KWARGS_CACHE_STATS["misses"] += 1
+
+        s.set(cache="miss")
+        parsed = _parse_kwargs(kwargs_input)
+        with _KWARGS_CACHE_LOCK:
+            _KWARGS_CACHE[key] = parsed
+            while len(_KWARGS_CACHE) > KWARGS_CACHE_MAX:
+                _KWARGS_CACHE.popitem(last=False)
+        return _copy_parsed(parsed)
+
+
+def _parse_kwargs(kwargs_input: Any) -> Any:
     """
     Parse and normalize kwargs passed from Excel UDFs.
 
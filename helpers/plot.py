@@ -1,56 +1,517 @@
+import hashlib
 import inspect
+import io
+import json
+import os
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import xlwings as xw
+import numpy as np
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+from collections import OrderedDict
+
+import helpers.pd as hpd
+from helpers.lazy import lazy_import
+from helpers.shm import SharedFrameStore
 
 # -------------------------
 # Seaborn plotting UDFs (stateless)
 # -------------------------
+# seaborn pulls in scipy and takes longer to import than the rest of the
+# add-in together, so it is only loaded by the first plot. That first load
+# also fixes the backend and applies the theme, in the UDF server and in
+# every plot worker alike.
+
+
+def _load_seaborn():
+    import matplotlib
+    matplotlib.use("Agg")  # render off-screen; figures only ever go to Excel as PNG
+    import seaborn
+    seaborn.set_theme(style="ticks", palette="viridis")
+    return seaborn
+
+
+def _load_pyplot():
+    sns._load()  # plain matplotlib figures (hexbin) get the same backend and theme
+    import matplotlib.pyplot
+    return matplotlib.pyplot
+
 
-import matplotlib.pyplot as plt
-import seaborn as sns
+plt = lazy_import("matplotlib.pyplot", _load_pyplot)
+sns = lazy_import("seaborn", _load_seaborn)
 
 
-def insert_figure(fig, name="Figure"):
+# -------------------------
+# Figure render cache
+# -------------------------
+# Rendered PNG bytes keyed on (data key, kind, kwargs): the data key is the
+# frame_token for named frames (DF_PLOT) or a content fingerprint for
+# ranges passed in directly (SNS_PLOT). A recalc with the same inputs skips
+# seaborn entirely, and a picture already showing the same bytes is left
+# alone instead of being re-inserted. The PNG files handed to Excel live in
+# the temp dir; the newest PNG_FILES_MAX are kept, older ones are deleted
+# (Excel has copied them into the workbook by then).
+FIGURE_CACHE_MAX = 32
+PNG_FILES_MAX = 64
+FIGURE_EXPORT_OPTIONS = {"bbox_inches": "tight", "dpi": 200}  # xlwings' own defaults
+FIGURE_CACHE = OrderedDict()  # key -> png bytes
+_INSERTED = {}  # (book, sheet, picture name) -> digest of the png shown there
+_PNG_FILES = OrderedDict()  # digest -> temp file written by this process
+_FIGURE_LOCK = threading.Lock()
+
+
+def figure_key(data_key, kind, params):
+    """Hashable cache key; None (no caching) if params cannot be serialized."""
+    if data_key is None:
+        return None
     try:
-        caller = xw.Book.caller()
-        sht = caller.sheets.active
-        sht.pictures.add(fig, name=name, update=True,
+        return data_key, kind, json.dumps(params, sort_keys=True, default=repr)
+    except (TypeError, ValueError):
+        return None
+
+
+def cached_figure(key):
+    if key is None:
+        return None
+    with _FIGURE_LOCK:
+        png = FIGURE_CACHE.get(key)
+        if png is not None:
+            FIGURE_CACHE.move_to_end(key)
+        return png
+
+
+def store_figure(key, png):
+    if key is None:
+        return
+    with _FIGURE_LOCK:
+        FIGURE_CACHE[key] = png
+        while len(FIGURE_CACHE) > FIGURE_CACHE_MAX:
+            FIGURE_CACHE.popitem(last=False)
+
+
+def render_png(fig) -> bytes:
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", **FIGURE_EXPORT_OPTIONS)
+    return buf.getvalue()
+
+
+def _unlink(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # already gone, or still open on Windows: the temp dir cleanup gets it
+
+
+def _png_file(png: bytes, digest: str) -> str:
+    path = os.path.join(tempfile.gettempdir(), f"xlw_fig_{os.getpid()}_{digest}.png")
+    if not os.path.exists(path):
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(png)
+        os.replace(tmp, path)
+    with _FIGURE_LOCK:
+        _PNG_FILES[digest] = path
+        _PNG_FILES.move_to_end(digest)
+        old = [_PNG_FILES.popitem(last=False)[1] for _ in range(len(_PNG_FILES) - PNG_FILES_MAX)]
+    for p in old:
+        _unlink(p)
+    return path
+
+
+def clear_png_files():
+    """Delete the PNG files this process wrote for Excel (atexit hook)."""
+    with _FIGURE_LOCK:
+        paths = list(_PNG_FILES.values())
+        _PNG_FILES.clear()
+    for p in paths:
+        _unlink(p)
+
+
+def insert_figure(fig, name="Figure", sht=None):
+    """
+    Insert a figure (or PNG bytes) as picture `name` on sht (default: the
+    caller's active sheet); skipped if it already shows the same image.
+    """
+    try:
+        png = fig if isinstance(fig, bytes) else render_png(fig)
+        digest = hashlib.blake2b(png, digest_size=16).hexdigest()
+        if sht is None:
+            sht = xw.Book.caller().sheets.active
+        slot = (sht.book.name, sht.name, name)
+        if _INSERTED.get(slot) == digest and name in sht.pictures:
+            return False
+        sht.pictures.add(_png_file(png, digest), name=name, update=True,
                          left=300, top=50, scale=1)
+        _INSERTED[slot] = digest
+        return True
     except Exception as e:
         raise RuntimeError(f"Insert figure error: {e}")
 
+
+# -------------------------
+# Plot data reduction
+# -------------------------
+# Big frames are reduced before seaborn sees them, so plot time depends on
+# max_points (kwarg, default PLOT_MAX_POINTS; 0/None disables) rather than
+# on the frame size:
+#   lineplot           -> LTTB (default) or min/max per bucket, per hue/style group
+#   scatter-like kinds -> stratified sample per hue group, or reduce="hexbin"
+#   histplot           -> counts pre-binned with numpy, drawn via weights
+#   countplot          -> value counts drawn as a barplot
+PLOT_MAX_POINTS = 20_000
+SAMPLE_MIN_PER_GROUP = 50  # keeps rare hue groups visible after sampling
+_SAMPLE_KINDS = {"scatterplot", "pairplot", "jointplot", "stripplot", "swarmplot", "regplot", "lmplot", "relplot"}
+_GROUP_KEYS = ("hue", "style", "size", "units")
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: positions of n_out points that keep the shape of y(x)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    every = (n - 2) / (n_out - 2)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        nxt_end = min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[end:nxt_end].mean(), y[end:nxt_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Positions of the min and max of y in each of n_out/2 equal-size buckets."""
+    n = len(y)
+    buckets = max(1, n_out // 2)
+    if n_out >= n:
+        return np.arange(n)
+    bucket = np.arange(n) * buckets // n
+    s = pd.Series(y)
+    grouped = s.groupby(bucket)
+    return np.union1d(grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy())
+
+
+def _numeric(s: pd.Series):
+    """Series as float64 for decimation (datetimes via their int64 value); None if not numeric."""
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.astype("int64").to_numpy(dtype=float)
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return s.to_numpy(dtype=float, na_value=np.nan)
+    return None
+
+
+def _groups(df, params):
+    keys = [params[k] for k in _GROUP_KEYS if isinstance(params.get(k), str) and params[k] in df.columns]
+    if not keys:
+        return [np.arange(len(df))]
+    return list(df.groupby(keys, observed=True, sort=False).indices.values())
+
+
+def reduce_lines(df, params, max_points, method="lttb"):
+    x, y = params.get("x"), params.get("y")
+    if x not in df.columns or y not in df.columns:
+        return df, params
+    df = df.dropna(subset=[x, y])
+    if df[x].duplicated().any():
+        # seaborn would aggregate repeated x anyway; do it once here
+        keys = [params[k] for k in _GROUP_KEYS if isinstance(params.get(k), str) and params[k] in df.columns]
+        estimator = params.get("estimator", "mean")
+        if not isinstance(estimator, str):
+            return df, params
+        df = df.groupby(keys + [x], observed=True, sort=False)[y].agg(estimator).reset_index()
+        params = {**params, "errorbar": params.get("errorbar")}  # no CI from pre-aggregated means
+    groups = _groups(df, params)
+    if len(df) <= max_points:
+        return df, params
+    budget = max(3, max_points // len(groups))
+    keep = []
+    for pos in groups:
+        part = df.iloc[pos].sort_values(x, kind="stable")
+        xs, ys = _numeric(part[x]), _numeric(part[y])
+        if xs is None or ys is None:
+            return df, params
+        idx = minmax_indices(ys, budget) if method == "minmax" else lttb_indices(xs, ys, budget)
+        keep.append(part.iloc[idx])
+    return pd.concat(keep), params
+
+
+def stratified_sample(df, params, max_points, seed=0):
+    """
+    Up to max_points rows, each hue/style group sampled in proportion. Every
+    group keeps at least SAMPLE_MIN_PER_GROUP rows, less when there are so
+    many groups that the minimums alone would exceed max_points.
+    """
+    rng = np.random.default_rng(seed)
+    groups = _groups(df, params)
+    sizes = np.array([len(pos) for pos in groups])
+    floor = np.minimum(sizes, min(SAMPLE_MIN_PER_GROUP, max_points // len(groups)))
+    quota = max_points * sizes / len(df)
+    k = np.minimum(sizes, np.maximum(floor, quota.astype(int)))
+    if k.sum() > max_points:  # the minimums pushed it over: shrink the shares above them
+        extra = k - floor
+        k = floor + extra * (max_points - floor.sum()) // extra.sum()
+    # hand out what rounding down left over, largest remainders first
+    short = np.flatnonzero(k < sizes)
+    spare = min(max_points - int(k.sum()), len(short))
+    if spare > 0:
+        k[short[np.argsort(k[short] - quota[short], kind="stable")[:spare]]] += 1
+    keep = [rng.choice(pos, size=n, replace=False) for pos, n in zip(groups, k)]
+    return df.iloc[np.sort(np.concatenate(keep))]
+
+
+def prebin_hist(df, params):
+    x = params.get("x")
+    if x not in df.columns or params.get("y") is not None or params.get("discrete"):
+        return df, params
+    if params.get("log_scale"):
+        return df, params  # seaborn bins in log space; linear edges would give wrong bars
+    vals = _numeric(df[x])
+    if vals is None or pd.api.types.is_datetime64_any_dtype(df[x]):
+        return df, params
+    bins = params.get("bins", "auto")
+    weights = params.get("weights")
+    ok = ~np.isnan(vals)
+    edges = np.histogram_bin_edges(vals[ok], bins=bins, range=params.get("binrange"))
+    centers = (edges[:-1] + edges[1:]) / 2
+    hue = params.get("hue") if params.get("hue") in df.columns else None
+
+    parts = []
+    groups = df[ok].groupby(hue, observed=True, sort=False) if hue else [(None, df[ok])]
+    for key, part in groups:
+        w = part[weights].to_numpy(dtype=float) if weights in df.columns else None
+        counts, _ = np.histogram(_numeric(part[x]), bins=edges, weights=w)
+        frame = pd.DataFrame({x: centers, "_count": counts})
+        if hue:
+            frame[hue] = key
+        parts.append(frame)
+    binned = pd.concat(parts, ignore_index=True)
+    if hue and isinstance(df[hue].dtype, pd.CategoricalDtype):
+        binned[hue] = pd.Categorical(binned[hue], categories=df[hue].cat.categories)
+    return binned, {**params, "bins": edges.tolist(), "weights": "_count"}
+
+
+def precount(df, params):
+    """countplot -> barplot of value counts (same bars, one row per bar)."""
+    orient_x = params.get("x") in df.columns
+    cat = params.get("x") if orient_x else params.get("y")
+    if cat not in df.columns or params.get("stat") not in (None, "count"):
+        return "countplot", df, params
+    hue = params.get("hue") if params.get("hue") in df.columns else None
+    keys = [cat, hue] if hue and hue != cat else [cat]
+    counts = df.groupby(keys, observed=True, sort=False).size().rename("count").reset_index()
+
+    def order(col):
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            return list(s.cat.categories)
+        uniq = pd.unique(s.dropna())
+        return sorted(uniq) if pd.api.types.is_numeric_dtype(s) else list(uniq)
+
+    new = {k: v for k, v in params.items() if k != "stat"}
+    new.setdefault("order", order(cat))
+    if hue and hue != cat:
+        new.setdefault("hue_order", order(hue))
+    new["x" if not orient_x else "y"] = "count"
+    new["errorbar"] = None
+    return "barplot", counts, new
+
+
+def reduce_for_plot(kind, df, params):
+    """
+    Apply the per-kind reduction when df has more than max_points rows.
+    Returns (kind, df, params) to draw; kind may change (countplot -> barplot,
+    scatterplot -> "hexbin").
+    """
+    params = dict(params)
+    max_points = params.pop("max_points", PLOT_MAX_POINTS)
+    method = str(params.pop("reduce", "") or "").lower()
+    if not max_points or method == "none" or not isinstance(df, pd.DataFrame) or len(df) <= max_points:
+        return kind, df, params
+    max_points = int(max_points)
+    if kind == "lineplot":
+        df, params = reduce_lines(df, params, max_points, method or "lttb")
+        return kind, df, params
+    if kind == "histplot":
+        df, params = prebin_hist(df, params)
+        return kind, df, params
+    if kind == "countplot":
+        return precount(df, params)
+    if kind == "scatterplot" and method == "hexbin":
+        return "hexbin", df, params
+    if kind in _SAMPLE_KINDS:
+        return kind, stratified_sample(df, params, max_points), params
+    return kind, df, params
+
+
+def hexbin_figure(df, params):
+    """2D hex-binned density instead of a scatter of every row."""
+    x, y = params["x"], params["y"]
+    fig, ax = plt.subplots()
+    hb = ax.hexbin(_numeric(df[x]), _numeric(df[y]), gridsize=params.get("gridsize", 100),
+                   mincnt=1, bins="log", cmap=params.get("cmap", "viridis"))
+    fig.colorbar(hb, ax=ax, label="count")
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    return fig
+
+
+def _render(kind, df, params) -> bytes:
+    kind, df, params = reduce_for_plot(kind, df, params)
+    if kind == "hexbin":
+        fig = hexbin_figure(df, params)
+        try:
+            return render_png(fig)
+        finally:
+            plt.close(fig)
+
+    func = getattr(sns, kind)
+
+    # Introspect function signature
+    sig = inspect.signature(func)
+    params_copy = params.copy()
+
+    # If function supports "data" argument → pass df
+    if "data" in sig.parameters:
+        result = func(data=df, **params_copy)
+    else:
+        result = func(df, **params_copy)
+
+    # Extract figure
+    if hasattr(result, "figure"):   # FacetGrid, JointGrid, etc.
+        fig = result.figure
+    else:                           # Axes or direct plotting
+        fig = plt.gcf()
+    try:
+        return render_png(fig)
+    finally:
+        plt.close(fig)
+
 # helper wrapper for all plots
 
 
-def plot_wrapper(kind: str, df: pd.DataFrame, plot_name: str, params: dict):
+def plot_wrapper(kind: str, df: pd.DataFrame, plot_name: str, params: dict, data_key=None):
+    """
+    Render sns.<kind> and insert it as picture plot_name.
+    data_key identifies the data (see figure_key); without it nothing is cached.
+    """
     try:
         # Get seaborn function dynamically
         if not hasattr(sns, kind):
             return f"PLOT error: Unsupported plot type '{kind}'"
-        func = getattr(sns, kind)
 
-        # Introspect function signature
-        sig = inspect.signature(func)
-        params_copy = params.copy()
-
-        # If function supports "data" argument → pass df
-        if "data" in sig.parameters:
-            result = func(data=df, **params_copy)
-        else:
-            result = func(df, **params_copy)
-
-        # Extract figure
-        if hasattr(result, "figure"):   # FacetGrid, JointGrid, etc.
-            fig = result.figure
-        else:                           # Axes or direct plotting
-            fig = plt.gcf()
+        key = figure_key(data_key, kind, params)
+        png = cached_figure(key)
+        if png is None:
+            png = _render(kind, df, params)
+            store_figure(key, png)
 
         # Insert back to Excel
-        insert_figure(fig, name=plot_name)
-        plt.close(fig)
+        insert_figure(png, name=plot_name)
         return f"{kind.capitalize()} done"
 
     except Exception as e:
         return f"{plot_name} error: {e}"
+
+
+# -------------------------
+# Batch rendering in worker processes
+# -------------------------
+# matplotlib is not thread-safe, so a sheet full of plots renders one by one
+# on Excel's thread. render_batch farms the figures out to a process pool:
+# each worker reads the frame itself (shared memory in "shared" registry
+# mode, else the parquet cache), renders with Agg and sends back PNG bytes.
+# Figures still in FIGURE_CACHE are not rendered again.
+PLOT_WORKERS = os.cpu_count() or 4
+_PLOT_POOL = None
+_WORKER_FRAMES = {}  # in workers: src -> (frame token, df), newest read only
+
+
+def _init_plot_worker(cache_dir):
+    # read from the same cache as the parent, even if it was repointed at runtime
+    if hpd.CACHE_DIR != cache_dir:
+        hpd.CACHE_DIR = cache_dir
+        hpd.SHARED_STORE = SharedFrameStore(cache_dir)
+
+
+def _plot_pool(workers):
+    global _PLOT_POOL
+    if _PLOT_POOL is None or _PLOT_POOL._max_workers != workers:
+        if _PLOT_POOL is not None:
+            _PLOT_POOL.shutdown(wait=False, cancel_futures=True)
+        # spawn: forked children would inherit the parent's file locks and threads
+        _PLOT_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                         initializer=_init_plot_worker, initargs=(hpd.CACHE_DIR,))
+    return _PLOT_POOL
+
+
+def _worker_frame(src, token, shared):
+    cached = _WORKER_FRAMES.get(src)
+    if cached is not None and cached[0] == token:
+        return cached[1]
+    df = None
+    if shared:
+        attached = hpd.SHARED_STORE.attach(src)
+        if attached is not None and hpd.SHARED_STORE.attached_token(src) == token:
+            df = attached[1]
+    if df is None:
+        df, cached_token = hpd.read_cached_version(src)
+        if df is not None and cached_token != token:
+            df = None  # the parent holds another copy (reloaded, or not written yet)
+    if df is None:
+        raise LookupError(f"DF '{src}' is not in the shared store or the cache")
+    _WORKER_FRAMES[src] = (token, df)
+    return df
+
+
+def _render_task(src, token, shared, kind, params) -> bytes:
+    return _render(kind, _worker_frame(src, token, shared), params)
+
+
+def render_batch(specs, workers=None):
+    """
+    specs: [(src, kind, name, params)] on named frames.
+    Returns [(name, png bytes or None, status)] in spec order; nothing is inserted.
+    """
+    workers = workers or PLOT_WORKERS
+    shared = hpd.REGISTRY_BACKEND == "shared"
+    results = [None] * len(specs)
+    todo = []
+    for i, (src, kind, name, params) in enumerate(specs):
+        if not hasattr(sns, kind):
+            results[i] = (name, None, f"error: Unsupported plot type '{kind}'")
+            continue
+        try:
+            _, token = hpd.auto_load_with_token(src)  # fail early on unknown frames
+        except Exception as e:
+            results[i] = (name, None, f"error: {e}")
+            continue
+        key = figure_key(("frame", src, token) if token else None, kind, params)
+        png = cached_figure(key)
+        if png is not None:
+            results[i] = (name, png, "cached")
+        else:
+            todo.append((i, key, src, token, kind, params))
+
+    if len(todo) > 1 and workers > 1:
+        pool = _plot_pool(workers)
+        futures = [(t, pool.submit(_render_task, t[2], t[3], shared, t[4], t[5])) for t in todo]
+    else:
+        futures = [(t, None) for t in todo]
+    for (i, key, src, token, kind, params), fut in futures:
+        name = specs[i][2]
+        try:
+            try:
+                png = fut.result() if fut is not None else _render(kind, hpd.auto_load(src), params)
+            except LookupError:
+                png = _render(kind, hpd.auto_load(src), params)  # not readable from a worker (evicted)
+            store_figure(key, png)
+            results[i] = (name, png, "rendered")
+        except Exception as e:
+            results[i] = (name, None, f"error: {e}")
+    return results
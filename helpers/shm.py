@@ -0,0 +1,266 @@
+import json
+import os
+import uuid
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from multiprocessing import shared_memory
+from filelock import FileLock
+
+from helpers.locks import file_lock, name_lock
+
+# -------------------------
+# Shared-memory frame store
+# -------------------------
+# Fixed-width columns (numbers, bools, naive datetimes) live in their own
+# SharedMemory block and are attached as read-only numpy views (zero-copy).
+# Everything else (strings, categories, mixed objects) is stored as an Arrow
+# IPC stream in a block and decoded on attach.
+#
+# A small JSON index next to the parquet cache maps frame names to blocks:
+#   {name: {"generation", "token", "owner", "rows", "index", "columns": [...]}}
+# "generation" restarts at 1 after an unpublish; "token" is never reused.
+
+INDEX_FILE = "_shm_index.json"
+
+
+class _Block(shared_memory.SharedMemory):
+    """SharedMemory that tolerates numpy views outliving it at interpreter exit."""
+
+    def __del__(self):
+        try:
+            self.close()
+        except BufferError:
+            pass
+
+
+def _is_fixed_width(s: pd.Series) -> bool:
+    dtype = s.dtype
+    return isinstance(dtype, np.dtype) and dtype.kind in "biufcmM"
+
+
+class SharedFrameStore:
+    def __init__(self, root):
+        self.root = root
+        self._index_lock = file_lock(os.path.join(root, "_shm_index.lock"))
+        self._owned = {}      # name -> [SharedMemory] created by this process
+        self._attached = {}   # name -> (generation, [SharedMemory], token) attached by this process
+        self._index_cache = (None, {})
+
+    # ---------- index ----------
+
+    def _index_path(self):
+        return os.path.join(self.root, INDEX_FILE)
+
+    def name_lock(self, name) -> FileLock:
+        """Per-frame cross-process lock (shared with the parquet cache)."""
+        return name_lock(self.root, name)
+
+    def read_index(self) -> dict:
+        """Parsed index, re-read only when the file changed on disk."""
+        path = self._index_path()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        cached_mtime, cached = self._index_cache
+        if cached_mtime == mtime:
+            return cached
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except ValueError:
+            index = {}
+        self._index_cache = (mtime, index)
+        return index
+
+    def _write_index(self, index):
+        path = self._index_path()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, path)
+
+    def generation(self, name):
+        entry = self.read_index().get(name)
+        return entry["generation"] if entry else None
+
+    def token(self, name):
+        """Token of the published version of name (None if not published)."""
+        entry = self.read_index().get(name)
+        return entry.get("token") if entry else None
+
+    def attached_token(self, name):
+        """Token of the version of name this process attached last."""
+        attached = self._attached.get(name)
+        return attached[2] if attached else None
+
+    def names(self):
+        return list(self.read_index().keys())
+
+    # ---------- publish ----------
+
+    @staticmethod
+    def _new_block(nbytes):
+        # short names: macOS caps POSIX shm names at 31 chars
+        return _Block(name=f"xlw{uuid.uuid4().hex[:16]}", create=True, size=max(1, nbytes), track=False)
+
+    def _put_array(self, arr: np.ndarray, blocks):
+        arr = np.ascontiguousarray(arr)
+        shm = self._new_block(arr.nbytes)
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        blocks.append(shm)
+        return {"kind": "numpy", "shm": shm.name, "dtype": arr.dtype.str, "shape": list(arr.shape)}
+
+    def _put_arrow(self, s: pd.Series, blocks):
+        table = pa.Table.from_pandas(s.to_frame(name="v"), preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        payload = sink.getvalue()
+        shm = self._new_block(payload.size)
+        shm.buf[:payload.size] = payload.to_pybytes()
+        blocks.append(shm)
+        return {"kind": "arrow", "shm": shm.name, "nbytes": payload.size}
+
+    def publish(self, name, df: pd.DataFrame):
+        """Copy df into shared memory and make it the current version of name."""
+        blocks = []
+        try:
+            columns = []
+            for i, col in enumerate(df.columns):
+                s = df.iloc[:, i]
+                spec = self._put_array(s.to_numpy(), blocks) if _is_fixed_width(s) \
+                    else self._put_arrow(s, blocks)
+                spec["name"] = col if isinstance(col, (str, int, float)) else str(col)
+                columns.append(spec)
+
+            if isinstance(df.index, pd.RangeIndex):
+                index_spec = {"kind": "range", "start": df.index.start,
+                              "stop": df.index.stop, "step": df.index.step}
+            else:
+                index_spec = self._put_arrow(df.index.to_series(), blocks)
+                index_spec["name"] = df.index.name if isinstance(df.index.name, (str, int, float, type(None))) \
+                    else str(df.index.name)
+        except Exception:
+            self._release(blocks)
+            raise
+
+        with self.name_lock(name), self._index_lock:
+            index = dict(self.read_index())
+            old = index.get(name)
+            index[name] = {
+                "generation": (old["generation"] + 1) if old else 1,
+                "token": uuid.uuid4().hex,
+                "owner": os.getpid(),
+                "rows": len(df),
+                "index": index_spec,
+                "columns": columns,
+            }
+            self._write_index(index)
+        # readers that attached the old version keep their own mapping
+        self._release(self._owned.pop(name, []), unlink=True)
+        self._owned[name] = blocks
+        return index[name]["generation"]
+
+    # ---------- attach ----------
+
+    @staticmethod
+    def _open(block_name):
+        return _Block(name=block_name, track=False)
+
+    @staticmethod
+    def _read_arrow(shm, nbytes) -> pd.Series:
+        buf = pa.py_buffer(shm.buf[:nbytes])
+        table = pa.ipc.open_stream(buf).read_all()
+        return table.column("v").to_pandas()
+
+    def attach(self, name):
+        """
+        Return (generation, DataFrame) for name, or None if it is not published.
+        Fixed-width columns are read-only views onto the shared blocks.
+        """
+        with self.name_lock(name):
+            entry = self.read_index().get(name)
+            if entry is None:
+                return None
+            handles = []
+            try:
+                data = {}
+                for spec in entry["columns"]:
+                    shm = self._open(spec["shm"])
+                    handles.append(shm)
+                    if spec["kind"] == "numpy":
+                        arr = np.ndarray(spec["shape"], dtype=np.dtype(spec["dtype"]), buffer=shm.buf)
+                        arr.flags.writeable = False
+                        data[len(data)] = arr
+                    else:
+                        data[len(data)] = self._read_arrow(shm, spec["nbytes"]).array
+                idx = entry["index"]
+                if idx["kind"] == "range":
+                    index = pd.RangeIndex(idx["start"], idx["stop"], idx["step"])
+                else:
+                    shm = self._open(idx["shm"])
+                    handles.append(shm)
+                    index = pd.Index(self._read_arrow(shm, idx["nbytes"]), name=idx.get("name"))
+            except FileNotFoundError:
+                # publisher went away between reading the index and opening blocks
+                self._release(handles)
+                return None
+
+        df = pd.DataFrame(data, index=index, copy=False)
+        df.columns = [spec["name"] for spec in entry["columns"]]
+        old = self._attached.pop(name, None)
+        self._attached[name] = (entry["generation"], handles, entry.get("token"))
+        if old:
+            self._release(old[1])
+        return entry["generation"], df
+
+    # ---------- cleanup ----------
+
+    @staticmethod
+    def _release(blocks, unlink=False):
+        for shm in blocks:
+            try:
+                shm.close()
+            except BufferError:
+                pass  # a live numpy view still points at it; freed with the process
+            if unlink:
+                try:
+                    shm.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def _unlink_entry(self, entry):
+        specs = entry["columns"] + [entry["index"]]
+        for spec in specs:
+            if "shm" not in spec:
+                continue
+            try:
+                shm = self._open(spec["shm"])
+            except FileNotFoundError:
+                continue
+            self._release([shm], unlink=True)
+
+    def unpublish(self, name):
+        with self.name_lock(name), self._index_lock:
+            index = dict(self.read_index())
+            entry = index.pop(name, None)
+            if entry is not None:
+                self._write_index(index)
+        self._release(self._owned.pop(name, []), unlink=True)
+        if entry is not None:
+            # blocks may belong to a publisher that already exited
+            self._unlink_entry(entry)
+
+    def close(self):
+        """Drop every frame this process published (called at exit)."""
+        for name in list(self._owned):
+            entry = self.read_index().get(name)
+            if entry is not None and entry["owner"] == os.getpid():
+                self.unpublish(name)
+            else:
+                self._release(self._owned.pop(name), unlink=True)
+        for _, handles, _ in self._attached.values():
+            self._release(handles)
+        self._attached.clear()
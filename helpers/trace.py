@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# -------------------------
+# Tracing spans (Chrome trace-event export)
+# -------------------------
+# `with span("auto_load", df=name):` records one complete event ("ph": "X")
+# while tracing is on and costs a flag check otherwise. Spans on the same
+# thread nest by time, so a UDF span with load / compute spans inside it and
+# xlwings' argument and result conversion next to it shows up as a flame
+# graph in chrome://tracing or https://ui.perfetto.dev.
+#
+# enable_tracing() also instruments the UDFs (helpers/instrument.py), whose
+# wrapper opens the top-level span of each call, and wraps xlwings'
+# conversion.read/write, where arguments and results are marshalled.
+
+TRACE_MAX_EVENTS = 200_000
+
+TRACING = False
+_EVENTS = deque(maxlen=TRACE_MAX_EVENTS)  # (name, cat, start ns, duration ns, thread id, args)
+_THREAD_NAMES = {}
+_ORIGIN_NS = time.perf_counter_ns()
+_PATCHED = {}  # xlwings.conversion attr -> original
+_INSTRUMENTED_HERE = False
+
+
+class _Span:
+    __slots__ = ("name", "cat", "args", "start")
+
+    def __init__(self, name, cat, args):
+        self.name, self.cat, self.args = name, cat, args
+
+    def set(self, **args):
+        """Attach arguments known only once the span is running (e.g. cache hit or miss)."""
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter_ns() - self.start
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        tid = threading.get_ident()
+        if tid not in _THREAD_NAMES:
+            _THREAD_NAMES[tid] = threading.current_thread().name
+        _EVENTS.append((self.name, self.cat, self.start, duration, tid, self.args))
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name, cat="df", **args):
+    """Timing span for a `with` block; a shared no-op object when tracing is off."""
+    if not TRACING:
+        return _NO_SPAN
+    return _Span(name, cat, args)
+
+
+def _traced_conversion(name, func):
+    def conversion(*args, **kwargs):
+        with span(name, "xlwings"):
+            return func(*args, **kwargs)
+    return conversion
+
+
+def _patch_xlwings():
+    from xlwings import conversion
+    for attr in ("read", "write"):
+        if attr not in _PATCHED:
+            _PATCHED[attr] = getattr(conversion, attr)
+            setattr(conversion, attr, _traced_conversion(f"xlwings.{attr}", _PATCHED[attr]))
+
+
+def _unpatch_xlwings():
+    from xlwings import conversion
+    for attr, original in _PATCHED.items():
+        setattr(conversion, attr, original)
+    _PATCHED.clear()
+
+
+def enable_tracing() -> int:
+    """Start recording spans; returns the number of events already buffered."""
+    global TRACING, _INSTRUMENTED_HERE
+    from helpers.instrument import instrument, is_instrumented
+    if not is_instrumented():
+        instrument()
+        _INSTRUMENTED_HERE = True
+    _patch_xlwings()
+    TRACING = True
+    return len(_EVENTS)
+
+
+def disable_tracing():
+    """Stop recording; the buffered events stay available for export."""
+    global TRACING, _INSTRUMENTED_HERE
+    TRACING = False
+    _unpatch_xlwings()
+    if _INSTRUMENTED_HERE:
+        from helpers.instrument import uninstrument
+        uninstrument()
+        _INSTRUMENTED_HERE = False
+
+
+def clear_trace():
+    _EVENTS.clear()
+
+
+def trace_events() -> list:
+    """Buffered spans as Chrome trace events (timestamps in microseconds)."""
+    pid = os.getpid()
+    events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": "xlwings UDF server"}}]
+    events += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+               for tid, name in list(_THREAD_NAMES.items())]
+    for name, cat, start, duration, tid, args in list(_EVENTS):
+        events.append({"name": name, "cat": cat, "ph": "X", "pid": pid, "tid": tid,
+                       "ts": (start - _ORIGIN_NS) / 1000, "dur": duration / 1000,
+                       "args": {k: v if isinstance(v, (int, float, bool, type(None))) else str(v)
+                                for k, v in args.items()}})
+    return events
+
+
+def export_trace(path=None) -> str:
+    """Write the buffered spans as a Chrome trace JSON file; returns its path."""
+    if path is None:
+        import helpers.pd as hpd
+        path = os.path.join(hpd.CACHE_DIR, f"_trace.{os.getpid()}.{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace_events(), "displayTimeUnit": "ms"}, f)
+    return path
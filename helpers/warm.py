@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+
+import helpers.pd as hpd
+from helpers.lazy import loaded_modules, preload
+
+# -------------------------
+# Warm start
+# -------------------------
+# At exit the UDF server records what it had warmed up: the frames held in
+# DF_REGISTRY (LRU order, hottest last) and the lazy modules it loaded. The
+# next start registers the UDFs as usual and reloads that set in a background
+# thread, so the first recalc finds a hot registry instead of paying parquet
+# reads and heavy imports on Excel's calculation thread.
+#
+# The prefetch never holds REGISTRY_LOCK while reading (auto_load takes it
+# only to publish), so a UDF on another frame is not held up; a UDF on the
+# frame being read waits for that one read instead of doing its own. It
+# yields between frames and stops once UDF calls have filled the registry,
+# rather than evicting the frames they loaded.
+
+WARM_START = True
+WARM_FILE = "_warm.json"
+
+WARM_STATUS = {"state": "idle", "started": None, "finished": None,
+               "frames": [], "modules": [], "skipped": [], "errors": {}}
+_WARM_THREAD = None
+
+
+def _warm_path():
+    return os.path.join(hpd.CACHE_DIR, WARM_FILE)
+
+
+def save_warm_set():
+    """Record the hot frames and loaded lazy modules for the next start (atexit hook)."""
+    with hpd.REGISTRY_LOCK:
+        frames = list(hpd.DF_REGISTRY.keys())
+    state = {"saved": time.time(), "frames": frames, "modules": loaded_modules()}
+    path = _warm_path()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # never fail interpreter shutdown over a warm-start hint
+    return state
+
+
+def load_warm_set() -> dict:
+    try:
+        with open(_warm_path(), "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {"frames": [], "modules": []}
+    return {"frames": list(state.get("frames", [])), "modules": list(state.get("modules", []))}
+
+
+def prefetch(frames, modules=()):
+    """
+    Load frames into the registry (coldest first, so the LRU order is kept)
+    and then the lazy modules. Frames that are no longer cached, or that no
+    longer fit next to the ones UDFs have loaded since, are skipped.
+    """
+    frames = list(frames)[-hpd.LRU_MAX_ITEMS:]
+    for name in frames:
+        with hpd.REGISTRY_LOCK:
+            cached = name in hpd.refresh_manifest()
+            loaded = name in hpd.DF_REGISTRY
+            full = len(hpd.DF_REGISTRY) >= hpd.LRU_MAX_ITEMS
+        if loaded:
+            continue  # a UDF got to it first
+        if not cached or full:
+            WARM_STATUS["skipped"].append(name)
+            continue
+        try:
+            hpd.auto_load(name)
+            WARM_STATUS["frames"].append(name)
+        except Exception as e:
+            WARM_STATUS["errors"][name] = str(e)
+        time.sleep(0)  # let waiting UDF threads run between frames
+    for name in modules:
+        try:
+            WARM_STATUS["modules"].extend(preload([name]))
+        except Exception as e:
+            WARM_STATUS["errors"][name] = str(e)
+
+
+def _run(frames, modules):
+    try:
+        prefetch(frames, modules)
+    finally:
+        WARM_STATUS["finished"] = time.time()
+        WARM_STATUS["state"] = "done"
+
+
+def warm_start():
+    """Start prefetching the previous session's warm set in a daemon thread; returns it (or None)."""
+    global _WARM_THREAD
+    if not WARM_START or _WARM_THREAD is not None:
+        return _WARM_THREAD
+    state = load_warm_set()
+    if not state["frames"] and not state["modules"]:
+        return None
+    WARM_STATUS.update(state="running", started=time.time())
+    _WARM_THREAD = threading.Thread(target=_run, args=(state["frames"], state["modules"]),
+                                    name="xlw-warm-start", daemon=True)
+    _WARM_THREAD.start()
+    return _WARM_THREAD
+
+
+def wait_warm(timeout=None) -> bool:
+    """Block until the warm start has finished; True if it has (or never ran)."""
+    if _WARM_THREAD is not None:
+        _WARM_THREAD.join(timeout)
+        return not _WARM_THREAD.is_alive()
+    return True
+
+
+def warm_status() -> dict:
+    status = dict(WARM_STATUS)
+    if status["started"] and status["finished"]:
+        status["seconds"] = round(status["finished"] - status["started"], 3)
+    return status
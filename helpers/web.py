@@ -1,6 +1,8 @@
-from lxml import html
 import os
 import hashlib
+from helpers.lazy import lazy_import
+
+html = lazy_import("lxml.html")  # loaded by the first XPath extraction
 
 # -------------------------
 # Cache setup
@@ -8,7 +10,6 @@ import hashlib
 import os
 import hashlib
 import pandas as pd
-import requests
 
 CACHE_DIR = r"C:\Tools\Automation Scripts\shan_xlwings_project\_df_cache"
 MAX_CACHE_SIZE_MB = 50
@@ -1,10 +1,18 @@
 from api import *
-import seaborn as sns
 import atexit
 
-from helpers.pd import check_cache_dir
+from helpers.pd import check_cache_dir, SHARED_STORE
+from helpers.warm import warm_start, save_warm_set
+from helpers.plot import clear_png_files
+from helpers.instrument import instrument_from_env
 
-# 🎨 nice aesthetics
-sns.set_theme(style="ticks", palette="viridis")
+# seaborn (and its theme) loads with the first plot, see helpers/plot.py
 check_cache_dir()
+# reload last session's hot frames in the background; UDFs are usable meanwhile
+warm_start()
+# opt-in per-UDF timings (XLW_UDF_STATS=1), see UDF_STATS
+instrument_from_env()
 atexit.register(check_cache_dir)
+atexit.register(SHARED_STORE.close)
+atexit.register(save_warm_set)
+atexit.register(clear_png_files)